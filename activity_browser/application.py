@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 from logging import getLogger
+from multiprocessing import parent_process
 
 from PySide2.QtCore import QCoreApplication, QObject, QSysInfo, Qt
 from PySide2.QtWidgets import QApplication
@@ -54,4 +55,6 @@ if QSysInfo.productType() in ["arch", "nixos"]:
 
 QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts, True)
 
-application = ABApplication()
+# Calculation workers (see bwutils.pool) import this package to unpickle their
+# tasks, only the main process creates the application
+application = ABApplication() if parent_process() is None else None
@@ -4,11 +4,12 @@ bwutils is a collection of methods that build upon brightway2 and are generic en
 re-typing the same code in different parts of the Activity Browser.
 """
 from .commontasks import cleanup_deleted_bw_projects as cleanup
+from .first_tier import FirstTierContributions
 from .metadata import AB_metadata
 from .montecarlo import MonteCarloLCA
 from .multilca import MLCA, Contributions
 from .pedigree import PedigreeMatrix
-from .sensitivity_analysis import GlobalSensitivityAnalysis
+from .sensitivity_analysis import ESTIMATORS, GlobalSensitivityAnalysis
 from .superstructure import SuperstructureContributions, SuperstructureMLCA
 from .uncertainty import (CFUncertaintyInterface, ExchangeUncertaintyInterface,
                           ParameterUncertaintyInterface,
@@ -0,0 +1,216 @@
+"""
+Batched LCA calculations for many reference flows and impact categories.
+
+Brightway solves the technosphere system one demand vector at a time. The
+functions in this module instead stack all demand vectors into a single
+matrix, solve them in one multi right-hand side call against a single
+factorization of the technosphere matrix and characterize the results for
+all impact categories at once.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse.linalg import splu
+
+from activity_browser.mod import bw2data as bd
+
+
+class BatchResults(NamedTuple):
+    """Results of a batched calculation, contributions can be derived from
+    these through a `ResultStore`.
+    """
+
+    supply: np.ndarray  # (technosphere, reference flows)
+    inventory: np.ndarray  # (biosphere, reference flows)
+    scores: np.ndarray  # (reference flows, methods)
+
+
+class BatchSolver(object):
+    """Factorizes a technosphere matrix once and solves any number of
+    demand vectors against it.
+    """
+
+    def __init__(self, technosphere_matrix: sparse.spmatrix):
+        self.factorization = splu(sparse.csc_matrix(technosphere_matrix))
+
+    def solve(self, demand: np.ndarray) -> np.ndarray:
+        """Solve the system for a demand vector or a (products, n) matrix of
+        demand vectors.
+        """
+        return self.factorization.solve(np.asarray(demand, dtype=np.float64))
+
+    def solve_transposed(self, vectors: np.ndarray) -> np.ndarray:
+        """Solve the transposed system for a vector or an (activities, n)
+        matrix of vectors.
+
+        Solving for the (characterized) biosphere flows of each activity
+        gives the cumulative score of one unit of each product.
+        """
+        return self.factorization.solve(
+            np.asarray(vectors, dtype=np.float64), trans="T"
+        )
+
+
+class LowRankSolver(object):
+    """Solves a system that differs from an already factorized system in only
+    a few columns, using the Woodbury matrix identity.
+
+    The changed matrix is written as ``A + U @ V.T``, where ``U`` holds the
+    changed columns and ``V`` selects them. Instead of a new factorization
+    this requires one solve per changed column against the factorized ``A``
+    and the factorization of a small (changed columns x changed columns)
+    capacitance matrix.
+    """
+
+    def __init__(self, base_solver: BatchSolver, delta: sparse.spmatrix):
+        self.base_solver = base_solver
+        delta = sparse.csc_matrix(delta)
+        self.columns = np.flatnonzero(np.diff(delta.indptr))
+        self.correction = base_solver.solve(delta[:, self.columns].toarray())
+        capacitance = np.eye(len(self.columns)) + self.correction[self.columns, :]
+        self.capacitance = lu_factor(capacitance)
+
+    def solve(self, demand: np.ndarray) -> np.ndarray:
+        supply = self.base_solver.solve(demand)
+        return supply - self.correction @ lu_solve(
+            self.capacitance, supply[self.columns]
+        )
+
+
+class ScenarioSolver(object):
+    """Provides solvers for scenario variations of a base technosphere matrix,
+    reusing the factorization of the base matrix where possible.
+
+    Three paths are possible for a scenario technosphere matrix:
+
+    - ``REUSE``: the matrix is equal to the base matrix (the scenario only
+      changes the biosphere), the base factorization is used as-is.
+    - ``UPDATE``: at most `threshold` columns differ from the base matrix, the
+      base factorization is updated through a `LowRankSolver`.
+    - ``FACTORIZE``: more columns differ, or the low-rank update is not accurate,
+      the matrix is factorized from scratch.
+    """
+
+    REUSE = "reuse"
+    UPDATE = "update"
+    FACTORIZE = "factorize"
+
+    def __init__(self, technosphere_matrix: sparse.spmatrix, threshold: int = 500):
+        self.technosphere_matrix = sparse.csc_matrix(technosphere_matrix, copy=True)
+        self.threshold = threshold
+        self.base_solver = BatchSolver(self.technosphere_matrix)
+
+    def solver(self, technosphere_matrix: sparse.spmatrix) -> Tuple[BatchSolver, str]:
+        """Return a solver for the given matrix and the path that was taken."""
+        delta = sparse.csc_matrix(technosphere_matrix) - self.technosphere_matrix
+        delta.eliminate_zeros()
+        if delta.nnz == 0:
+            return self.base_solver, self.REUSE
+
+        changed = np.count_nonzero(np.diff(delta.indptr))
+        if changed <= self.threshold:
+            solver = LowRankSolver(self.base_solver, delta)
+            if self._accurate(solver, technosphere_matrix):
+                return solver, self.UPDATE
+        return BatchSolver(technosphere_matrix), self.FACTORIZE
+
+    @staticmethod
+    def _accurate(solver: LowRankSolver, technosphere_matrix: sparse.spmatrix) -> bool:
+        """Check the low-rank update on a test vector, the update becomes
+        unreliable when the capacitance matrix is (nearly) singular.
+        """
+        demand = np.ones(technosphere_matrix.shape[0])
+        with np.errstate(all="ignore"):
+            supply = solver.solve(demand)
+            residual = technosphere_matrix @ supply - demand
+        return bool(np.all(np.isfinite(supply))) and np.linalg.norm(
+            residual
+        ) <= 1e-8 * np.linalg.norm(demand)
+
+
+def include_entries(
+    matrix: sparse.spmatrix, rows: np.ndarray, cols: np.ndarray
+) -> sparse.csr_matrix:
+    """Return a canonical CSR copy of the matrix that holds an entry, zero if
+    not present before, at each of the given positions.
+    """
+    matrix = sparse.coo_matrix(matrix)
+    result = sparse.csr_matrix(
+        (
+            np.concatenate([matrix.data, np.zeros(len(rows))]),
+            (np.concatenate([matrix.row, rows]), np.concatenate([matrix.col, cols])),
+        ),
+        shape=matrix.shape,
+    )
+    result.sum_duplicates()
+    return result
+
+
+def data_offsets(
+    matrix: sparse.csr_matrix, rows: np.ndarray, cols: np.ndarray
+) -> np.ndarray:
+    """Return the positions of the given entries in the data array of a
+    canonical CSR matrix, all entries must be present in the matrix.
+    """
+    entry_rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    keys = entry_rows.astype(np.int64) * matrix.shape[1] + matrix.indices
+    return np.searchsorted(keys, rows.astype(np.int64) * matrix.shape[1] + cols)
+
+
+def product_index(lca, key: tuple) -> int:
+    """Return the matrix row of the given product key in the LCA."""
+    try:
+        return lca.product_dict[key]
+    except KeyError:
+        # bw25 compatibility requires activity id instead of activity key
+        return lca.product_dict[bd.get_activity(key).id]
+
+
+def activity_index(lca, key: tuple) -> int:
+    """Return the matrix column of the given activity key in the LCA."""
+    try:
+        return lca.activity_dict[key]
+    except KeyError:
+        # bw25 compatibility requires activity id instead of activity key
+        return lca.activity_dict[bd.get_activity(key).id]
+
+
+def demand_matrix(lca, func_units: List[dict]) -> np.ndarray:
+    """Stack the demand vectors of all reference flows into one
+    (products, reference flows) matrix.
+    """
+    demand = np.zeros((len(lca.product_dict), len(func_units)))
+    for col, func_unit in enumerate(func_units):
+        for key, amount in func_unit.items():
+            demand[product_index(lca, key), col] = amount
+    return demand
+
+
+def characterization_vectors(method_matrices: List[sparse.spmatrix]) -> np.ndarray:
+    """Collapse the characterization matrices into a single (methods, biosphere)
+    array, one row per impact category.
+    """
+    return np.vstack([np.asarray(m.sum(axis=0)).ravel() for m in method_matrices])
+
+
+def batch_calculation(
+    technosphere_matrix: sparse.spmatrix,
+    biosphere_matrix: sparse.spmatrix,
+    demand: np.ndarray,
+    characterization: np.ndarray,
+    solver: Optional[BatchSolver] = None,
+) -> BatchResults:
+    """Calculate the supply, inventory and scores of all reference flows in
+    `demand` for all impact categories in `characterization`.
+
+    Results are equal to doing a `redo_lci` for each reference flow followed by
+    a `lcia_calculation` for each characterization matrix. If no `solver` is
+    given the technosphere matrix is factorized.
+    """
+    solver = solver or BatchSolver(technosphere_matrix)
+    supply = solver.solve(demand)
+    inventory = sparse.csr_matrix(biosphere_matrix) @ supply
+    scores = (characterization @ inventory).T
+    return BatchResults(supply=supply, inventory=inventory, scores=scores)
@@ -0,0 +1,122 @@
+"""
+First-tier contributions of reference flows for all impact categories at once.
+
+The contribution of an input to a reference flow is the amount of the input
+times the cumulative score of one unit of the input product. Instead of an
+LCA per input, the cumulative scores of all products are found by solving the
+transposed technosphere system once for the characterized biosphere flows of
+all impact categories.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from activity_browser.mod import bw2data as bd
+
+from .batch import BatchSolver, activity_index, product_index
+
+
+class FirstTierContributions(object):
+    """Calculates the first-tier contributions of the reference flows of an
+    `MLCA` or `SuperstructureMLCA`.
+
+    The cumulative scores per unit of product are cached per scenario and the
+    inputs of the reference flow activities are read from the database once.
+    """
+
+    def __init__(self, mlca):
+        self.mlca = mlca
+        self.unit_scores: Dict[Optional[int], np.ndarray] = {}
+        self.inputs: Dict[tuple, Tuple[List[tuple], np.ndarray, float]] = {}
+
+    def activity_inputs(self, key: tuple) -> Tuple[List[tuple], np.ndarray, float]:
+        """Return the keys and amounts of the technosphere inputs of the
+        activity, other than the activity itself, and its production amount.
+        """
+        if key not in self.inputs:
+            activity = bd.get_activity(key)
+            exchanges = [
+                (exc["input"], exc["amount"])
+                for exc in activity.technosphere()
+                if exc["input"] != key
+            ]
+            # Later exchanges of the same input replace earlier ones
+            inputs = dict(exchanges)
+            production = [exc["amount"] for exc in activity.production()][0]
+            self.inputs[key] = (
+                list(inputs),
+                np.array(list(inputs.values()), dtype=np.float64),
+                production,
+            )
+        return self.inputs[key]
+
+    def load_scenario(self, scenario: Optional[int]) -> None:
+        """Write the values of the scenario into the LCA matrices."""
+        if scenario is not None:
+            self.mlca.current = scenario
+            self.mlca.update_matrices()
+
+    def product_scores(self, scenario: Optional[int] = None) -> np.ndarray:
+        """Return the cumulative score of one unit of each product as a
+        (products, methods) array, the scenario must be loaded.
+        """
+        if scenario not in self.unit_scores:
+            lca = self.mlca.lca
+            # Characterized biosphere flows of each activity per method
+            direct = sparse.csr_matrix(lca.biosphere_matrix).T @ (
+                self.mlca.characterization.T
+            )
+            solver = BatchSolver(lca.technosphere_matrix)
+            self.unit_scores[scenario] = solver.solve_transposed(direct)
+        return self.unit_scores[scenario]
+
+    def calculate(self, demand_index: int, scenario: Optional[int] = None) -> list:
+        """Return the first-tier contributions of the reference flow for
+        every method of the calculation.
+
+        Each result is a dictionary holding the total "Score", the
+        contribution of every input with a non-zero contribution, the
+        remainder (the direct contribution) under the key of the reference
+        flow and the "Range", the sum of the absolute contributions.
+        """
+        demand = self.mlca.func_units[demand_index]
+        demand_key = next(iter(demand))
+        if scenario is None:
+            scores = self.mlca.lca_scores[demand_index, :]
+        else:
+            scores = self.mlca.lca_scores[demand_index, :, scenario]
+        if not np.any(scores):
+            return [{"Score": 0, "Range": 0, demand_key: 0} for _ in scores]
+
+        self.load_scenario(scenario)
+        lca = self.mlca.lca
+        keys, amounts, production = self.activity_inputs(demand_key)
+        rows = np.array([product_index(lca, key) for key in keys], dtype=int)
+        if scenario is None:
+            amounts = amounts * demand[demand_key] / production
+        else:
+            # Take the amounts of the inputs from the scenario matrix
+            column = activity_index(lca, demand_key)
+            matrix = sparse.csc_matrix(lca.technosphere_matrix)
+            scale = demand[demand_key] / matrix[product_index(lca, demand_key), column]
+            amounts = matrix[rows, column].toarray().ravel() * scale * -1
+            keys = [key for key, amount in zip(keys, amounts) if amount != 0]
+            rows, amounts = rows[amounts != 0], amounts[amounts != 0]
+
+        contributions = amounts[:, None] * self.product_scores(scenario)[rows, :]
+        results = []
+        for method, score in enumerate(scores):
+            if score == 0:
+                # no need to calculate contributions to '0' score
+                results.append({"Score": 0, "Range": 0, demand_key: 0})
+                continue
+            data = {"Score": score}
+            nonzero = np.flatnonzero(contributions[:, method])
+            values = contributions[nonzero, method]
+            data.update(zip([keys[i] for i in nonzero], values.tolist()))
+            remainder = score - values.sum()
+            data[demand_key] = remainder
+            data["Range"] = np.abs(values).sum() + abs(remainder)
+            results.append(data)
+        return results
@@ -0,0 +1,243 @@
+"""
+Compiled evaluation of parameter and parameterized exchange formulas.
+
+Recalculating the parameterized exchanges through `ParameterSet` and the
+`Interpreter` parses and evaluates every formula again for each set of
+parameter values. Here the formulas are parsed once and placed in the order
+in which they can be evaluated, after which any number of parameter samples
+are recalculated at once by evaluating each formula over arrays of values.
+"""
+import ast
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from asteval import Interpreter
+
+from activity_browser.mod.bw2data.parameters import (MissingName, ParameterSet,
+                                                     get_new_symbols)
+
+from .utils import StaticParameters
+
+# Nodes of formulas that give the same result when evaluated over arrays as
+# when evaluated for each value separately
+ARRAY_NODES = (
+    ast.Module,
+    ast.Expr,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Call,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.UAdd,
+    ast.USub,
+)
+
+
+class Formula(NamedTuple):
+    text: str
+    node: Optional[ast.AST]  # None if the formula could not be parsed
+    symbols: frozenset  # Names used in the formula
+    vectorized: bool  # Formula can be evaluated over arrays of values
+
+
+class CompiledParameterSet(NamedTuple):
+    """Parameters of one group, in the order in which they are evaluated."""
+
+    needed: frozenset  # Names required from the enclosing parameters
+    # Name, column in the parameter values, formula and stored amount
+    order: List[Tuple[str, Optional[int], Optional[Formula], float]]
+
+    @classmethod
+    def empty(cls) -> "CompiledParameterSet":
+        return cls(frozenset(), [])
+
+
+class CompiledParameters(object):
+    """Formulas of all parameters and parameterized exchanges in the project,
+    compiled for repeated evaluation.
+
+    Parameters
+    ----------
+    initial : `StaticParameters`
+        Parameter data as stored in the database
+    columns : dict
+        Column of each (group, name) parameter in the arrays of parameter
+        values passed to `evaluate`
+
+    The parameterized exchanges are evaluated in the same order and scope as
+    in `ParameterManager.process_exchanges`.
+    """
+
+    def __init__(self, initial: StaticParameters, columns: Dict[tuple, int]):
+        self.interpreter = Interpreter()
+        self.columns = columns
+        self.project = self.compile_set(initial.project(), "project")
+        available = {name for name, *_ in self.project.order}
+        self.databases = {
+            db: self.compile_set(initial.by_database(db), db, available)
+            for db in initial.databases
+        }
+        self.groups = []
+        for p in initial.act_by_group_db:
+            database = self.databases.get(p.database, CompiledParameterSet.empty())
+            names = available.union(name for name, *_ in database.order)
+            self.groups.append(
+                (
+                    p.database,
+                    self.compile_set(initial.act_by_group(p.group), p.group, names),
+                    [self.compile(f) for f in initial.exc_by_group(p.group).values()],
+                )
+            )
+        self.size = sum(len(exchanges) for _, _, exchanges in self.groups)
+
+    def compile(self, text: str) -> Formula:
+        """Parse the formula and determine if it can be evaluated over arrays."""
+        try:
+            node = self.interpreter.parse(text)
+        except Exception:
+            # Evaluated as before, the interpreter reports the error
+            self.interpreter.error = []
+            return Formula(text, None, frozenset(), False)
+        nodes = list(ast.walk(node))
+        vectorized = (
+            len(node.body) == 1
+            and isinstance(node.body[0], ast.Expr)
+            and all(isinstance(n, ARRAY_NODES) for n in nodes)
+            and all(self._vectorized_node(n) for n in nodes)
+        )
+        symbols = frozenset(n.id for n in nodes if isinstance(n, ast.Name))
+        return Formula(text, node, symbols, vectorized)
+
+    def _vectorized_node(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, (int, float))
+        if isinstance(node, ast.Call):
+            # Only element-wise numpy functions such as `sqrt` or `exp`
+            return (
+                isinstance(node.func, ast.Name)
+                and not node.keywords
+                and isinstance(self.interpreter.symtable.get(node.func.id), np.ufunc)
+            )
+        return True
+
+    def compile_set(
+        self, data: dict, group: str, available: Optional[set] = None
+    ) -> CompiledParameterSet:
+        """Order the parameters of the group as `ParameterSet` would evaluate
+        them, names not defined in the group must be `available`.
+        """
+        if not data:
+            return CompiledParameterSet.empty()
+        needed = set()
+        if available is not None:
+            needed = get_new_symbols(data.values(), set(data))
+            missing = needed.difference(available)
+            if missing:
+                raise MissingName(
+                    "The following variables aren't defined:\n{}".format(
+                        "|".join(missing)
+                    )
+                )
+        order = ParameterSet(data, {name: 0 for name in needed} or None).order
+        return CompiledParameterSet(
+            frozenset(needed),
+            [
+                (
+                    name,
+                    self.columns.get((group, name)),
+                    (
+                        self.compile(data[name]["formula"])
+                        if data[name].get("formula")
+                        else None
+                    ),
+                    data[name].get("amount"),
+                )
+                for name in order
+                if name in data
+            ],
+        )
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        """Recalculate the parameterized exchanges for each row of parameter
+        `values`, returns an array of shape (samples, exchanges).
+        """
+        values = np.atleast_2d(values)
+        size = values.shape[0]
+        project = self.evaluate_set(self.project, {}, values)
+        databases = {
+            db: self.evaluate_set(params, project, values)
+            for db, params in self.databases.items()
+        }
+        result = np.empty((size, self.size))
+        offset = 0
+        for database, params, exchanges in self.groups:
+            combination = dict(project)
+            combination.update(databases.get(database, {}))
+            combination.update(self.evaluate_set(params, combination, values))
+            for formula in exchanges:
+                result[:, offset] = self.evaluate_formula(formula, combination, size)
+                offset += 1
+        return result
+
+    def evaluate_set(
+        self, params: CompiledParameterSet, available: dict, values: np.ndarray
+    ) -> dict:
+        symbols = {name: available[name] for name in params.needed}
+        for name, column, formula, amount in params.order:
+            if formula is not None:
+                symbols[name] = self.evaluate_formula(formula, symbols, len(values))
+            elif column is not None:
+                symbols[name] = values[:, column]
+            else:
+                symbols[name] = amount
+        return {name: symbols[name] for name, *_ in params.order}
+
+    def evaluate_formula(self, formula: Formula, symbols: dict, size: int):
+        """Evaluate the formula for all samples, values in `symbols` are either
+        scalars or arrays holding a value per sample.
+        """
+        scope = {name: symbols[name] for name in formula.symbols if name in symbols}
+        table = self.interpreter.symtable
+        # Parameters can shadow the builtins of the interpreter, like `e` or `pi`
+        previous = {name: table[name] for name in scope if name in table}
+        table.update(scope)
+        try:
+            if formula.vectorized:
+                self.interpreter.error = []
+                try:
+                    value = self.interpreter.run(formula.node, expr=formula.text)
+                    if np.ndim(value) == 0 or np.shape(value) == (size,):
+                        return value
+                except Exception:
+                    self.interpreter.error = []
+            # Evaluate the formula for one sample at a time
+            result = []
+            for i in range(size):
+                table.update(
+                    {
+                        name: value[i]
+                        for name, value in scope.items()
+                        if isinstance(value, np.ndarray)
+                    }
+                )
+                self.interpreter.error = []
+                value = self.interpreter.eval(formula.text, show_errors=False)
+                if self.interpreter.error:
+                    error = self.interpreter.error[0]
+                    raise (error.exc or ValueError)(
+                        f"Could not evaluate '{formula.text}': {error.msg}"
+                    )
+                result.append(value)
+            return np.array(result, dtype=float)
+        finally:
+            for name in scope:
+                del table[name]
+            table.update(previous)
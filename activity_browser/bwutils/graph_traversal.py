@@ -0,0 +1,168 @@
+"""
+Graph traversal of the supply chain from the technosphere and biosphere
+matrices of an LCA.
+
+Brightway's `GraphTraversal` solves the technosphere system for every node it
+assesses. The cumulative score of a node is the score of one unit of its
+product times the amount of product it supplies, so the scores of all nodes
+follow from a single solve of the transposed technosphere system. The
+traversal itself only walks the columns of the technosphere matrix.
+"""
+import warnings
+from heapq import heappop, heappush
+
+import numpy as np
+from scipy import sparse
+
+from activity_browser.mod import bw2data as bd
+
+from .batch import BatchSolver, activity_index
+
+
+class MatrixGraphTraversal(object):
+    """Traverses the supply chain of the given matrices, following paths of
+    greatest impact, with the same results as brightway's `GraphTraversal`.
+
+    The technosphere matrix is factorized once, every `calculate` only
+    requires one solve for the supply and one transposed solve for the
+    scores per unit of product.
+    """
+
+    def __init__(
+        self,
+        technosphere_matrix: sparse.spmatrix,
+        biosphere_matrix: sparse.spmatrix,
+        activity_dict: dict,
+    ):
+        # Copy the matrices, scenario values are written into the LCA matrices
+        self.technosphere_matrix = sparse.csc_matrix(technosphere_matrix, copy=True)
+        self.technosphere_matrix.sum_duplicates()
+        self.biosphere_matrix = sparse.csr_matrix(biosphere_matrix, copy=True)
+        self.diagonal = self.technosphere_matrix.diagonal()
+        self.activity_dict = dict(activity_dict)
+        self.solver = BatchSolver(self.technosphere_matrix)
+
+    @classmethod
+    def from_lca(cls, lca) -> "MatrixGraphTraversal":
+        """Traverse the current matrices of a brightway LCA object."""
+        return cls(lca.technosphere_matrix, lca.biosphere_matrix, lca.activity_dict)
+
+    def static_columns(self) -> set:
+        """Return the columns of activities from static databases, links from
+        these activities are not followed.
+        """
+        static = {name for name in bd.databases if bd.databases[name].get("static")}
+        if not static:
+            return set()
+        columns = set()
+        for key, col in self.activity_dict.items():
+            if not isinstance(key, tuple):
+                # bw25 compatibility uses activity ids
+                key = bd.get_activity(key).key
+            if key[0] in static:
+                columns.add(col)
+        return columns
+
+    def calculate(
+        self,
+        demand: dict,
+        characterization: np.ndarray,
+        cutoff: float = 0.005,
+        max_calc: float = 1e5,
+        skip_coproducts: bool = False,
+    ) -> dict:
+        """Traverse the supply chain graph of the demand.
+
+        `characterization` holds the characterization factor of every
+        biosphere flow. Returns the nodes, edges, number of assessed nodes
+        ('counter') and the total 'score' in the format of brightway's
+        `GraphTraversal`, without the LCA object.
+        """
+        demand_vector = np.zeros(self.technosphere_matrix.shape[0])
+        for key, amount in demand.items():
+            demand_vector[activity_index(self, key)] += amount
+        supply = self.solver.solve(demand_vector)
+        # Score of the direct flows of one unit of each activity
+        characterized_biosphere = self.biosphere_matrix.T @ characterization
+        score = float(characterized_biosphere @ supply)
+        if score == 0:
+            raise ValueError("Zero total LCA score makes traversal impossible")
+        # Score of one unit of each product, including the supply chain
+        unit_scores = self.solver.solve_transposed(characterized_biosphere)
+        cumulative = supply * self.diagonal * unit_scores
+        direct = characterized_biosphere * supply
+
+        nodes = {-1: {"amount": 1, "cum": score, "ind": 1e-6 * score}}
+        heap, edges = [], []
+        for key, amount in demand.items():
+            index = activity_index(self, key)
+            cum_score = float(cumulative[index])
+            heappush(heap, (abs(1 / cum_score), index))
+            nodes[index] = {
+                "amount": float(supply[index]),
+                "cum": cum_score,
+                "ind": float(direct[index]),
+            }
+            edges.append(
+                {
+                    "to": -1,
+                    "from": index,
+                    "amount": amount,
+                    "exc_amount": amount,
+                    "impact": cum_score * amount / float(supply[index]),
+                }
+            )
+
+        static = self.static_columns()
+        matrix = self.technosphere_matrix
+        counter = 0
+        while heap:
+            if counter >= max_calc:
+                warnings.warn("Stopping traversal due to calculation count.")
+                break
+            parent = heappop(heap)[1]
+            if parent in static:
+                continue
+            # Assume that this activity produces its reference product
+            scale = self.diagonal[parent]
+            if scale == 0:
+                raise ValueError(
+                    "Can't rescale activities that produce zero reference product"
+                )
+            start, end = matrix.indptr[parent], matrix.indptr[parent + 1]
+            for child, value in zip(
+                matrix.indices[start:end].tolist(), matrix.data[start:end].tolist()
+            ):
+                if child == parent:
+                    continue
+                # Technosphere values are negative for inputs
+                amount = -1 * value / scale
+                if skip_coproducts and amount <= 0:
+                    continue
+                counter += 1
+                cum_score = float(cumulative[child])
+                if abs(cum_score) < abs(score * cutoff):
+                    continue
+
+                flow = -1.0 * value * supply[parent]
+                total_output = self.diagonal[child] * supply[child]
+                edges.append(
+                    {
+                        "to": parent,
+                        "from": child,
+                        "amount": flow,
+                        "exc_amount": amount,
+                        "impact": flow / total_output * cum_score,
+                    }
+                )
+                # Keep multiple incoming edges, but add every node once
+                if child in nodes:
+                    continue
+                nodes[child] = {
+                    "amount": total_output,
+                    "cum": cum_score,
+                    "ind": float(direct[child]),
+                }
+                heappush(heap, (abs(1 / cum_score), child))
+
+        return {"nodes": nodes, "edges": edges, "counter": counter, "score": score}
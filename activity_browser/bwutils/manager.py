@@ -9,6 +9,8 @@ from stats_arrays import MCRandomNumberGenerator, UncertaintyBase
 from activity_browser.mod.bw2data.backends import ExchangeDataset
 from activity_browser.mod.bw2data.parameters import *
 
+from .formulas import CompiledParameters
+from .metadata import AB_metadata
 from .utils import Index, Indices, Parameters, StaticParameters
 
 
@@ -21,19 +23,33 @@ class ParameterManager(object):
         self.parameters: Parameters = Parameters.from_bw_parameters()
         self.initial: StaticParameters = StaticParameters()
         self.indices: Indices = self.construct_indices()
+        self.formulas = CompiledParameters(
+            self.initial,
+            {(p.group, p.name): i for i, p in enumerate(self.parameters)},
+        )
 
     def construct_indices(self) -> Indices:
         """Given that ParameterizedExchanges will always have the same order of
         indices, construct them once and reuse when needed.
         """
-        indices = Indices()
-        for p in self.initial.act_by_group_db:
-            params = self.initial.exc_by_group(p.group)
-            indices.extend(
-                Index.build_from_exchange(ExchangeDataset.get_by_id(pk))
-                for pk in params
-            )
-        return indices
+        ids = [
+            pk
+            for p in self.initial.act_by_group_db
+            for pk in self.initial.exc_by_group(p.group)
+        ]
+        # Read the exchanges in chunks instead of one query per exchange
+        exchanges = {}
+        for chunk in AB_metadata.chunks(ids):
+            query = ExchangeDataset.select(
+                ExchangeDataset.id,
+                ExchangeDataset.input_database,
+                ExchangeDataset.input_code,
+                ExchangeDataset.output_database,
+                ExchangeDataset.output_code,
+                ExchangeDataset.type,
+            ).where(ExchangeDataset.id << chunk)
+            exchanges.update((exc.id, exc) for exc in query)
+        return Indices(Index.build_from_exchange(exchanges[pk]) for pk in ids)
 
     def recalculate_project_parameters(self) -> dict:
         data = self.initial.project()
@@ -158,10 +174,26 @@ class ParameterManager(object):
         All parameter types are recalculated in turn before interpreting the
         ParameterizedExchange formulas into amounts.
         """
-        global_project = self.recalculate_project_parameters()
-        all_db = self.process_database_parameters(global_project)
-        data = self.process_exchanges(global_project, all_db)
-        return data
+        return self.calculate_samples(self.values())[0]
+
+    def calculate_samples(self, values: np.ndarray) -> np.ndarray:
+        """Recalculate the ParameterizedExchanges for each row in the
+        (samples, parameters) array of parameter `values`, columns follow the
+        order of `parameters`.
+
+        Gives the same amounts as `process_exchanges` does for each sample,
+        but evaluates each formula once for all samples.
+        """
+        return self.formulas.evaluate(values)
+
+    def values(self) -> np.ndarray:
+        """The current amounts of the parameters, in the order of `parameters`."""
+        return np.array([p.amount for p in self.parameters], dtype=float)
+
+    def set_values(self, values: np.ndarray) -> None:
+        """Replace the amounts of the parameters, NaN values are skipped."""
+        keys = [(p.group, p.name) for p in self.parameters]
+        self.parameters.update(dict(zip(keys, values)))
 
     @abstractmethod
     def recalculate(self, values: dict[str, float]) -> np.ndarray:
@@ -206,8 +238,13 @@ class ParameterManager(object):
         Side-note on presamples: Presamples was used in AB for calculating scenarios,
         presamples was superseded by this implementation. For more reading:
         https://presamples.readthedocs.io/en/latest/index.html"""
-        sample_data = [self.ps_recalculate(values.to_dict()) for _, values in scenarios]
-        samples = np.concatenate(sample_data, axis=1)
+        # Scenarios are applied in turn, so parameters without a value in a
+        # scenario keep the value of the previous scenario.
+        scenario_values = []
+        for _, values in scenarios:
+            self.parameters.update(values.to_dict())
+            scenario_values.append(self.values())
+        samples = self.calculate_samples(np.vstack(scenario_values)).T
         indices = self.reformat_indices()
         return samples, indices
 
@@ -318,15 +355,14 @@ class MonteCarloParameterManager(ParameterManager, Iterator):
         # Construct indices, prepare sized array and sample parameter
         # uncertainty distributions `interations` times.
         all_data = np.empty((iterations, len(self.indices)), dtype=Indices.array_dtype)
-        random_bounded_values = self.mc_generator.generate(iterations)
+        random_bounded_values = self.mc_generator.generate(iterations).T
 
-        # Now, repeatedly replace parameter amounts with sampled data and
-        # recalculate. Every processed row is added to the sized array.
+        # Recalculate all samples at once, every processed row is added to
+        # the sized array.
+        data = self.calculate_samples(random_bounded_values)
         for i in range(iterations):
-            values = random_bounded_values.take(i, axis=1)
-            self.parameters.update(values)
-            data = self.calculate()
-            all_data[i] = self.indices.mock_params(data)
+            all_data[i] = self.indices.mock_params(data[i])
+        self.set_values(random_bounded_values[-1])
 
         return all_data
 
@@ -334,11 +370,22 @@ class MonteCarloParameterManager(ParameterManager, Iterator):
         """Similar to `recalculate` but only performs a single sampling and
         recalculation.
         """
-        values = self.mc_generator.next()
-        keys = [(p.group, p.name) for p in self.parameters]
-        self.parameters.update({key: value for key, value in zip(keys, values)})
-        data = self.calculate()
-        return self.indices.mock_params(data)
+        return self.indices.mock_params(self.sample())
+
+    def sample(self) -> np.ndarray:
+        """Sample the parameters once and return the recalculated amounts of
+        the parameterized exchanges, in the order of `indices`.
+        """
+        self.set_values(self.mc_generator.next())
+        return self.calculate()
+
+    def draw(self, size: int) -> np.ndarray:
+        """Sample the parameters `size` times, returns a (size, parameters)
+        array of values for `calculate_samples`.
+
+        The values are equal to those of `size` consecutive calls to `sample`.
+        """
+        return np.vstack([self.mc_generator.next() for _ in range(size)])
 
     def retrieve_sampled_values(self, data: dict):
         """Enters the sampled values into the 'exchanges' list in the 'data'
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
+import os
+import pickle
 from logging import getLogger
+from numbers import Integral
+from typing import Iterable, Iterator, Optional
 
-import numpy as np
 import pandas as pd
-from bw2data.errors import UnknownObject
+from bw2data.filesystem import safe_filename
 
 import activity_browser.bwutils.commontasks as bc
 from activity_browser.mod import bw2data as bd
 from activity_browser.mod.bw2data.backends import ActivityDataset
+from activity_browser.signals import qmetadata
+
+from .search import SearchIndex
 
 # todo: extend store over several projects
 
@@ -18,6 +24,15 @@ def list_to_tuple(x) -> tuple:
     return tuple(x) if isinstance(x, list) else x
 
 
+def fill_missing(df: pd.DataFrame) -> None:
+    """Replace missing values with empty strings, only the columns that hold
+    missing values are touched.
+    """
+    missing = df.columns[df.isna().any()]
+    if len(missing):
+        df[missing] = df[missing].fillna("")
+
+
 class MetaDataStore(object):
     """A container for technosphere and biosphere metadata during an AB session.
 
@@ -46,13 +61,37 @@ class MetaDataStore(object):
     # To show these columns in `ActivitiesBiosphereModel`,
     # add them to `self.act_fields` there and `CLASSIFICATION_SYSTEMS` below
     CLASSIFICATION_SYSTEMS = ["ISIC rev.4 ecoinvent"]
+    # Directory in the project folder holding the metadata of each database
+    CACHE_DIRECTORY = "ab_metadata"
+
+    # Maximum number of values matched by a single query condition
+    QUERY_SIZE = 500
 
     def __init__(self):
-        self.dataframe = pd.DataFrame()
+        self._dataframe = pd.DataFrame()
         self.databases = set()
+        # Keys of the activities that changed since the last update, in order
+        self.pending = {}
+        # Search index of each database and set of searched fields
+        self.search_indexes = {}
+        # Key of each activity id that was looked up
+        self.id_keys = {}
 
         bd.projects.current_changed.connect(self.reset_metadata)
         bd.databases.metadata_changed.connect(self.check_databases)
+        qmetadata.updates_pending.connect(self.apply_updates)
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """The metadata of all added databases, pending updates are applied
+        before it is returned.
+        """
+        self.apply_updates()
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, df: pd.DataFrame) -> None:
+        self._dataframe = df
 
     def add_metadata(self, db_names_list: list) -> None:
         """Include data from the brightway databases.
@@ -76,9 +115,9 @@ class MetaDataStore(object):
             return
 
         dfs = list()
-        dfs.append(self.dataframe)
+        dfs.append(self._dataframe)
         log.debug(
-            f"Current shape and databases in the MetaDataStore: {self.dataframe.shape} {self.databases}"
+            f"Current shape and databases in the MetaDataStore: {self._dataframe.shape} {self.databases}"
         )
         for db_name in new:
             if db_name not in bd.databases:
@@ -87,97 +126,277 @@ class MetaDataStore(object):
             log.debug(f"Adding: {db_name}")
             self.databases.add(db_name)
 
-            # make a temporary DataFrame and index it by ('database', 'code') (like all brightway activities)
-            df = pd.DataFrame(bd.Database(db_name))
-            df["key"] = df.loc[:, ["database", "code"]].apply(tuple, axis=1)
-            df.index = pd.MultiIndex.from_tuples(df["key"])
-
-            # add unpacked classifications columns if classifications are present
-            if "classifications" in df.columns:
-                df = self.unpack_classifications(df, self.CLASSIFICATION_SYSTEMS)
-
-            # In a new 'biosphere3' database, some categories values are lists
-            if "categories" in df.columns:
-                df["categories"] = df.loc[:, "categories"].apply(list_to_tuple)
+            df = self.read_cache(db_name)
+            if df is None:
+                df = self.prepare_metadata(self.load_database(db_name))
+                self.write_cache(db_name, df)
 
             dfs.append(df)
 
         # add this metadata to already existing metadata
-        self.dataframe = pd.concat(dfs, sort=False)
-        self.dataframe.replace(
-            np.nan, "", regex=True, inplace=True
-        )  # replace 'nan' values with emtpy string
+        self._dataframe = pd.concat(dfs, sort=False)
+        fill_missing(self._dataframe)  # replace 'nan' values with empty string
         # print('Dimensions of the Metadata:', self.dataframe.shape)
 
+    def prepare_metadata(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Unpack the classifications and make the categories hashable."""
+        # add unpacked classifications columns if classifications are present
+        if "classifications" in df.columns:
+            df = self.unpack_classifications(df, self.CLASSIFICATION_SYSTEMS)
+
+        # In a new 'biosphere3' database, some categories values are lists
+        if "categories" in df.columns:
+            df["categories"] = df.loc[:, "categories"].apply(list_to_tuple)
+        return df
+
+    @classmethod
+    def load_database(cls, db_name: str) -> pd.DataFrame:
+        """Read the metadata of all activities in the database.
+
+        All activities are read in a single query and their data is unpickled
+        directly, without constructing an `Activity` for each of them.
+        """
+        return cls.read_activities([ActivityDataset.database == db_name])
+
+    @classmethod
+    def load_activities(cls, keys: list) -> pd.DataFrame:
+        """Read the metadata of the activities with the given keys, activities
+        that do not exist are left out.
+        """
+        return cls.read_activities(
+            cls.key_conditions(keys, ActivityDataset.database, ActivityDataset.code)
+        )
+
+    @classmethod
+    def load_keys(cls, ids: list) -> dict:
+        """Return the key of each of the given activity ids that exists."""
+        keys = {}
+        for chunk in cls.chunks(ids):
+            query = ActivityDataset.select(
+                ActivityDataset.id, ActivityDataset.database, ActivityDataset.code
+            ).where(ActivityDataset.id << chunk)
+            keys.update((id, (database, code)) for id, database, code in query.tuples())
+        return keys
+
+    @classmethod
+    def chunks(cls, values: list) -> Iterator[list]:
+        """Split the values into chunks of at most QUERY_SIZE values, so each
+        chunk can be matched in a single query.
+        """
+        for i in range(0, len(values), cls.QUERY_SIZE):
+            yield values[i : i + cls.QUERY_SIZE]
+
+    @classmethod
+    def key_conditions(cls, keys: Iterable[tuple], database, code) -> list:
+        """Return the query conditions matching the given (database, code)
+        keys on the `database` and `code` fields of a dataset.
+
+        The codes of each database are matched in chunks of at most
+        QUERY_SIZE codes per condition.
+        """
+        codes = {}
+        for db_name, key_code in keys:
+            codes.setdefault(db_name, []).append(key_code)
+        return [
+            (database == db_name) & (code << chunk)
+            for db_name, db_codes in codes.items()
+            for chunk in cls.chunks(db_codes)
+        ]
+
+    @staticmethod
+    def read_activities(conditions: list) -> pd.DataFrame:
+        """Read the activities matching each of the query conditions.
+
+        Returns a DataFrame indexed by ('database', 'code'), like all
+        brightway activities.
+        """
+        rows = []
+        for condition in conditions:
+            query = ActivityDataset.select(
+                ActivityDataset.id,
+                ActivityDataset.database,
+                ActivityDataset.code,
+                ActivityDataset.data,
+            ).where(condition)
+            # Execute the query directly to receive the pickled data as-is
+            rows.extend(ActivityDataset._meta.database.execute(query).fetchall())
+        ids, databases, codes, data = zip(*rows) if rows else ((), (), (), ())
+
+        df = pd.DataFrame([pickle.loads(bytes(d)) for d in data])
+        # Like `Activity`, the columns in the table take precedence over the data
+        df["code"] = codes
+        df["database"] = databases
+        if os.environ.get("AB_BW25"):
+            df["id"] = ids
+        df["key"] = list(zip(databases, codes))
+        df.index = pd.MultiIndex.from_arrays([list(databases), list(codes)])
+        return df
+
+    @classmethod
+    def cache_path(cls, db_name: str) -> str:
+        """Path of the metadata cache of the database in the current project."""
+        return os.path.join(
+            bd.projects.dir, cls.CACHE_DIRECTORY, safe_filename(db_name) + ".pickle"
+        )
+
+    def read_cache(self, db_name: str) -> Optional[pd.DataFrame]:
+        """Return the cached metadata of the database.
+
+        Returns None if there is no cache or if the database was modified
+        after the cache was written.
+        """
+        modified = bd.databases[db_name].get("modified")
+        path = self.cache_path(db_name)
+        if modified is None or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            log.debug(f"Could not read metadata cache of {db_name}: {e}")
+            return None
+        if cache.get("modified") != modified:
+            log.debug(f"Metadata cache of {db_name} is outdated")
+            return None
+        log.debug(f"Read metadata of {db_name} from cache")
+        return cache["metadata"]
+
+    def write_cache(self, db_name: str, df: pd.DataFrame) -> None:
+        """Store the metadata of the database with its modification time."""
+        modified = bd.databases[db_name].get("modified")
+        if modified is None:
+            return
+        path = self.cache_path(db_name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                pickle.dump(
+                    {"modified": modified, "metadata": df},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+        except OSError as e:
+            log.warning(f"Could not write metadata cache of {db_name}: {e}")
+
+    def remove_cache(self, db_name: str) -> None:
+        path = self.cache_path(db_name)
+        if os.path.isfile(path):
+            os.remove(path)
+
     def update_metadata(self, key: tuple) -> None:
-        """Update metadata when an activity has changed.
+        """Register that an activity has been added, modified or deleted.
 
-        Three situations:
-        1. An activity has been deleted.
-        2. Activity data has been modified.
-        3. An activity has been added.
-           Note that duplicating activities is the same as adding a new activity.
+        Updates are collected and applied together when the event loop wakes,
+        or earlier if the metadata is read before that.
 
         Parameters
         ----------
         key : tuple
             The specific activity to update in the MetaDataStore
         """
-        try:
-            act = bd.get_activity(
-                key
-            )  # if this does not work, it has been deleted (see except:).
-        except (UnknownObject, ActivityDataset.DoesNotExist):
-            # Situation 1: activity has been deleted (metadata needs to be deleted)
-            log.debug(f"Deleting activity from metadata: {key}")
-            self.dataframe.drop(key, inplace=True, errors="ignore")
-            # print('Dimensions of the Metadata:', self.dataframe.shape)
+        self.pending[key] = None
+        qmetadata.emitLater("updates_pending")
+
+    def apply_updates(self) -> None:
+        """Apply all pending activity updates to the metadata at once.
+
+        Three situations:
+        1. An activity has been deleted.
+        2. Activity data has been modified.
+        3. An activity has been added.
+           Note that duplicating activities is the same as adding a new activity.
+        """
+        if not self.pending:
             return
+        keys, self.pending = list(self.pending), {}
+        df = self._dataframe
+        found = self.load_activities(keys)
+
+        # Situation 1: activities that no longer exist are deleted
+        deleted = set(keys).difference(found["key"])
+        if deleted:
+            log.debug(f"Deleting {len(deleted)} activities from metadata")
+            df = df.drop(list(deleted), errors="ignore")
+
+        # Databases that have not been added yet are added as a whole
+        new_dbs = set(found["database"]).difference(self.databases)
+        found = self.prepare_metadata(found)
+        found = found[~found["database"].isin(new_dbs)]
+
+        # Situation 2: activities that have been modified are updated in place,
+        # only the existing columns are updated
+        modified = found.index.isin(df.index)
+        if modified.any():
+            log.debug(f"Updating {modified.sum()} activities in metadata")
+            update = found[modified].reindex(columns=df.columns)
+            fill_missing(update)
+            df = pd.concat([df.drop(update.index), update], sort=False).reindex(
+                df.index
+            )
+
+        # Situation 3: activities that have been added are appended
+        if not modified.all():
+            log.debug(f"Adding {(~modified).sum()} activities to metadata")
+            df = pd.concat([df, found[~modified]], sort=False)
+            fill_missing(df)  # replace 'nan' values with empty string
 
-        db = key[0]
-        if db not in self.databases:
-            # print('Database has not been added to metadata.')
-            self.add_metadata([db])
-        else:
-            if (
-                key in self.dataframe.index
-            ):  # Situation 2: activity has been modified (metadata needs to be updated)
-                log.debug(f"Updating activity in metadata: {key}")
-                for col in self.dataframe.columns:
-                    if col in self.CLASSIFICATION_SYSTEMS:
-                        # update classification data
-                        classification = self._unpacker(
-                            classifications=[act.get('classifications', '')],
-                            system=col)
-                        self.dataframe.at[key, col] = classification[0]
-                    else:
-                        self.dataframe.at[key, col] = act.get(col, '')
-                self.dataframe.at[key, 'key'] = act.key
-
-            else:  # Situation 3: Activity has been added to database (metadata needs to be generated)
-                log.debug(f'Adding activity to metadata: {key}')
-                df_new = pd.DataFrame([act.as_dict()], index=pd.MultiIndex.from_tuples([act.key]))
-                df_new['key'] = [act.key]
-                if act.get('classifications', False):  # add classification data if present
-                    df_new = self.unpack_classifications(df_new, self.CLASSIFICATION_SYSTEMS)
-                self.dataframe = pd.concat([self.dataframe, df_new], sort=False)
-                self.dataframe.replace(
-                    np.nan, "", regex=True, inplace=True
-                )  # replace 'nan' values with emtpy string
-            # print('Dimensions of the Metadata:', self.dataframe.shape)
+        self._dataframe = df
+        self.update_search_indexes(deleted, found.index)
+        if new_dbs:
+            self.add_metadata(new_dbs)
+
+    def search(self, db_name: str, pattern: str, fields: list) -> list:
+        """Return the keys of the activities in the database for which any of
+        the fields contains the pattern, ignoring case.
+
+        The search index of the database and fields is built on the first
+        search and kept up to date with the metadata afterwards.
+        """
+        self.apply_updates()
+        index = self.search_indexes.get((db_name, tuple(fields)))
+        if index is None:
+            df = self.get_database_metadata(db_name)
+            if df.empty:
+                return []
+            index = SearchIndex(df, fields)
+            self.search_indexes[(db_name, tuple(fields))] = index
+        return index.search(pattern)
+
+    def update_search_indexes(self, deleted: set, changed: pd.Index) -> None:
+        """Remove the deleted activities from the search indexes and replace
+        the rows of the changed activities.
+        """
+        if not self.search_indexes:
+            return
+        df = self._dataframe.loc[changed]
+        for (db_name, _), index in self.search_indexes.items():
+            index.remove(key for key in deleted if key[0] == db_name)
+            index.update(df[df["database"] == db_name])
 
     def reset_metadata(self) -> None:
-        """Deletes metadata when the project is changed."""
+        """Deletes metadata when the project is changed.
+
+        The metadata of the new project is read from its cache when required.
+        """
         # todo: metadata could be collected across projects...
         log.debug("Reset metadata.")
         self.dataframe = pd.DataFrame()
         self.databases = set()
+        self.pending = {}
+        self.search_indexes = {}
+        self.id_keys = {}
 
     def check_databases(self):
         removed_dbs = [db for db in self.databases if db not in bd.databases]
         for db in removed_dbs:
             self.dataframe.drop(self.dataframe[self.dataframe.database == db].index, inplace=True)
             self.databases.remove(db)
+            self.remove_cache(db)
+        self.search_indexes = {
+            (db, fields): index
+            for (db, fields), index in self.search_indexes.items()
+            if db in self.databases
+        }
 
     def get_existing_fields(self, field_list: list) -> list:
         """Return a list of fieldnames that exist in the current dataframe."""
@@ -193,6 +412,25 @@ class MetaDataStore(object):
         df = self.dataframe.loc[pd.IndexSlice[keys], :]
         return df.reindex(columns, axis="columns")
 
+    def get_keys(self, ids: list) -> dict:
+        """Return the key of each of the activity ids, ids that were not
+        looked up before are read from the database at once.
+        """
+        missing = list({i for i in ids if i not in self.id_keys})
+        if missing:
+            self.id_keys.update(self.load_keys(missing))
+        return {i: self.id_keys[i] for i in ids}
+
+    def ids_to_keys(self, values: list) -> list:
+        """Return the key of each activity id in the list, other values, like
+        keys, are returned as-is.
+
+        Brightway 2.5 identifies activities in the matrices by their id.
+        """
+        ids = [v for v in values if isinstance(v, Integral)]
+        keys = self.get_keys(ids) if ids else {}
+        return [keys[v] if isinstance(v, Integral) else v for v in values]
+
     def get_database_metadata(self, db_name: str) -> pd.DataFrame:
         """Return a slice of the dataframe matching the database.
 
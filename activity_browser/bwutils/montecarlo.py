@@ -1,22 +1,256 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from tempfile import TemporaryFile
 from time import time
-from typing import Optional, Union
+from uuid import uuid4
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 from logging import getLogger
 
 import bw2calc as bc
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from stats_arrays import MCRandomNumberGenerator
 
 from activity_browser.mod import bw2data as bd
 
+from .batch import batch_calculation, data_offsets, demand_matrix, include_entries
 from .manager import MonteCarloParameterManager
+from .pool import process_pool, worker
 
 log = getLogger(__name__)
 
 
+class MonteCarloBlock(NamedTuple):
+    """Results and samples of a block of Monte Carlo iterations."""
+
+    start: int  # Index of the first iteration of the block
+    results: np.ndarray  # (iterations, reference flows, methods)
+    tech_samples: np.ndarray  # float32 (iterations, varying technosphere params)
+    bio_samples: np.ndarray  # float32 (iterations, varying biosphere params)
+    tech_vector: np.ndarray  # (technosphere params) of the last iteration
+    bio_vector: np.ndarray  # (biosphere params) of the last iteration
+    cf_samples: List[np.ndarray]  # (iterations, characterization params) per method
+
+
+class MonteCarloSampler(object):
+    """Draws and calculates blocks of Monte Carlo iterations.
+
+    Samples are written directly into the data arrays of the technosphere
+    and biosphere matrices. Each iteration solves all reference flows at once
+    and scores them for all methods with a single matrix product. The
+    sampler only holds arrays, so it can be sent to worker processes.
+
+    Only the samples of the `tech_columns` and `bio_columns` params are
+    returned for each iteration, by default those of all params, as float32
+    to keep the blocks small when they are sent between processes.
+
+    The technosphere, biosphere and characterization params are given as
+    params arrays to sample from, or as arrays of static amounts if their
+    uncertainty is not included.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        lca,
+        tech_params: np.ndarray,
+        bio_params: np.ndarray,
+        cf_params: List[np.ndarray],
+        cf_rows: List[np.ndarray],
+        demand: np.ndarray,
+    ):
+        self.seed = seed
+        self.params = [tech_params, bio_params] + cf_params
+        self.cf_rows = cf_rows
+        self.demand = demand
+        self.biosphere_size = len(lca.biosphere_dict)
+        self.tech_columns = np.arange(len(lca.tech_params))
+        self.bio_columns = np.arange(len(lca.bio_params))
+
+        # Resolve where each sampled exchange is stored in the matrices
+        tech_params, bio_params = lca.tech_params, lca.bio_params
+        self.technosphere_matrix = include_entries(
+            lca.technosphere_matrix, tech_params["row"], tech_params["col"]
+        )
+        self.tech_offsets = data_offsets(
+            self.technosphere_matrix, tech_params["row"], tech_params["col"]
+        )
+        # Technosphere inputs are stored as negative values in the matrix
+        self.tech_signs = np.where(tech_params["type"] == 1, -1.0, 1.0)
+        self.biosphere_matrix = include_entries(
+            lca.biosphere_matrix, bio_params["row"], bio_params["col"]
+        )
+        self.bio_offsets = data_offsets(
+            self.biosphere_matrix, bio_params["row"], bio_params["col"]
+        )
+
+    def block_seed(self, block: int, stream: int) -> int:
+        """Seed of a random number generator for the given block, independent
+        of how the blocks are divided over processes.
+        """
+        return int(
+            np.random.SeedSequence([self.seed, block, stream]).generate_state(1)[0]
+        )
+
+    def draw_samples(self, block: int, size: int) -> List[np.ndarray]:
+        """Draw a (size, params) array from each params array with a random
+        number generator seeded for the block, or repeat the static amounts if
+        uncertainty is not included.
+        """
+        samples = []
+        for stream, params in enumerate(self.params):
+            if params.dtype.names is None:
+                samples.append(np.tile(params, (size, 1)))
+                continue
+            rng = MCRandomNumberGenerator(params, seed=self.block_seed(block, stream))
+            data = rng.generate(size).reshape(rng.length, size)
+            samples.append(np.ascontiguousarray(data.T))
+        return samples
+
+    @staticmethod
+    def build_matrix(matrix, offsets: np.ndarray, vector: np.ndarray):
+        """Return a new matrix with the sparsity structure of `matrix` and
+        the values in `vector`, duplicate exchanges are summed.
+        """
+        data = np.bincount(offsets, weights=vector, minlength=matrix.nnz)
+        return matrix.__class__((data, matrix.indices, matrix.indptr), matrix.shape)
+
+    def technosphere(self, vector: np.ndarray):
+        return self.build_matrix(
+            self.technosphere_matrix, self.tech_offsets, vector * self.tech_signs
+        )
+
+    def biosphere(self, vector: np.ndarray):
+        return self.build_matrix(self.biosphere_matrix, self.bio_offsets, vector)
+
+    def characterization(self, cf_vectors: List[np.ndarray]) -> np.ndarray:
+        """Collapse the CF vectors of all methods into a (methods, biosphere) array."""
+        return np.vstack(
+            [
+                np.bincount(rows, weights=vector, minlength=self.biosphere_size)
+                for rows, vector in zip(self.cf_rows, cf_vectors)
+            ]
+        )
+
+    def calculate(
+        self, block: int, start: int, size: int, overrides: Optional[list] = None
+    ) -> MonteCarloBlock:
+        """Calculate `size` iterations, starting at iteration `start`.
+
+        The `overrides` hold the sampled parameterized exchanges of each
+        iteration, as returned by `MonteCarloLCA.parameter_overrides`.
+        """
+        tech_samples, bio_samples, *cf_samples = self.draw_samples(block, size)
+        results = np.zeros((size, self.demand.shape[1], len(self.cf_rows)))
+        for i in range(size):
+            if overrides is not None:
+                (tech_idx, tech_values), (bio_idx, bio_values) = overrides[i]
+                tech_samples[i, tech_idx] = tech_values
+                bio_samples[i, bio_idx] = bio_values
+            # the same CF vector is used for each FU in a given run
+            results[i] = batch_calculation(
+                self.technosphere(tech_samples[i]),
+                self.biosphere(bio_samples[i]),
+                self.demand,
+                self.characterization([samples[i] for samples in cf_samples]),
+            ).scores
+        return MonteCarloBlock(
+            start,
+            results,
+            tech_samples[:, self.tech_columns].astype(np.float32),
+            bio_samples[:, self.bio_columns].astype(np.float32),
+            tech_samples[-1],
+            bio_samples[-1],
+            cf_samples,
+        )
+
+
+def exchange_keys(array: np.ndarray, with_type: bool = True) -> np.ndarray:
+    """Combine the matrix row, column and (optionally) type of the exchanges
+    in a params array into a single integer key per exchange.
+    """
+    keys = (array["row"].astype(np.uint64) << np.uint64(40)) | (
+        array["col"].astype(np.uint64) << np.uint64(8)
+    )
+    if with_type:
+        keys |= array["type"].astype(np.uint64)
+    return keys
+
+
+def match_params(
+    params: np.ndarray, exchanges: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Match the exchanges on their row, column and type against a `tech_params`
+    or `bio_params` array.
+
+    Returns the positions of the exchanges in `params` and a mask of the
+    exchanges that were found.
+    """
+    keys = exchange_keys(params)
+    order = np.argsort(keys, kind="stable")
+    wanted = exchange_keys(exchanges)
+    found = np.searchsorted(keys[order], wanted).clip(max=max(len(keys) - 1, 0))
+    mask = keys[order][found] == wanted if len(keys) else np.zeros(len(wanted), bool)
+    return order[found[mask]], mask
+
+
+class SampleStore(object):
+    """Compact storage of the values a `tech_params` or `bio_params` array took
+    in each Monte Carlo iteration.
+
+    Only the `columns` (params) that vary between iterations are stored, as a
+    float32 (iterations, columns) array which is optionally memory-mapped to
+    a temporary file. The other params keep the values of the first iteration.
+    """
+
+    def __init__(self, iterations: int, columns: np.ndarray, memmap: bool = False):
+        self.columns = np.unique(columns)
+        self.static: Optional[np.ndarray] = None
+        shape = (iterations, len(self.columns))
+        if memmap and iterations and len(self.columns):
+            self.samples = np.memmap(TemporaryFile(), np.float32, "w+", shape=shape)
+        else:
+            self.samples = np.zeros(shape, dtype=np.float32)
+
+    def store(self, start: int, samples: np.ndarray, vector: np.ndarray) -> None:
+        """Store the (iterations, columns) samples of a block.
+
+        The values of the other params are the same in every iteration, these
+        are taken from the full params `vector` of any of the iterations.
+        """
+        if self.static is None:
+            self.static = vector.copy()
+        self.samples[start : start + len(samples)] = samples
+
+    def values(self, positions: np.ndarray) -> np.ndarray:
+        """Return the (iterations, positions) values of the params at the given
+        positions.
+        """
+        values = np.tile(self.static[positions], (len(self.samples), 1))
+        stored = np.searchsorted(self.columns, positions)
+        mask = stored < len(self.columns)
+        mask[mask] = self.columns[stored[mask]] == positions[mask]
+        values[:, mask] = self.samples[:, stored[mask]]
+        return values
+
+
 class MonteCarloLCA(object):
-    """A Monte Carlo LCA for multiple reference flows and methods loaded from a calculation setup."""
+    """A Monte Carlo LCA for multiple reference flows and methods loaded from a calculation setup.
+
+    Iterations are calculated in blocks of `block_size` by a `MonteCarloSampler`,
+    optionally in a pool of worker processes.
+    """
+
+    block_size = 100
 
     def __init__(self, cs_name):
         if cs_name not in bd.calculation_setups:
@@ -57,14 +291,19 @@ class MonteCarloLCA(object):
         self.rev_method_index = {i: m for i, m in enumerate(self.methods)}
 
         # GSA calculation variables
-        self.A_matrices = list()
-        self.B_matrices = list()
+        self.tech_samples: Optional[SampleStore] = None
+        self.bio_samples: Optional[SampleStore] = None
         self.CF_dict = defaultdict(list)
         self.parameter_exchanges = list()
         self.parameters = list()
         self.parameter_data = defaultdict(dict)
 
         self.results = list()
+        self.completed = 0
+        self.parameter_time = 0.0
+        self.iterations_per_second = None
+        self.run_id: Optional[str] = None  # Identifies the results of a run
+        self.sampler: Optional[MonteCarloSampler] = None
 
         self.lca = bc.LCA(demand=self.func_units_dict, method=self.methods[0])
 
@@ -117,6 +356,7 @@ class MonteCarloLCA(object):
             else self.lca.bio_params["amount"].copy()
         )
 
+        cf_rows, cf_params = [], []
         if self.lca.lcia:
             self.cf_rngs = (
                 {}
@@ -124,14 +364,19 @@ class MonteCarloLCA(object):
             for m in self.methods:
                 self.lca.switch_method(m)
                 self.lca.load_lcia_data()
+                cf_rows.append(self.lca.cf_params["row"].copy())
                 self.cf_rngs[m] = (
                     MCRandomNumberGenerator(self.lca.cf_params, seed=self.seed)
                     if self.include_cfs
                     else self.lca.cf_params["amount"].copy()
                 )
+                cf_params.append(
+                    self.lca.cf_params.copy() if self.include_cfs else self.cf_rngs[m]
+                )
         # Construct the MC parameter manager
         if self.include_parameters:
             self.param_rng = MonteCarloParameterManager(seed=self.seed)
+            self.load_parameter_positions()
 
         (
             self.lca.activity_dict_rev,
@@ -139,9 +384,98 @@ class MonteCarloLCA(object):
             self.lca.biosphere_dict_rev,
         ) = self.lca.reverse_dict()
 
-    def calculate(self, iterations=10, seed: int = None, **kwargs):
+        # The sampler draws the samples of each block with its own generators
+        self.sampler = MonteCarloSampler(
+            self.seed,
+            self.lca,
+            self.lca.tech_params if self.include_technosphere else self.tech_rng,
+            self.lca.bio_params if self.include_biosphere else self.bio_rng,
+            cf_params,
+            cf_rows,
+            demand_matrix(self.lca, self.func_units),
+        )
+
+    def load_parameter_positions(self) -> None:
+        """Resolve where the parameterized exchanges are found in the
+        `tech_params` and `bio_params` arrays, these positions are the same
+        for every iteration.
+        """
+        # Convert the input/output keys into row/col keys, the amount of each
+        # exchange is set to its position in the parameter manager indices
+        # to track which exchanges are in the LCA matrices.
+        indices = self.param_rng.indices
+        self.param_template = self.unify_param_exchanges(
+            indices.mock_params(np.arange(len(indices)))
+        )
+        self.param_sources = self.param_template["amount"].astype(int)
+
+        # Match the technosphere and biosphere subsets against the tech_ and bio_params
+        tech = np.flatnonzero(np.isin(self.param_template["type"], [0, 1]))
+        self.tech_param_positions, found = match_params(
+            self.lca.tech_params, self.param_template[tech]
+        )
+        self.tech_param_sources = self.param_sources[tech[found]]
+        bio = np.flatnonzero(self.param_template["type"] == 2)
+        self.bio_param_positions, found = match_params(
+            self.lca.bio_params, self.param_template[bio]
+        )
+        self.bio_param_sources = self.param_sources[bio[found]]
+
+    def parameter_overrides(self, size: int) -> list:
+        """Sample the parameters for `size` iterations and return, for each
+        iteration, the positions in and values for the technosphere and
+        biosphere sample vectors of the parameterized exchanges. Stores the
+        sampled parameters for GSA.
+        """
+        start = time()
+        values = self.param_rng.draw(size)
+        all_amounts = self.param_rng.calculate_samples(values)
+
+        overrides = []
+        for sample, amounts in zip(values, all_amounts):
+            tech = (self.tech_param_positions, amounts[self.tech_param_sources])
+            bio = (self.bio_param_positions, amounts[self.bio_param_sources])
+            overrides.append((tech, bio))
+
+            # Store parameter data for GSA
+            self.param_rng.set_values(sample)
+            param_exchanges = self.param_template.copy()
+            param_exchanges["amount"] = amounts[self.param_sources]
+            self.parameter_exchanges.append(param_exchanges)
+            self.parameters.append(self.param_rng.parameters.to_gsa())
+            # Extract sampled values for parameters, store.
+            self.param_rng.retrieve_sampled_values(self.parameter_data)
+        self.parameter_time += time() - start
+        return overrides
+
+    def varying_params(self, params: np.ndarray, included: bool, parameterized: str):
+        """Return the positions of the params that can vary between iterations."""
+        columns = [np.flatnonzero(params["uncertainty_type"] > 1)] if included else []
+        if self.include_parameters:
+            columns.append(getattr(self, parameterized))
+        return np.concatenate(columns) if columns else np.zeros(0, dtype=int)
+
+    def calculate(
+        self,
+        iterations=10,
+        seed: int = None,
+        workers: int = 1,
+        callback: Callable[[int], None] = None,
+        memmap: bool = False,
+        **kwargs,
+    ):
         """Main calculate method for the MC LCA class, allows fine-grained control
         over which uncertainties are included when running MC sampling.
+
+        Iterations are calculated in blocks of `block_size`, each block
+        draws its samples with a seed derived from `seed` and the block
+        number. The results are therefore the same for any number of
+        `workers`. If given, `callback` is called with the number of
+        completed iterations after each block, the rows of `results` up to
+        that number are final.
+
+        For GSA only the sampled values of the varying params are stored,
+        see `SampleStore`, use `memmap` to keep these on disk.
         """
         start = time()
         self.iterations = iterations
@@ -153,11 +487,29 @@ class MonteCarloLCA(object):
 
         self.load_data()
 
+        self.run_id = uuid4().hex
         self.results = np.zeros((iterations, len(self.func_units), len(self.methods)))
+        self.completed = 0
+        self.parameter_time = 0.0
 
         # Reset GSA variables to empty.
-        self.A_matrices = list()
-        self.B_matrices = list()
+        self.tech_samples = SampleStore(
+            iterations,
+            self.varying_params(
+                self.lca.tech_params, self.include_technosphere, "tech_param_positions"
+            ),
+            memmap,
+        )
+        self.bio_samples = SampleStore(
+            iterations,
+            self.varying_params(
+                self.lca.bio_params, self.include_biosphere, "bio_param_positions"
+            ),
+            memmap,
+        )
+        # Only the samples of the varying params are returned by the sampler
+        self.sampler.tech_columns = self.tech_samples.columns
+        self.sampler.bio_columns = self.bio_samples.columns
         self.CF_dict = defaultdict(list)
         self.parameter_exchanges = list()
         self.parameters = list()
@@ -169,86 +521,91 @@ class MonteCarloLCA(object):
             for k in self.parameter_data:
                 self.parameter_data[k]["values"] = []
 
-        for iteration in range(iterations):
-            tech_vector = (
-                self.tech_rng.next() if self.include_technosphere else self.tech_rng
+        blocks = (
+            (block, block_start, min(self.block_size, iterations - block_start))
+            for block, block_start in enumerate(range(0, iterations, self.block_size))
+        )
+        # Parameters are sampled in this process, in iteration order
+        overrides = (
+            (
+                block,
+                block_start,
+                size,
+                self.parameter_overrides(size) if self.include_parameters else None,
             )
-            bio_vector = self.bio_rng.next() if self.include_biosphere else self.bio_rng
-            if self.include_parameters:
-                # Convert the input/output keys into row/col keys, and then match them against
-                # the tech_ and bio_params
-                data = self.param_rng.next()
-                param_exchanges = self.unify_param_exchanges(data)
-
-                # Select technosphere subset from param_exchanges.
-                subset = param_exchanges[np.isin(param_exchanges["type"], [0, 1])]
-                # Create index of where to insert new values from tech_params array.
-                idx = np.argwhere(
-                    np.isin(
-                        self.lca.tech_params[self.param_cols], subset[self.param_cols]
-                    )
-                ).flatten()
-                # Construct unique array of row+col+type combinations
-                uniq = np.unique(self.lca.tech_params[idx][self.param_cols])
-                # Use the unique array to sort the subset (ensures values
-                # are inserted at the correct index)
-                sort_idx = np.searchsorted(uniq, subset[self.param_cols])
-                # Finally, insert the sorted subset amounts into the tech_vector
-                # at the correct indexes.
-                tech_vector[idx[sort_idx]] = subset["amount"]
-                # Repeat the above, but for the biosphere array.
-                subset = param_exchanges[param_exchanges["type"] == 2]
-                idx = np.argwhere(
-                    np.isin(
-                        self.lca.bio_params[self.param_cols], subset[self.param_cols]
-                    )
-                ).flatten()
-                uniq = np.unique(self.lca.bio_params[idx][self.param_cols])
-                sort_idx = np.searchsorted(uniq, subset[self.param_cols])
-                bio_vector[idx] = subset[sort_idx]["amount"]
-
-                # Store parameter data for GSA
-                self.parameter_exchanges.append(param_exchanges)
-                self.parameters.append(self.param_rng.parameters.to_gsa())
-                # Extract sampled values for parameters, store.
-                self.param_rng.retrieve_sampled_values(self.parameter_data)
-
-            self.lca.rebuild_technosphere_matrix(tech_vector)
-            self.lca.rebuild_biosphere_matrix(bio_vector)
-
-            # store matrices for GSA
-            self.A_matrices.append(self.lca.technosphere_matrix)
-            self.B_matrices.append(self.lca.biosphere_matrix)
-
-            if not hasattr(self.lca, "demand_array"):
-                self.lca.build_demand_array()
-            self.lca.lci_calculation()
-
-            # pre-calculating CF vectors enables the use of the SAME CF vector for each FU in a given run
-            cf_vectors = {}
-            for m in self.methods:
-                cf_vectors[m] = (
-                    self.cf_rngs[m].next() if self.include_cfs else self.cf_rngs[m]
-                )
-                # store CFs for GSA (in a list defaultdict)
-                self.CF_dict[m].append(cf_vectors[m])
-
-            # iterate over FUs
-            for row, func_unit in self.rev_fu_index.items():
-                self.lca.redo_lci(func_unit)  # lca calculation
-
-                # iterate over methods
-                for col, m in self.rev_method_index.items():
-                    self.lca.switch_method(m)
-                    self.lca.rebuild_characterization_matrix(cf_vectors[m])
-                    self.lca.lcia_calculation()
-                    self.results[iteration, row, col] = self.lca.score
+            for block, block_start, size in blocks
+        )
 
+        workers = min(workers, -(-iterations // self.block_size))
+        if workers > 1:
+            calculated = calculate_blocks(self.sampler, overrides, workers)
+        else:
+            calculated = (self.sampler.calculate(*args) for args in overrides)
+        for result in calculated:
+            self.store_block(result)
+            if callback is not None:
+                callback(self.completed)
+
+        duration = time() - start
+        self.iterations_per_second = iterations / duration if duration else None
         log.info(
             f"Monte Carlo LCA: finished {iterations} iterations for {len(self.func_units)} reference flows and "
-            f"{len(self.methods)} methods in {np.round(time() - start, 2)} seconds."
+            f"{len(self.methods)} methods in {np.round(duration, 2)} seconds "
+            f"({np.round(iterations / duration, 2) if duration else '-'} iterations/second), "
+            f"sampling parameters took {np.round(self.parameter_time, 2)} seconds."
         )
 
+    def store_block(self, result: "MonteCarloBlock") -> None:
+        """Store the results and GSA inputs of a calculated block."""
+        self.results[result.start : result.start + len(result.results)] = result.results
+        self.completed = result.start + len(result.results)
+
+        # store sampled values and CFs for GSA
+        self.tech_samples.store(result.start, result.tech_samples, result.tech_vector)
+        self.bio_samples.store(result.start, result.bio_samples, result.bio_vector)
+        for m, samples in zip(self.methods, result.cf_samples):
+            self.CF_dict[m].extend(samples)
+        self.lca.technosphere_matrix = self.sampler.technosphere(result.tech_vector)
+        self.lca.biosphere_matrix = self.sampler.biosphere(result.bio_vector)
+
+    def exchange_values(self, matrix: str, indices: List[tuple]) -> np.ndarray:
+        """Return the (iterations, indices) values of the given (row, col)
+        entries of the 'technosphere' or 'biosphere' matrix in each iteration.
+
+        Values of params that share an entry are summed, technosphere inputs
+        are negative, as in the matrix.
+        """
+        if matrix == "technosphere":
+            params, store = self.lca.tech_params, self.tech_samples
+            signs = self.sampler.tech_signs
+        else:
+            params, store = self.lca.bio_params, self.bio_samples
+            signs = np.ones(len(params))
+        keys = exchange_keys(params, with_type=False)
+        order = np.argsort(keys, kind="stable")
+        entries = np.zeros(len(indices), dtype=[("row", "<u4"), ("col", "<u4")])
+        if len(indices):
+            entries["row"], entries["col"] = zip(*indices)
+        wanted = exchange_keys(entries, with_type=False)
+        left = np.searchsorted(keys[order], wanted, side="left")
+        right = np.searchsorted(keys[order], wanted, side="right")
+        positions = order[
+            np.concatenate(
+                [np.arange(l, r) for l, r in zip(left, right)] + [[]]
+            ).astype(int)
+        ]
+        selection = sparse.csr_matrix(
+            (
+                signs[positions],
+                (
+                    np.arange(len(positions)),
+                    np.repeat(np.arange(len(wanted)), right - left),
+                ),
+            ),
+            shape=(len(positions), len(wanted)),
+        )
+        return np.asarray(store.values(positions) @ selection)
+
     @property
     def func_units_dict(self) -> dict:
         """Return a dictionary of reference flows (key, demand)."""
@@ -327,6 +684,29 @@ class MonteCarloLCA(object):
         return translated_keys
 
 
+def _calculate_block(args: tuple) -> MonteCarloBlock:
+    return worker["sampler"].calculate(*args)
+
+
+def calculate_blocks(
+    sampler: MonteCarloSampler, blocks: Iterable[tuple], workers: int
+) -> Iterator[MonteCarloBlock]:
+    """Calculate the blocks in a pool of `workers` processes.
+
+    Blocks are submitted as they are taken from `blocks` and results are
+    yielded in block order as soon as they are available.
+    """
+    with process_pool(workers, {"sampler": sampler}) as pool:
+        pending = deque()
+        for args in blocks:
+            pending.append(pool.submit(_calculate_block, args))
+            # Limit the number of blocks in flight, yield the finished ones
+            while pending and (pending[0].done() or len(pending) > 2 * workers):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def perform_MonteCarlo_LCA(project="default", cs_name=None, iterations=10):
     """Performs Monte Carlo LCA based on a calculation setup and returns the
     Monte Carlo LCA object."""
@@ -1,22 +1,25 @@
 from collections import OrderedDict
-from copy import deepcopy
+import warnings
 from typing import Iterable, Optional, Union
 from logging import getLogger
 
 import bw2calc as bc
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from PySide2.QtWidgets import QApplication, QMessageBox
 
 from activity_browser.mod import bw2data as bd
-from activity_browser.mod.bw2analyzer import ABContributionAnalysis
 
+from .batch import (BatchResults, batch_calculation, characterization_vectors,
+                    demand_matrix)
 from .commontasks import wrap_text
 from .errors import ReferenceFlowValueError
 from .metadata import AB_metadata
+from .results import (ContributionArray, LazyMapping, ResultStore,
+                      SortedContributions)
 
 log = getLogger(__name__)
-ca = ABContributionAnalysis()
 
 
 class MLCA(object):
@@ -65,6 +68,12 @@ class MLCA(object):
         calculations
     method_matrices: list
         Contains the characterization matrix for each impact category.
+    demand_matrix: `numpy.ndarray`
+        2-dimensional array of shape (`products`, `func_units`) holding the
+        demand vector of each reference flow
+    characterization: `numpy.ndarray`
+        2-dimensional array of shape (`methods`, `biosphere`) holding the
+        characterization factors of each impact category
     lca_scores: `numpy.ndarray`
         2-dimensional array of shape (`func_units`, `methods`) holding the
         calculated LCA scores of each combination of reference flow and
@@ -81,17 +90,21 @@ class MLCA(object):
         Contains the calculated technosphere flows per reference flow
     inventory: dict
         Life cycle inventory (biosphere flows) per reference flow
-    inventories: dict
-        Biosphere flows per reference flow and impact category combination
-    characterized_inventories: dict
+    result_store: `ResultStore`
+        Holds the supply and inventory vectors the (characterized) inventories
+        and contributions are derived from
+    inventories: `LazyMapping`
+        Biosphere flows per reference flow and impact category combination,
+        calculated on access
+    characterized_inventories: `LazyMapping`
         Inventory multiplied by scaling (relative impact on environment) per
-        reference flow and impact category combination
-    elementary_flow_contributions: `numpy.ndarray`
-        3-dimensional array of shape (`func_units`, `methods`, `biosphere`)
+        reference flow and impact category combination, calculated on access
+    elementary_flow_contributions: `ContributionArray`
+        3-dimensional array-like of shape (`func_units`, `methods`, `biosphere`)
         which holds the characterized inventory results summed along the
         technosphere axis
-    process_contributions: `numpy.ndarray`
-        3-dimensional array of shape (`func_units`, `methods`, `technosphere`)
+    process_contributions: `ContributionArray`
+        3-dimensional array-like of shape (`func_units`, `methods`, `technosphere`)
         which holds the characterized inventory results summed along the
         biosphere axis
     func_unit_translation_dict: dict
@@ -148,6 +161,10 @@ class MLCA(object):
         for method in self.methods:
             self.lca.switch_method(method)
             self.method_matrices.append(self.lca.characterization_matrix)
+        # Demand vectors of all reference flows, one column per reference flow
+        self.demand_matrix = demand_matrix(self.lca, self.func_units)
+        # Characterization factors of all methods, one row per method
+        self.characterization = characterization_vectors(self.method_matrices)
 
         self.lca_scores = np.zeros((len(self.func_units), len(self.methods)))
 
@@ -163,25 +180,34 @@ class MLCA(object):
         self.technosphere_flows = dict()
         # Life cycle inventory (biosphere flows) by reference flow
         self.inventory = dict()
+
+        # Supply and inventory vectors from which all other results are derived.
+        self.result_store = ResultStore(self.characterization)
         # Inventory (biosphere flows) for specific reference flow (e.g. 2000x15000) and impact category.
-        self.inventories = dict()
+        self.inventories = LazyMapping(self.result_store.inventory_matrix)
         # Inventory multiplied by scaling (relative impact on environment) per impact category.
-        self.characterized_inventories = dict()
+        self.characterized_inventories = LazyMapping(
+            self.result_store.characterized_inventory
+        )
 
-        # Summarized contributions for EF and processes.
-        self.elementary_flow_contributions = np.zeros(
+        # Summarized contributions for EF and processes, calculated on request.
+        self.elementary_flow_contributions = ContributionArray(
+            self.result_store,
+            "elementary_flow",
             (
                 len(self.func_units),
                 len(self.methods),
                 self.lca.biosphere_matrix.shape[0],
-            )
+            ),
         )
-        self.process_contributions = np.zeros(
+        self.process_contributions = ContributionArray(
+            self.result_store,
+            "process",
             (
                 len(self.func_units),
                 len(self.methods),
                 self.lca.technosphere_matrix.shape[0],
-            )
+            ),
         )
 
         self.func_unit_translation_dict = {}
@@ -209,48 +235,53 @@ class MLCA(object):
     def _perform_calculations(self):
         """Isolates the code which performs calculations to allow subclasses
         to either alter the code or redo calculations after matrix substitution.
+
+        All reference flows are solved at once against a single factorization
+        of the technosphere matrix, see `batch_calculation`.
+        """
+        results = batch_calculation(
+            self.lca.technosphere_matrix,
+            self.lca.biosphere_matrix,
+            self.demand_matrix,
+            self.characterization,
+        )
+        self.lca_scores[:] = results.scores
+        self._store_inventories(results)
+
+    def _store_inventories(
+        self,
+        results: BatchResults,
+        scenario: Optional[int] = None,
+        diagonal: Optional[np.ndarray] = None,
+        biosphere_matrix=None,
+    ) -> None:
+        """Store the scaling factors, technosphere flows and inventory per
+        reference flow, optionally for the given scenario.
+
+        The technosphere diagonal and biosphere matrix default to those of
+        `self.lca`. The (characterized) inventories are not stored but
+        registered with the result store, which calculates them when they
+        are accessed.
         """
+        if diagonal is None:
+            diagonal = self.lca.technosphere_matrix.diagonal()
+        if biosphere_matrix is None:
+            biosphere_matrix = self.lca.biosphere_matrix
+        self.result_store.add(results, biosphere_matrix, scenario or 0)
         for row, func_unit in enumerate(self.func_units):
-            # Do the LCA for the current reference flow
-            try:
-                self.lca.redo_lci(func_unit)
-            except:
-                # bw25 compatibility
-                key = list(func_unit.keys())[0]
-                self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
-
-            # Now update the:
-            # - Scaling factors
-            # - Technosphere flows
-            # - Life cycle inventory
-            # - Life-cycle inventory (disaggregated by contributing process)
-            # for current reference flow
-            self.scaling_factors.update({str(func_unit): self.lca.supply_array})
-            self.technosphere_flows.update(
-                {
-                    str(func_unit): np.multiply(
-                        self.lca.supply_array, self.lca.technosphere_matrix.diagonal()
-                    )
-                }
-            )
-            self.inventory.update(
-                {str(func_unit): np.array(self.lca.inventory.sum(axis=1)).ravel()}
-            )
-            self.inventories.update({str(func_unit): self.lca.inventory})
-
-            # Now, for each method, take the current reference flow and do inventory analysis
-            for col, cf_matrix in enumerate(self.method_matrices):
-                self.lca.characterization_matrix = cf_matrix
-                self.lca.lcia_calculation()
-                self.lca_scores[row, col] = self.lca.score
-                self.characterized_inventories[row, col] = (
-                    self.lca.characterized_inventory.copy()
-                )
-                self.elementary_flow_contributions[row, col] = np.array(
-                    self.lca.characterized_inventory.sum(axis=1)
-                ).ravel()
-                self.process_contributions[row, col] = (
-                    self.lca.characterized_inventory.sum(axis=0)
+            key = str(func_unit) if scenario is None else (str(func_unit), scenario)
+            supply = results.supply[:, row]
+
+            self.scaling_factors[key] = supply
+            self.technosphere_flows[key] = np.multiply(supply, diagonal)
+            self.inventory[key] = results.inventory[:, row]
+            self.inventories.arguments[key] = (row, scenario or 0)
+            for col in range(len(self.methods)):
+                index = (row, col) if scenario is None else (row, col, scenario)
+                self.characterized_inventories.arguments[index] = (
+                    row,
+                    col,
+                    scenario or 0,
                 )
 
     def calculate(self):
@@ -353,6 +384,9 @@ class Contributions(object):
     DEFAULT_ACT_AGGREGATES = ["none"] + DEFAULT_ACT_FIELDS
     DEFAULT_EF_AGGREGATES = ["none"] + DEFAULT_EF_FIELDS
 
+    # Number of sorted contribution arrays that are kept in memory
+    CACHE_SIZE = 16
+
     def __init__(self, mlca):
         if not isinstance(mlca, MLCA):
             raise ValueError("Must pass an MLCA object. Passed:", type(mlca))
@@ -393,6 +427,10 @@ class Contributions(object):
                 self.act_fields,
             ),
         }
+        # Flows to groups matrix and group labels per aggregation
+        self.groupings = {}
+        # Most recently used sorted contributions, see `sorted_contributions`
+        self._sorted = OrderedDict()
 
     def normalize(self, contribution_array: np.ndarray, total_range:bool=True) -> np.ndarray:
         """Normalize the contribution array based on range or score
@@ -415,7 +453,7 @@ class Contributions(object):
 
     def _build_dict(
         self,
-        contributions: np.ndarray,
+        contributions: SortedContributions,
         FU_M_index: dict,
         rev_dict: dict,
         limit: int,
@@ -426,7 +464,7 @@ class Contributions(object):
 
         Parameters
         ----------
-        contributions: A 2-dimensional contribution array
+        contributions: The sorted rows of a 2-dimensional contribution array
         FU_M_index : Dictionary which maps the reference flows or methods to their matching columns
         rev_dict : 'reverse' dictionary used to map correct activity/method to its value
         limit : Number of top-contributing items to include
@@ -439,26 +477,19 @@ class Contributions(object):
         """
         topcontribution_dict = dict()
         for fu_or_method, col in FU_M_index.items():
-            contribution_col = contributions[col, :]
             if total_range:  # total is based on the range
-                normalize_to = np.abs(contribution_col).sum()
+                normalize_to = contributions.range[col]
             else:  # total is based on the score
-                normalize_to = contribution_col.sum()
-            score = contribution_col.sum()
+                normalize_to = contributions.score[col]
+            score = contributions.score[col]
 
-            top_contribution = ca.sort_array(
-                contribution_col, limit=limit, limit_type=limit_type, total=normalize_to
+            values, indices = contributions.top(
+                col, limit=limit, limit_type=limit_type, total=normalize_to
             )
 
             # split and calculate remaining rest sections for positive and negative part
-            pos_rest = (
-                np.sum(contribution_col[contribution_col > 0])
-                - np.sum(top_contribution[top_contribution[:, 0] > 0][:, 0])
-            )
-            neg_rest = (
-                    np.sum(contribution_col[contribution_col < 0])
-                    - np.sum(top_contribution[top_contribution[:, 0] < 0][:, 0])
-            )
+            pos_rest = contributions.positive[col] - np.sum(values[values > 0])
+            neg_rest = contributions.negative[col] - np.sum(values[values < 0])
 
             cont_per = OrderedDict()
             cont_per.update(
@@ -468,7 +499,7 @@ class Contributions(object):
                     ("Rest (-)", ""): neg_rest,
                 }
             )
-            for value, index in top_contribution:
+            for value, index in zip(values, indices):
                 cont_per.update({rev_dict[index]: value})
             topcontribution_dict.update({fu_or_method: cont_per})
         return topcontribution_dict
@@ -503,23 +534,42 @@ class Contributions(object):
         fields = (
             fields if fields else ["name", "reference product", "location", "database"]
         )
-        keys = (
-            k for k in key_list
-        )  # need to do this as the keys come from a pd.Multiindex
-        translated_keys = []
-        for k in keys:
-            if mask and k in mask:
-                translated_keys.append(k)
-            elif isinstance(k, str):
-                translated_keys.append(k)
-            elif k in AB_metadata.index:
-                translated_keys.append(
-                    separator.join(
-                        [str(l) for l in list(AB_metadata.get_metadata(k, fields))]
-                    )
-                )
-            else:
-                translated_keys.append(separator.join([i for i in k if i != ""]))
+        # need to do this as the keys come from a pd.Multiindex
+        keys = list(key_list)
+        mask = set(mask) if mask else set()
+        translated_keys = [k if k in mask or isinstance(k, str) else None for k in keys]
+
+        # Label the activities with their metadata at once
+        candidates = [
+            i
+            for i, k in enumerate(keys)
+            if translated_keys[i] is None and isinstance(k, tuple) and len(k) == 2
+        ]
+        if candidates:
+            positions = AB_metadata.index.get_indexer(
+                pd.MultiIndex.from_tuples([keys[i] for i in candidates])
+            )
+        else:
+            positions = np.empty(0, dtype=int)
+        found = positions >= 0
+        metadata = (
+            AB_metadata.dataframe.iloc[positions[found]]
+            .reindex(columns=fields)
+            .map(str)
+        )
+        columns = [metadata.iloc[:, i] for i in range(len(fields))]
+        labels = (
+            columns[0].str.cat(columns[1:], sep=separator).to_list()
+            if columns
+            else [""] * len(metadata)
+        )
+        for i, label in zip(np.array(candidates, dtype=int)[found], labels):
+            translated_keys[i] = label
+
+        translated_keys = [
+            separator.join([i for i in k if i != ""]) if label is None else label
+            for k, label in zip(keys, translated_keys)
+        ]
         if max_length:
             translated_keys = [
                 wrap_text(k, max_length=max_length) for k in translated_keys
@@ -557,10 +607,10 @@ class Contributions(object):
         df.columns = cls.get_labels(df.columns, fields=y_fields)
         # Coerce index to MultiIndex if it currently isn't
         if not isinstance(df.index, pd.MultiIndex):
-            df.index = pd.MultiIndex.from_tuples(ids_to_keys(df.index))
+            df.index = pd.MultiIndex.from_tuples(AB_metadata.ids_to_keys(df.index))
 
         # get metadata for rows
-        keys = [k for k in df.index if k in AB_metadata.index]
+        keys = df.index[AB_metadata.index.get_indexer(df.index) >= 0].to_list()
         metadata = AB_metadata.get_metadata(keys, x_fields)
 
         # join data with metadata
@@ -613,12 +663,15 @@ class Contributions(object):
         df = df.replace(0, np.nan)
 
         # sort on mean square of a row
-        df_bot = deepcopy(df.iloc[3:, :])
-        func = lambda row: np.nanmean(np.square(row))
+        df_bot = df.iloc[3:, :]
         if len(df_bot) > 1:  # but only sort if there is something to sort
-            df_bot["_sort_me_"] = (df_bot.select_dtypes(include=np.number)).apply(func, axis=1)
-            df_bot.sort_values(by="_sort_me_", ascending=False, inplace=True)
-            del df_bot["_sort_me_"]
+            values = df_bot.select_dtypes(include=np.number).to_numpy(dtype=np.float64)
+            with warnings.catch_warnings():
+                # Rows without values are sorted last
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean_square = np.nanmean(np.square(values), axis=1)
+            order = pd.Series(mean_square).sort_values(ascending=False).index
+            df_bot = df_bot.iloc[order]
 
         df = pd.concat([df.iloc[:3, :], df_bot], axis=0)
         df.dropna(how="all", inplace=True)
@@ -653,10 +706,11 @@ class Contributions(object):
     def _build_inventory(
         inventory: dict, indices: dict, columns: list, fields: list
     ) -> pd.DataFrame:
+        keys = AB_metadata.ids_to_keys(list(indices.values()))
         df = pd.DataFrame(inventory)
-        df.index = pd.MultiIndex.from_tuples(ids_to_keys(indices.values()))
+        df.index = pd.MultiIndex.from_tuples(keys)
         df.columns = Contributions.get_labels(columns, max_length=30)
-        metadata = AB_metadata.get_metadata(list(ids_to_keys(indices.values())), fields)
+        metadata = AB_metadata.get_metadata(keys, fields)
         joined = metadata.join(df)
         joined.reset_index(inplace=True, drop=True)
         return joined
@@ -767,18 +821,86 @@ class Contributions(object):
         if not parameters:
             return contributions, rev_index, None
 
-        df = pd.DataFrame(contributions).T
-        columns = list(range(contributions.shape[0]))
-        df.index = pd.MultiIndex.from_tuples(rev_index.values())
-        metadata = AB_metadata.get_metadata(list(keys), fields)
+        grouping, mask_index = self.get_grouping(inventory, parameters)
+        aggregated = (grouping.T @ np.asarray(contributions).T).T
+        return aggregated, mask_index, mask_index.values()
 
-        joined = metadata.join(df)
-        joined.reset_index(inplace=True, drop=True)
-        grouped = joined.groupby(parameters)
-        aggregated = grouped[columns].sum()
-        mask_index = {i: m for i, m in enumerate(aggregated.index)}
+    def get_grouping(
+        self, inventory: str, parameters: Union[str, list]
+    ) -> (sparse.csr_matrix, dict):
+        """Return a (flows, groups) matrix that sums the flows of the
+        inventory per value of the parameters, and the value of each group.
+
+        The flows are grouped once per inventory and parameters.
+        """
+        if isinstance(parameters, list):
+            parameters = tuple(parameters)
+        key = (inventory, parameters)
+        if key not in self.groupings:
+            rev_index, keys, fields = self.aggregate_data[inventory]
+            metadata = AB_metadata.get_metadata(list(keys), fields)
+            metadata.reset_index(inplace=True, drop=True)
+            grouped = metadata.groupby(
+                list(parameters) if isinstance(parameters, tuple) else parameters
+            )
+            groups = grouped.ngroup().fillna(-1).to_numpy(dtype=int)
+            flows = np.fromiter(keys.values(), dtype=int, count=len(keys))
+            # Flows without a value for the parameters are not in any group
+            found = groups >= 0
+            grouping = sparse.csr_matrix(
+                (np.ones(found.sum()), (flows[found], groups[found])),
+                shape=(len(rev_index), grouped.ngroups),
+            )
+            mask_index = {i: m for i, m in enumerate(grouped.size().index)}
+            self.groupings[key] = (grouping, mask_index)
+        return self.groupings[key]
+
+    def sorted_contributions(
+        self,
+        contribution: str,
+        functional_unit=None,
+        method=None,
+        aggregator: Union[str, list, None] = None,
+        normalize: bool = False,
+        total_range: bool = True,
+        **kwargs,
+    ) -> (SortedContributions, dict, Optional[Iterable]):
+        """Return the (aggregated and normalized) contributions for the
+        reference flow or method with each row sorted, together with the
+        reverse index and mask of the flows.
+
+        The rows are sorted once, the most recently used results are kept so
+        that changing the limit or switching back to earlier results only
+        requires slicing the sorted rows.
+        """
+        key = (
+            contribution,
+            functional_unit,
+            method,
+            tuple(aggregator) if isinstance(aggregator, list) else aggregator,
+            normalize,
+            normalize and total_range,
+            tuple(sorted(kwargs.items())),
+        )
+        if key in self._sorted:
+            self._sorted.move_to_end(key)
+            return self._sorted[key]
+
+        contributions = self.get_contributions(
+            contribution, functional_unit, method, **kwargs
+        )
+        inventory = self.BIOS if contribution == self.EF else self.TECH
+        contributions, rev_index, mask = self.aggregate_by_parameters(
+            contributions, inventory, aggregator
+        )
+        # Normalise if required
+        if normalize:
+            contributions = self.normalize(contributions, total_range)
 
-        return aggregated.T.values, mask_index, mask_index.values()
+        self._sorted[key] = (SortedContributions(contributions), rev_index, mask)
+        if len(self._sorted) > self.CACHE_SIZE:
+            self._sorted.popitem(last=False)
+        return self._sorted[key]
 
     def _contribution_rows(self, contribution: str, aggregator=None):
         if aggregator is None:
@@ -842,21 +964,20 @@ class Contributions(object):
         Annotated top-contribution dataframe
 
         """
-        contributions = self.get_contributions(
-            self.EF, functional_unit, method, **kwargs
+        contributions, rev_index, mask = self.sorted_contributions(
+            self.EF,
+            functional_unit,
+            method,
+            aggregator=aggregator,
+            normalize=normalize,
+            total_range=total_range,
+            **kwargs,
         )
 
         x_fields = self._contribution_rows(self.EF, aggregator)
         index, y_fields = self._contribution_index_cols(
             functional_unit=functional_unit, method=method
         )
-        contributions, rev_index, mask = self.aggregate_by_parameters(
-            contributions, self.BIOS, aggregator
-        )
-
-        # Normalise if required
-        if normalize:
-            contributions = self.normalize(contributions, total_range)
 
         top_cont_dict = self._build_dict(
             contributions, index, rev_index, limit, limit_type, total_range
@@ -898,21 +1019,20 @@ class Contributions(object):
         Annotated top-contribution dataframe
 
         """
-        contributions = self.get_contributions(
-            self.ACT, functional_unit, method, **kwargs
+        contributions, rev_index, mask = self.sorted_contributions(
+            self.ACT,
+            functional_unit,
+            method,
+            aggregator=aggregator,
+            normalize=normalize,
+            total_range=total_range,
+            **kwargs,
         )
 
         x_fields = self._contribution_rows(self.ACT, aggregator)
         index, y_fields = self._contribution_index_cols(
             functional_unit=functional_unit, method=method
         )
-        contributions, rev_index, mask = self.aggregate_by_parameters(
-            contributions, self.TECH, aggregator
-        )
-
-        # Normalise if required
-        if normalize:
-            contributions = self.normalize(contributions, total_range)
 
         top_cont_dict = self._build_dict(
             contributions, index, rev_index, limit, limit_type, total_range
@@ -923,6 +1043,3 @@ class Contributions(object):
         self.adjust_table_unit(labelled_df, method)
         return labelled_df
 
-
-def ids_to_keys(index_list):
-    return [bd.get_activity(i).key if isinstance(i, int) else i for i in index_list]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Process pools for calculations that are divided over worker processes.
+
+Workers are always spawned: forking would copy a process that is already
+running Qt threads. A spawned worker imports the `activity_browser` package
+to unpickle its tasks, but does not create the Qt application (see
+`activity_browser.application`).
+
+The state a task needs is sent to every worker once, when it starts, and is
+available to the tasks through the module level `worker` dictionary.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+# State of a worker process, set up once by `_initialize_worker`
+worker = {}
+
+
+def _initialize_worker(state: dict, setup: Optional[Callable[[dict], None]]) -> None:
+    worker.update(state)
+    if setup is not None:
+        setup(worker)
+
+
+def process_pool(
+    workers: int, state: dict = None, setup: Callable[[dict], None] = None
+) -> ProcessPoolExecutor:
+    """Return a pool of `workers` spawned processes.
+
+    Each process starts with a copy of `state` in `worker`, if given `setup`
+    is then called with `worker` to complete it, e.g. to attach to shared
+    arrays.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize_worker,
+        initargs=(state or {}, setup),
+    )
+
+
+def share_array(array: np.ndarray) -> Tuple[SharedMemory, tuple]:
+    """Copy the array into shared memory, returns the memory block and the
+    specification other processes need to attach to it.
+    """
+    order = "F" if np.isfortran(array) else "C"
+    memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=memory.buf, order=order)[...] = array
+    return memory, (memory.name, array.shape, array.dtype, order)
+
+
+def attach_array(spec: tuple) -> Tuple[SharedMemory, np.ndarray]:
+    """Attach to an array shared through `share_array`."""
+    name, shape, dtype, order = spec
+    memory = SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype, buffer=memory.buf, order=order)
@@ -0,0 +1,246 @@
+"""
+Memory-efficient storage of MLCA results.
+
+Instead of keeping a characterized inventory and dense contribution arrays
+for every (reference flow, impact category) combination, the `ResultStore`
+only keeps the supply and inventory vectors per reference flow and the
+characterization factors per impact category. Characterized inventories and
+process or elementary flow contributions are derived from these when they
+are requested, the most recently used of them are kept in a bounded cache.
+"""
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Callable, Hashable, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .batch import BatchResults
+
+
+class ResultStore(object):
+    """Holds the batch results of one or more (scenario) calculations.
+
+    Parameters
+    ----------
+    characterization : `numpy.ndarray`
+        2-dimensional array of shape (`methods`, `biosphere`) holding the
+        characterization factors of each impact category
+    cache_size : int
+        Maximum number of derived arrays to keep in memory
+    """
+
+    def __init__(self, characterization: np.ndarray, cache_size: int = 32):
+        self.characterization = characterization
+        self.cache_size = cache_size
+        self.supply = {}
+        self.inventory = {}
+        self.biosphere = {}
+        self._cache = OrderedDict()
+
+    def add(
+        self, results: BatchResults, biosphere_matrix: sparse.spmatrix, scenario: int = 0
+    ) -> None:
+        """Store the results of the given scenario.
+
+        Biosphere matrices are shared between consecutive scenarios that do
+        not alter the biosphere.
+        """
+        self.supply[scenario] = results.supply
+        self.inventory[scenario] = results.inventory
+        previous = self.biosphere.get(scenario - 1)
+        if previous is not None and (previous != biosphere_matrix).nnz == 0:
+            self.biosphere[scenario] = previous
+        else:
+            self.biosphere[scenario] = sparse.csr_matrix(biosphere_matrix, copy=True)
+
+    def _cached(self, key: Hashable, build: Callable):
+        """Return the cached value for `key`, building it if required."""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = build()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def characterized_biosphere(self, scenario: int = 0) -> np.ndarray:
+        """Characterized biosphere flows per unit of each process, as an array
+        of shape (`methods`, `technosphere`).
+        """
+        biosphere = self.biosphere[scenario]
+        return self._cached(
+            ("characterized_biosphere", id(biosphere)),
+            lambda: (biosphere.T @ self.characterization.T).T,
+        )
+
+    def process_contributions(
+        self, func_unit: int, method: int, scenario: int = 0
+    ) -> np.ndarray:
+        """Characterized inventory summed along the biosphere axis."""
+        return (
+            self.characterized_biosphere(scenario)[method]
+            * self.supply[scenario][:, func_unit]
+        )
+
+    def elementary_flow_contributions(
+        self, func_unit: int, method: int, scenario: int = 0
+    ) -> np.ndarray:
+        """Characterized inventory summed along the technosphere axis."""
+        return (
+            self.characterization[method] * self.inventory[scenario][:, func_unit]
+        )
+
+    def inventory_matrix(self, func_unit: int, scenario: int = 0) -> sparse.csr_matrix:
+        """Biosphere flows of the reference flow disaggregated by process."""
+        return self._cached(
+            ("inventory", func_unit, scenario),
+            lambda: self.biosphere[scenario]
+            @ sparse.diags(self.supply[scenario][:, func_unit]),
+        )
+
+    def characterized_inventory(
+        self, func_unit: int, method: int, scenario: int = 0
+    ) -> sparse.csr_matrix:
+        """Inventory of the reference flow multiplied by the characterization
+        factors of the impact category.
+        """
+        return self._cached(
+            ("characterized_inventory", func_unit, method, scenario),
+            lambda: sparse.diags(self.characterization[method])
+            @ self.inventory_matrix(func_unit, scenario),
+        )
+
+
+class ContributionArray(object):
+    """Read-only array-like view of the process or elementary flow
+    contributions in a `ResultStore`.
+
+    The view has the shape (`func_units`, `methods`, [`scenarios`,] `flows`)
+    and supports basic indexing and `take`. Only the requested rows are
+    calculated, the result of indexing is a regular `numpy.ndarray`.
+    """
+
+    def __init__(self, store: ResultStore, contribution: str, shape: Tuple[int, ...]):
+        self.store = store
+        self.contribution = getattr(store, f"{contribution}_contributions")
+        self.shape = shape
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        key = key if isinstance(key, tuple) else (key,)
+        key = key + (slice(None),) * (self.ndim - len(key))
+        *leading, flows = key
+        indices = [np.arange(n)[k] for n, k in zip(self.shape[:-1], leading)]
+        axes = [np.atleast_1d(i) for i in indices]
+
+        data = np.empty([len(a) for a in axes] + [self.shape[-1]])
+        for position in np.ndindex(*data.shape[:-1]):
+            cell = (int(a[p]) for a, p in zip(axes, position))
+            data[position] = self.contribution(*cell)
+        # Drop the axes that were indexed with a single integer
+        shape = [len(a) for a, i in zip(axes, indices) if np.ndim(i)]
+        return data.reshape(shape + [self.shape[-1]])[..., flows]
+
+    def take(self, index: int, axis: int) -> np.ndarray:
+        key = [slice(None)] * self.ndim
+        key[axis] = index
+        return self[tuple(key)]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        data = self[()]
+        return data if dtype is None else data.astype(dtype)
+
+
+class LazyMapping(Mapping):
+    """Dictionary which builds its values from the given arguments on access."""
+
+    def __init__(self, build: Callable):
+        self.build = build
+        self.arguments = {}
+
+    def __getitem__(self, key):
+        return self.build(*self.arguments[key])
+
+    def __iter__(self):
+        return iter(self.arguments)
+
+    def __len__(self) -> int:
+        return len(self.arguments)
+
+
+class SortedContributions(object):
+    """The rows of a 2-dimensional contribution array, each sorted once on
+    absolute value.
+
+    The top contributions of a row for any limit are a slice of its sorted
+    order, found with a binary search. The results are the same as those of
+    `ABContributionAnalysis.sort_array`.
+    """
+
+    def __init__(self, contributions: np.ndarray):
+        self.contributions = np.asarray(contributions, dtype=np.float64)
+        absolute = np.abs(self.contributions)
+        # Sorted from low to high impact
+        self.order = np.argsort(absolute, axis=1)
+        self.absolute = np.take_along_axis(absolute, self.order, axis=1)
+        self.cumsum = np.cumsum(self.absolute, axis=1)
+        self.score = np.array([row.sum() for row in self.contributions])
+        self.range = np.array([np.abs(row).sum() for row in self.contributions])
+        self.positive = np.array([np.sum(row[row > 0]) for row in self.contributions])
+        self.negative = np.array([np.sum(row[row < 0]) for row in self.contributions])
+
+    def top(
+        self, row: int, limit: float = 25, limit_type: str = "number", total=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the values and indices of the top contributions of the
+        row, from high to low impact.
+
+        `limit_type` is either 'number', 'percent' (contributions of at least
+        `limit` times the total) or 'cum_percent' (the largest contributions
+        that together make up at least `limit` times the total). The total
+        defaults to the sum of the absolute contributions.
+        """
+        if not total:
+            total = self.range[row]
+
+        if total == 0 and limit_type == "cum_percent":
+            raise ValueError(
+                "Cumulative percentage cannot be calculated to a total of 0, use a different limit type or total"
+            )
+        if limit_type not in ("number", "percent", "cum_percent"):
+            raise ValueError(
+                f"limit_type must be either 'number', 'percent' or 'cum_percent' not '{limit_type}'."
+            )
+        if limit_type in ("percent", "cum_percent"):
+            if not 0 < limit <= 1:
+                raise ValueError("Percentage limits > 0 and <= 1.")
+        if limit_type == "number":
+            if not int(limit) == limit:
+                raise ValueError("Number limit must a whole number.")
+            if not 0 < limit:
+                raise ValueError("Number limit must be < 0.")
+
+        absolute, cumsum = self.absolute[row], self.cumsum[row]
+        if limit_type == "number":
+            start = max(len(absolute) - int(limit), 0)
+        elif limit_type == "percent":
+            start = int(np.searchsorted(absolute, abs(total) * limit, side="left"))
+        else:
+            # Start at the first contribution from which the cumulative
+            # fraction reaches the limit, compared as `sort_array` does
+            threshold = 1 - limit
+            start = int(np.searchsorted(cumsum, threshold * abs(total)))
+            while start > 0 and cumsum[start - 1] / abs(total) >= threshold:
+                start -= 1
+            while start < len(cumsum) and cumsum[start] / abs(total) < threshold:
+                start += 1
+        indices = self.order[row, start:][::-1]
+        return self.contributions[row, indices], indices
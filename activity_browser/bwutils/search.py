@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Trigram index for searching the metadata of a database.
+
+The searched fields of each activity are lower-cased and joined into a single
+text. Every three-character sequence (trigram) of these texts maps to the rows
+that contain it, so a search only has to check the rows that contain all
+trigrams of the pattern instead of every value of every searched field.
+"""
+
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+# Separates the fields of a row and the rows in the index, patterns entered
+# in the search fields can not contain it
+SEPARATOR = "\x00"
+
+
+def encode_trigrams(text: str) -> np.ndarray:
+    """Return a code for the trigram starting at each position of the text,
+    trigrams that contain a `SEPARATOR` are coded -1.
+    """
+    chars = np.frombuffer(
+        text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+    ).astype(np.int64)
+    if len(chars) < 3:
+        return np.empty(0, dtype=np.int64)
+    # Unicode code points fit in 21 bits
+    codes = (chars[:-2] << 42) | (chars[1:-1] << 21) | chars[2:]
+    separator = chars == ord(SEPARATOR)
+    codes[separator[:-2] | separator[1:-1] | separator[2:]] = -1
+    return codes
+
+
+class SearchIndex(object):
+    """Index of the given `fields` of the metadata rows, answers the same
+    case-insensitive "contains" searches as checking every value, for each
+    of the terms of a search.
+
+    Rows are identified by their position in `keys` and `texts`. Rows that are
+    updated after the index is built are appended and are checked on every
+    search until the index is rebuilt.
+    """
+
+    # Rebuild the index once this fraction of the rows is not indexed
+    REBUILD_FRACTION = 0.1
+
+    def __init__(self, df: pd.DataFrame, fields: Iterable[str]):
+        self.fields = list(fields)
+        self.keys: List[tuple] = []
+        self.texts: List[str] = []
+        self.alive = np.empty(0, dtype=bool)
+        self.rows = {}  # Key to row of the current version of each activity
+        self.recent = []  # Rows that are not in the trigram index
+        self.add(df)
+        self.build()
+
+    def row_texts(self, df: pd.DataFrame) -> List[str]:
+        """Return the searchable text of each row of the metadata."""
+        columns = [df[field].astype(str).str.lower() for field in self.fields]
+        if not columns:
+            return [""] * len(df)
+        return columns[0].str.cat(columns[1:], sep=SEPARATOR).tolist()
+
+    def add(self, df: pd.DataFrame) -> None:
+        """Add the rows, replacing rows of the same activities."""
+        if df.empty:
+            return
+        keys = df["key"].tolist()
+        self.remove(keys)
+        start = len(self.keys)
+        self.keys.extend(keys)
+        self.texts.extend(self.row_texts(df))
+        self.rows.update(zip(keys, range(start, len(self.keys))))
+        self.recent.extend(range(start, len(self.keys)))
+        self.alive = np.concatenate([self.alive, np.ones(len(keys), dtype=bool)])
+
+    def remove(self, keys: Iterable[tuple]) -> None:
+        """Remove the rows of the activities from the index."""
+        rows = [self.rows.pop(key) for key in keys if key in self.rows]
+        self.alive[rows] = False
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Replace or add the rows of the changed activities, the index is
+        rebuilt when too many rows are not indexed.
+        """
+        self.add(df)
+        if len(self.recent) > self.REBUILD_FRACTION * len(self.rows):
+            self.build()
+
+    def build(self) -> None:
+        """Drop the removed rows and index the trigrams of all rows.
+
+        The trigrams are stored as a sorted array of codes, the rows that
+        contain the trigram ``self.grams[i]`` are
+        ``self.postings[self.starts[i]:self.starts[i + 1]]``.
+        """
+        alive = np.flatnonzero(self.alive)
+        self.keys = [self.keys[i] for i in alive]
+        self.texts = [self.texts[i] for i in alive]
+        self.alive = np.ones(len(self.keys), dtype=bool)
+        self.rows = dict(zip(self.keys, range(len(self.keys))))
+        self.recent = []
+        self.indexed = len(self.keys)
+
+        text = SEPARATOR.join(self.texts)
+        codes = encode_trigrams(text)
+        # Each row is followed by a separator, the last row is not
+        lengths = np.array([len(t) + 1 for t in self.texts], dtype=np.int64)
+        rows = np.repeat(np.arange(len(self.texts), dtype=np.int64), lengths)
+        rows = rows[: len(codes)]
+        valid = codes >= 0
+        codes, rows = codes[valid], rows[valid]
+
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        distinct = np.ones(len(codes), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, self.postings = codes[distinct], rows[distinct]
+
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        self.grams = codes[first]
+        self.starts = np.append(np.flatnonzero(first), len(codes))
+
+    def candidates(self, pattern: str) -> np.ndarray:
+        """Return the indexed rows that contain all trigrams of the pattern."""
+        codes = np.unique(encode_trigrams(pattern))
+        if len(codes) == 0:
+            # Patterns shorter than a trigram are checked against all rows
+            return np.arange(self.indexed)
+        if len(self.grams) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.grams, codes)
+        positions[positions == len(self.grams)] = 0
+        if not np.array_equal(self.grams[positions], codes):
+            return np.empty(0, dtype=np.int64)
+        # Intersect the shortest lists of rows first
+        sizes = self.starts[positions + 1] - self.starts[positions]
+        result = None
+        for i in positions[np.argsort(sizes)]:
+            rows = self.postings[self.starts[i] : self.starts[i + 1]]
+            result = rows if result is None else np.intersect1d(result, rows, True)
+            if len(result) == 0:
+                break
+        return result
+
+    def search(self, pattern: str) -> List[tuple]:
+        """Return the keys of the activities for which each of the terms of
+        the pattern is contained in any of the fields, ignoring case.
+
+        Terms are separated by whitespace, a pattern without terms matches all
+        activities.
+        """
+        terms = pattern.lower().split() or [""]
+        if any(SEPARATOR in term for term in terms):
+            return []
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            rows = self.candidates(term)
+            candidates = (
+                rows if candidates is None else np.intersect1d(candidates, rows, True)
+            )
+            if len(candidates) == 0:
+                break
+        rows = np.concatenate([candidates, self.recent]).astype(int)
+        return [
+            self.keys[i]
+            for i in rows[self.alive[rows]]
+            if all(term in self.texts[i] for term in terms)
+        ]
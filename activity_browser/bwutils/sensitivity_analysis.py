@@ -8,17 +8,22 @@
 import os
 import traceback
 from time import time
+from typing import Callable, NamedTuple
 from logging import getLogger
 
 import bw2calc as bc
 import numpy as np
 import pandas as pd
 from SALib.analyze import delta
+from scipy.stats import rankdata
 
 from activity_browser.mod import bw2data as bd
+from activity_browser.mod.bw2data.backends import ExchangeDataset
 
 from ..settings import ab_settings
+from .metadata import AB_metadata
 from .montecarlo import MonteCarloLCA, perform_MonteCarlo_LCA
+from .pool import process_pool
 
 try:
     # attempt bw25 import
@@ -90,39 +95,67 @@ def filter_biosphere_exchanges(lca, cutoff=0.005):
     return biosphere_exchange_indices
 
 
+def read_exchanges(keys: set) -> dict:
+    """Read the exchanges of the activities with the given keys in bulk.
+
+    Returns the data of the exchanges per (input key, output key) in the
+    order in which they are stored.
+    """
+    exchanges = {}
+    conditions = AB_metadata.key_conditions(
+        keys, ExchangeDataset.output_database, ExchangeDataset.output_code
+    )
+    for condition in conditions:
+        query = (
+            ExchangeDataset.select(
+                ExchangeDataset.data,
+                ExchangeDataset.input_database,
+                ExchangeDataset.input_code,
+                ExchangeDataset.output_database,
+                ExchangeDataset.output_code,
+            )
+            .where(condition)
+            .order_by(ExchangeDataset.id)
+        )
+        for data, input_db, input_code, output_db, output_code in query.tuples():
+            # Like `Exchange`, the columns in the table take precedence
+            data["input"] = (input_db, input_code)
+            data["output"] = (output_db, output_code)
+            exchanges.setdefault((data["input"], data["output"]), []).append(data)
+    return exchanges
+
+
 def get_exchanges(lca, indices, biosphere=False, only_uncertain=True):
-    """Get actual exchange objects from indices.
+    """Get the exchange data of the matrix indices.
     By default get only exchanges that have uncertainties.
 
+    The exchanges of all activities are read in bulk, if there are multiple
+    exchanges between two activities the first exchange is used.
+
     Returns
     -------
     exchanges : list
-        List of exchange objects
+        List of exchange data dictionaries
     indices : list of tuples
         List of indices
     """
-    exchanges = list()
-    for i in indices:
-        if biosphere:
-            from_act = bd.get_activity(lca.biosphere_dict_rev[i[0]])
-        else:  # technosphere
-            from_act = bd.get_activity(lca.activity_dict_rev[i[0]])
-        to_act = bd.get_activity(lca.activity_dict_rev[i[1]])
-
-        for exc in to_act.exchanges():
-            if exc.input == from_act.key:
-                exchanges.append(exc)
-                # continue  # if there was always only one max exchange between two activities
-
-    # in theory there should be as many exchanges as indices, but since
-    # multiple exchanges are possible between two activities, the number of
-    # exchanges must be at least equal or higher to the number of indices
-    if len(exchanges) < len(
-        indices
-    ):  # must have at least as many exchanges as indices (assu)
+    if biosphere:
+        from_keys = AB_metadata.ids_to_keys(
+            [lca.biosphere_dict_rev[i[0]] for i in indices]
+        )
+    else:  # technosphere
+        from_keys = AB_metadata.ids_to_keys(
+            [lca.activity_dict_rev[i[0]] for i in indices]
+        )
+    to_keys = AB_metadata.ids_to_keys([lca.activity_dict_rev[i[1]] for i in indices])
+    found = read_exchanges(set(to_keys))
+
+    exchanges = [found.get(pair, [None])[0] for pair in zip(from_keys, to_keys)]
+    missing = exchanges.count(None)
+    if missing:
         raise ValueError(
             "Error: mismatch between indices provided ({}) and Exchanges received ({}).".format(
-                len(indices), len(exchanges)
+                len(indices), len(indices) - missing
             )
         )
 
@@ -148,79 +181,87 @@ def drop_no_uncertainty_exchanges(excs, indices):
     return excs_no, indices_no
 
 
+def activity_fields(keys: list, fields: list) -> pd.DataFrame:
+    """Return the fields of the activities with the given keys, with one row
+    per key. Fields the activity does not have are NaN.
+    """
+    metadata = AB_metadata.load_activities(list(set(keys)))
+    metadata = metadata.reindex(pd.MultiIndex.from_tuples(keys))
+    return metadata.reindex(columns=fields).reset_index(drop=True)
+
+
 def get_exchanges_dataframe(exchanges, indices, biosphere=False):
     """Returns a Dataframe from the exchange data and a bit of additional information."""
-
-    for exc, i in zip(exchanges, indices):
-        from_act = bd.get_activity(exc.get("input"))
-        to_act = bd.get_activity(exc.get("output"))
-
-        exc.update(
-            {
-                "index": i,
-                "from name": from_act.get("name", np.nan),
-                "from location": from_act.get("location", np.nan),
-                "to name": to_act.get("name", np.nan),
-                "to location": to_act.get("location", np.nan),
-            }
+    if not exchanges:
+        return pd.DataFrame()
+    df = pd.DataFrame(exchanges)
+    fields = ["name", "location", "reference product"]
+    from_act = activity_fields(df["input"].to_list(), fields)
+    to_act = activity_fields(df["output"].to_list(), fields)
+
+    df["index"] = indices
+    df["from name"] = from_act["name"]
+    df["from location"] = from_act["location"]
+    df["to name"] = to_act["name"]
+    df["to location"] = to_act["location"]
+
+    # GSA name (needs to yield unique labels!)
+    from_act = from_act.fillna("").astype(str)
+    to_act = to_act.fillna("").astype(str)
+    if biosphere:
+        labels = zip(
+            from_act["name"],
+            to_act["name"],
+            to_act["reference product"],
+            to_act["location"],
         )
-
-        # GSA name (needs to yield unique labels!)
-        if biosphere:
-            exc.update(
-                {
-                    "GSA name": "B: {} // {} ({}) [{}]".format(
-                        from_act.get("name", ""),
-                        to_act.get("name", ""),
-                        to_act.get("reference product", ""),
-                        to_act.get("location", ""),
-                    )
-                }
-            )
-        else:
-            exc.update(
-                {
-                    "GSA name": "T: {} FROM {} [{}] TO {} ({}) [{}]".format(
-                        from_act.get("reference product", ""),
-                        from_act.get("name", ""),
-                        from_act.get("location", ""),
-                        to_act.get("name", ""),
-                        to_act.get("reference product", ""),
-                        to_act.get("location", ""),
-                    )
-                }
-            )
-
-    return pd.DataFrame(exchanges)
+        df["GSA name"] = ["B: {} // {} ({}) [{}]".format(*label) for label in labels]
+    else:
+        labels = zip(
+            from_act["reference product"],
+            from_act["name"],
+            from_act["location"],
+            to_act["name"],
+            to_act["reference product"],
+            to_act["location"],
+        )
+        df["GSA name"] = [
+            "T: {} FROM {} [{}] TO {} ({}) [{}]".format(*label) for label in labels
+        ]
+    # Sort the columns like a dataframe of `Exchange` objects
+    return df.sort_index(axis=1)
 
 
 def get_CF_dataframe(lca, only_uncertain_CFs=True):
     """Returns a dataframe with the metadata for the characterization factors
     (in the biosphere matrix). Filters non-stochastic CFs if desired (default)."""
-    data = dict()
-    for params_index, row in enumerate(lca.cf_params):
-        if only_uncertain_CFs and row["uncertainty_type"] <= 1:
-            continue
-        cf_index = row["row"]
-        bio_act = bd.get_activity(lca.biosphere_dict_rev[cf_index])
-
-        data.update({params_index: bio_act.as_dict()})
-
-        for name in row.dtype.names:
-            data[params_index][name] = row[name]
-
-        data[params_index]["index"] = cf_index
-        data[params_index]["GSA name"] = (
-            "CF: " + bio_act["name"] + str(bio_act["categories"])
-        )
+    params = lca.cf_params
+    if only_uncertain_CFs:
+        params_indices = np.flatnonzero(params["uncertainty_type"] > 1)
+    else:
+        params_indices = np.arange(len(params))
+    rows = params[params_indices]
 
     log.info(
         "CHARACTERIZATION FACTORS filtering resulted in including {} of {} characteriation factors.".format(
-            len(data),
-            len(lca.cf_params),
+            len(rows),
+            len(params),
         )
     )
-    df = pd.DataFrame(data).T
+    if not len(rows):
+        return pd.DataFrame()
+
+    keys = AB_metadata.ids_to_keys(
+        [lca.biosphere_dict_rev[i] for i in rows["row"].tolist()]
+    )
+    metadata = AB_metadata.load_activities(list(set(keys))).drop(columns="key")
+    df = metadata.reindex(pd.MultiIndex.from_tuples(keys))
+    df.index = params_indices
+    for name in rows.dtype.names:
+        df[name] = rows[name]
+
+    df["index"] = rows["row"]
+    df["GSA name"] = "CF: " + df["name"] + df["categories"].map(str)
     df.rename(columns={"uncertainty_type": "uncertainty type"}, inplace=True)
     return df
 
@@ -237,19 +278,10 @@ def get_parameters_DF(mc):
         return pd.DataFrame()  # return emtpy df
 
 
-def get_exchange_values(matrix, indices):
-    """Get technosphere exchanges values from a list of exchanges
-    (row and column information)"""
-    return [matrix[i] for i in indices]
-
-
-def get_X(matrix_list, indices):
+def get_X(mc, matrix, indices):
     """Get the input data to the GSA, i.e. A and B matrix values for each
-    model run."""
-    X = np.zeros((len(matrix_list), len(indices)))
-    for row, M in enumerate(matrix_list):
-        X[row, :] = get_exchange_values(M, indices)
-    return X
+    model run, from the values sampled in the Monte Carlo simulation."""
+    return mc.exchange_values(matrix, indices)
 
 
 def get_X_CF(mc, dfcf, method):
@@ -280,11 +312,148 @@ def get_problem(X, names):
     }
 
 
+class Estimator(NamedTuple):
+    """A sensitivity measure calculated as ``function(problem, X, Y)`` from
+    the sampled inputs X and the (transformed) LCA scores Y of a Monte Carlo
+    simulation. The function returns a dictionary of arrays with a value for
+    each input, inputs are ranked on the absolute value of `rank_by`.
+    """
+
+    name: str
+    function: Callable[[dict, np.ndarray, np.ndarray], dict]
+    rank_by: str
+
+
+def delta_measure(problem, X, Y) -> dict:
+    """Delta moment-independent measure and first-order Sobol indices,
+    calculated by SALib.
+    """
+    return delta.analyze(problem, X, Y, print_to_console=False)
+
+
+def first_order_sobol(problem, X, Y) -> dict:
+    """First-order Sobol indices estimated from the given samples.
+
+    The variance of the conditional mean of Y is found by dividing the
+    samples of each input into equal-frequency bins, with the same number of
+    bins as SALib's delta measure uses.
+    """
+    X, Y = np.asarray(X, dtype=np.float64), np.asarray(Y, dtype=np.float64)
+    N, D = X.shape
+    bins = int(min(np.ceil(N ** (2 / (7 + np.tanh((1500 - N) / 500)))), 48))
+    # Equal values are placed in the same bin
+    ranks = rankdata(X, method="min", axis=0).astype(np.int64) - 1
+    groups = (ranks * bins // N + bins * np.arange(D)).ravel()
+    counts = np.bincount(groups, minlength=bins * D).reshape(D, bins)
+    sums = np.bincount(groups, weights=np.repeat(Y, D), minlength=bins * D)
+    with np.errstate(invalid="ignore"):
+        means = sums.reshape(D, bins) / counts
+    variance = np.nansum(counts * (means - Y.mean()) ** 2, axis=1) / N
+    return {"S1": variance / Y.var()}
+
+
+def correlation(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson correlation of each column of X with y, 0 for constant columns."""
+    X, y = X - X.mean(axis=0), y - y.mean()
+    numerator = X.T @ y
+    denominator = np.sqrt((X**2).sum(axis=0) * (y**2).sum())
+    return np.divide(
+        numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0
+    )
+
+
+def rank_correlation(problem, X, Y) -> dict:
+    """Spearman rank correlation of each input with the LCA score."""
+    return {"spearman": correlation(rankdata(X, axis=0), rankdata(Y))}
+
+
+def standardized_regression(problem, X, Y) -> dict:
+    """Standardized regression coefficients of a linear regression of the
+    LCA score on all inputs, 0 for inputs that do not vary.
+    """
+    X, Y = np.asarray(X, dtype=np.float64), np.asarray(Y, dtype=np.float64)
+    std = X.std(axis=0)
+    varying = std > 0
+    standardized = (X[:, varying] - X[:, varying].mean(axis=0)) / std[varying]
+    coefficients = np.zeros(X.shape[1])
+    coefficients[varying] = np.linalg.lstsq(
+        standardized, (Y - Y.mean()) / Y.std(), rcond=None
+    )[0]
+    return {"SRC": coefficients}
+
+
+# The available sensitivity measures, other estimators can be added here
+ESTIMATORS = {
+    "delta": Estimator("Delta moment-independent measure", delta_measure, "delta"),
+    "sobol": Estimator("First-order Sobol indices", first_order_sobol, "S1"),
+    "spearman": Estimator("Spearman rank correlation", rank_correlation, "spearman"),
+    "src": Estimator(
+        "Standardized regression coefficients", standardized_regression, "SRC"
+    ),
+}
+
+
+def _estimate(functions: dict, problem: dict, X: np.ndarray, Y: np.ndarray) -> dict:
+    """Calculate each of the estimator functions for the same inputs."""
+    results = {}
+    for estimator, function in functions.items():
+        # Exceptions are returned so the other analyses can still be completed
+        try:
+            results[estimator] = function(problem, X, Y)
+        except Exception as e:
+            results[estimator] = e
+    return results
+
+
+def _estimate_all(tasks: list, workers: int):
+    """Yield the results of the `_estimate` tasks in order, as they are
+    calculated in a pool of `workers` processes.
+    """
+    if workers > 1:
+        with process_pool(workers) as pool:
+            yield from pool.map(_estimate, *zip(*tasks))
+    else:
+        for task in tasks:
+            yield _estimate(*task)
+
+
+def get_results_dataframe(metadata, Si, estimator="delta"):
+    """Return the results of the estimator, ranked from most to least
+    influential input, joined with the metadata of the inputs.
+    """
+    dfgsa = pd.DataFrame(Si, index=metadata.index).sort_values(
+        by=ESTIMATORS[estimator].rank_by, key=np.abs, ascending=False
+    )
+    dfgsa.index.names = ["GSA name"]
+
+    # join with metadata
+    df_final = dfgsa.join(metadata, on="GSA name")
+    df_final.reset_index(inplace=True)
+    df_final["pedigree"] = [str(x) for x in df_final["pedigree"]]
+    return df_final
+
+
+class GSAInput(NamedTuple):
+    """The metadata and Monte Carlo values of the inputs and the LCA scores
+    of a reference flow and impact category.
+    """
+
+    activity: object
+    method: tuple
+    metadata: pd.DataFrame
+    X: np.ndarray
+    Y: np.ndarray
+
+
 class GlobalSensitivityAnalysis(object):
     """Class for Global Sensitivity Analysis.
-    For now Delta Moment Independent Measure based on:
+    By default the Delta Moment Independent Measure based on:
     https://salib.readthedocs.io/en/latest/api.html#delta-moment-independent-measure
+    other measures can be chosen from `ESTIMATORS`.
     Builds on top of Monte Carlo Simulation results.
+
+    The inputs and results of each reference flow, impact category and
+    estimator are cached until a new Monte Carlo simulation is run.
     """
 
     def __init__(self, mc):
@@ -293,6 +462,10 @@ class GlobalSensitivityAnalysis(object):
         self.method_number = int()
         self.cutoff_technosphere = float()
         self.cutoff_biosphere = float()
+        self.estimator = "delta"
+        self.run_id = None
+        self.inputs = {}
+        self.results = {}
 
     def update_mc(self, mc):
         "Update the Monte Carlo Simulation object (and results)."
@@ -306,23 +479,36 @@ class GlobalSensitivityAnalysis(object):
                 )
             )
 
-    def perform_GSA(
-        self,
-        act_number=0,
-        method_number=0,
-        cutoff_technosphere=0.01,
-        cutoff_biosphere=0.01,
-    ):
-        """Perform GSA for specific reference flow and impact category."""
-        start = time()
+    def check_cache(self):
+        """Clear the cached inputs and results of an earlier Monte Carlo run."""
+        if self.run_id != self.mc.run_id:
+            self.inputs.clear()
+            self.results.clear()
+            self.run_id = self.mc.run_id
 
+    def get_input(
+        self, act_number, method_number, cutoff_technosphere, cutoff_biosphere
+    ):
+        """Return the (cached) `GSAInput` of the reference flow and impact
+        category, None if the GSA could not be initialized.
+        """
+        self.check_cache()
+        key = (act_number, method_number, cutoff_technosphere, cutoff_biosphere)
+        if key not in self.inputs:
+            gsa_input = self.prepare_input(*key)
+            if gsa_input is None:
+                return None
+            self.inputs[key] = gsa_input
+        return self.inputs[key]
+
+    def prepare_input(
+        self, act_number, method_number, cutoff_technosphere, cutoff_biosphere
+    ):
+        """Filter the relevant exchanges, characterization factors and
+        parameters and collect their Monte Carlo values and metadata.
+        """
         # set FU and method
         try:
-            self.act_number = act_number
-            self.method_number = method_number
-            self.cutoff_technosphere = cutoff_technosphere
-            self.cutoff_biosphere = cutoff_biosphere
-
             self.fu = self.mc.cs["inv"][act_number]
             self.activity = bd.get_activity(self.mc.rev_activity_index[act_number])
             self.method = self.mc.cs["ia"][method_number]
@@ -394,10 +580,10 @@ class GlobalSensitivityAnalysis(object):
         # Get X (Technosphere, Biosphere and CF values)
         X_list = list()
         if self.mc.include_technosphere and self.t_indices:
-            self.Xa = get_X(self.mc.A_matrices, self.t_indices)
+            self.Xa = get_X(self.mc, "technosphere", self.t_indices)
             X_list.append(self.Xa)
         if self.mc.include_biosphere and self.b_indices:
-            self.Xb = get_X(self.mc.B_matrices, self.b_indices)
+            self.Xb = get_X(self.mc, "biosphere", self.b_indices)
             X_list.append(self.Xb)
         if self.mc.include_cfs and not self.dfcf.empty:
             self.Xc = get_X_CF(self.mc, self.dfcf, self.method)
@@ -430,35 +616,170 @@ class GlobalSensitivityAnalysis(object):
                 "Log-transformation cannot be applied as LCA scores overlap zero."
             )
 
-        # print('Filtering took {} seconds'.format(np.round(time() - start, 2)))
+        return GSAInput(self.activity, self.method, self.metadata, self.X, self.Y)
+
+    def perform_GSA(
+        self,
+        act_number=0,
+        method_number=0,
+        cutoff_technosphere=0.01,
+        cutoff_biosphere=0.01,
+        estimator="delta",
+    ):
+        """Perform GSA for specific reference flow and impact category."""
+        start = time()
+        self.act_number = act_number
+        self.method_number = method_number
+        self.cutoff_technosphere = cutoff_technosphere
+        self.cutoff_biosphere = cutoff_biosphere
+        self.estimator = estimator
+
+        gsa_input = self.get_input(
+            act_number, method_number, cutoff_technosphere, cutoff_biosphere
+        )
+        if gsa_input is None:
+            return None
+        self.activity, self.method, self.metadata, self.X, self.Y = gsa_input
 
         # define problem
         self.names = self.metadata.index  # ['GSA name']
         # print('Names:', len(self.names))
         self.problem = get_problem(self.X, self.names)
 
-        # perform delta analysis
-        time_delta = time()
-        self.Si = delta.analyze(self.problem, self.X, self.Y, print_to_console=False)
-        log.info(
-            "Delta analysis took {} seconds".format(
-                np.round(time() - time_delta, 2),
-            )
-        )
-
-        # put GSA results in to dataframe
-        self.dfgsa = pd.DataFrame(self.Si, index=self.names).sort_values(
-            by="delta", ascending=False
+        # perform the analysis
+        key = (
+            act_number,
+            method_number,
+            cutoff_technosphere,
+            cutoff_biosphere,
+            estimator,
         )
-        self.dfgsa.index.names = ["GSA name"]
+        if key not in self.results:
+            time_estimate = time()
+            self.results[key] = ESTIMATORS[estimator].function(
+                self.problem, self.X, self.Y
+            )
+            log.info(
+                "{} took {} seconds".format(
+                    ESTIMATORS[estimator].name,
+                    np.round(time() - time_estimate, 2),
+                )
+            )
+        self.Si = self.results[key]
 
-        # join with metadata
-        self.df_final = self.dfgsa.join(self.metadata, on="GSA name")
-        self.df_final.reset_index(inplace=True)
-        self.df_final["pedigree"] = [str(x) for x in self.df_final["pedigree"]]
+        # put GSA results in to dataframe and join with metadata
+        self.df_final = get_results_dataframe(self.metadata, self.Si, estimator)
 
         log.info("GSA took {} seconds".format(np.round(time() - start, 2)))
 
+    def perform_GSA_all(
+        self,
+        estimators=("delta",),
+        cutoff_technosphere=0.01,
+        cutoff_biosphere=0.01,
+        workers=1,
+        callback: Callable[[int, int], None] = None,
+    ) -> dict:
+        """Perform GSA for all reference flows and impact categories with
+        each of the estimators, in a pool of `workers` processes.
+
+        If given, `callback` is called with the number of completed and the
+        total number of calculations each time one of them is completed.
+
+        The inputs of every reference flow and impact category are prepared
+        once and all estimators of an input are calculated in one task.
+        Returns the results per (act_number, method_number, estimator),
+        combinations for which the GSA fails are logged and left out.
+        """
+        start = time()
+        inputs, tasks = {}, {}
+        for act_number in range(len(self.mc.func_units)):
+            for method_number in range(len(self.mc.methods)):
+                try:
+                    gsa_input = self.get_input(
+                        act_number,
+                        method_number,
+                        cutoff_technosphere,
+                        cutoff_biosphere,
+                    )
+                except Exception as e:
+                    log.error(
+                        "Preparing the GSA failed for reference flow {} and "
+                        "impact category {}: {}".format(act_number, method_number, e)
+                    )
+                    continue
+                if gsa_input is None:
+                    continue
+                inputs[act_number, method_number] = gsa_input
+                # All estimators of an input share one task, so X and Y are
+                # sent to a worker once
+                functions = {
+                    estimator: ESTIMATORS[estimator].function
+                    for estimator in estimators
+                    if (
+                        act_number,
+                        method_number,
+                        cutoff_technosphere,
+                        cutoff_biosphere,
+                        estimator,
+                    )
+                    not in self.results
+                }
+                if functions:
+                    tasks[act_number, method_number] = (
+                        functions,
+                        get_problem(gsa_input.X, gsa_input.metadata.index),
+                        gsa_input.X,
+                        gsa_input.Y,
+                    )
+
+        calculated = _estimate_all(list(tasks.values()), min(workers, len(tasks)))
+        for completed, ((act_number, method_number), task_results) in enumerate(
+            zip(tasks, calculated), 1
+        ):
+            for estimator, result in task_results.items():
+                if isinstance(result, Exception):
+                    log.error(
+                        "GSA failed for reference flow {}, impact category {} and "
+                        "estimator {}: {}".format(
+                            act_number, method_number, estimator, result
+                        )
+                    )
+                    continue
+                key = (
+                    act_number,
+                    method_number,
+                    cutoff_technosphere,
+                    cutoff_biosphere,
+                    estimator,
+                )
+                self.results[key] = result
+            if callback is not None:
+                callback(completed, len(tasks))
+
+        results = {}
+        for (act_number, method_number), gsa_input in inputs.items():
+            for estimator in estimators:
+                key = (
+                    act_number,
+                    method_number,
+                    cutoff_technosphere,
+                    cutoff_biosphere,
+                    estimator,
+                )
+                if key in self.results:
+                    results[act_number, method_number, estimator] = (
+                        get_results_dataframe(
+                            gsa_input.metadata, self.results[key], estimator
+                        )
+                    )
+        log.info(
+            "GSA of {} combinations took {} seconds".format(
+                len(results), np.round(time() - start, 2)
+            )
+        )
+        return results
+
     def get_save_name(self):
         save_name = (
             self.mc.cs_name
@@ -468,6 +789,8 @@ class GlobalSensitivityAnalysis(object):
             + self.activity["name"]
             + "_"
             + str(self.method)
+            + "_"
+            + self.estimator
             + ".xlsx"
         )
         save_name = save_name.replace(",", "").replace("'", "").replace("/", "")
@@ -3,7 +3,8 @@ from .dataframe import (scenario_names_from_df, scenario_replace_databases,
                         superstructure_from_arrays)
 from .excel import get_sheet_names, import_from_excel
 from .file_dialogs import ABPopup
-from .file_imports import ABCSVImporter, ABFeatherImporter, ABFileImporter
+from .file_imports import (ABCSVImporter, ABFeatherImporter, ABFileImporter,
+                           ScenarioFileCache)
 from .manager import SuperstructureManager
 from .mlca import SuperstructureContributions, SuperstructureMLCA
 from .utils import SUPERSTRUCTURE, _time_it_, edit_superstructure_for_string
@@ -4,6 +4,9 @@ import pandas as pd
 from activity_browser.mod import bw2data as bd
 from activity_browser.mod.bw2data.backends import ActivityDataset
 
+from ..metadata import AB_metadata
+from .utils import SUPERSTRUCTURE
+
 FROM_ACT = pd.Index(
     ["from activity name", "from reference product", "from location", "from database"]
 )
@@ -98,6 +101,75 @@ def data_from_index(index: tuple) -> dict:
     }
 
 
+def data_from_keys(keys: set) -> dict:
+    """Read the activities of all given keys at once and return the
+    SUPERSTRUCTURE data of each key as built by `construct_ad_data`.
+
+    Raises
+    ------
+    ActivityDataset.DoesNotExist
+        If any of the keys does not match an activity
+    """
+    result = {}
+    conditions = AB_metadata.key_conditions(
+        keys, ActivityDataset.database, ActivityDataset.code
+    )
+    for condition in conditions:
+        query = (
+            ActivityDataset.select(
+                ActivityDataset.name,
+                ActivityDataset.product,
+                ActivityDataset.location,
+                ActivityDataset.type,
+                ActivityDataset.database,
+                ActivityDataset.code,
+                ActivityDataset.data,
+            )
+            .where(condition)
+            .namedtuples()
+        )
+        result.update(map(construct_ad_data, query.iterator()))
+    missing = set(keys).difference(result)
+    if missing:
+        raise ActivityDataset.DoesNotExist(
+            "Activities do not exist: {}".format(", ".join(map(str, missing)))
+        )
+    return result
+
+
+def data_from_indices(indices) -> pd.DataFrame:
+    """Take the given 'Index' tuples and build the complete SUPERSTRUCTURE
+    rows for all of them, equal to calling `data_from_index` for each.
+
+    Each distinct activity is read only once.
+    """
+    from_keys = [tuple(index[0]) for index in indices]
+    to_keys = [tuple(index[1]) for index in indices]
+    data = data_from_keys(set(from_keys).union(to_keys))
+
+    # Rows of the activity data are selected by the position of their key
+    position = dict(zip(data, range(len(data))))
+    activities = pd.DataFrame(
+        list(data.values()),
+        columns=[
+            "activity name",
+            "reference product",
+            "location",
+            "categories",
+            "database",
+        ],
+    )
+    parts = []
+    for prefix, keys in (("from", from_keys), ("to", to_keys)):
+        part = activities.iloc[[position[key] for key in keys]].reset_index(drop=True)
+        part.columns = ["{} {}".format(prefix, c) for c in part.columns]
+        part["{} key".format(prefix)] = pd.Series(keys, dtype=object)
+        parts.append(part)
+    df = pd.concat(parts, axis=1)
+    df["flow type"] = [index[2] if len(index) > 2 else np.NaN for index in indices]
+    return df.reindex(columns=SUPERSTRUCTURE).infer_objects()
+
+
 def get_relevant_activities(df: pd.DataFrame, part: str = "from") -> dict:
     """Build a dictionary of (name, product, location) -> (database, key) pairs."""
     select = FROM_ACT if part == "from" else TO_ACT
@@ -1,16 +1,25 @@
 # -*- coding: utf-8 -*-
 from ast import literal_eval
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Union
+from typing import Iterator, List, Union
 from logging import getLogger
 
+import numpy as np
 import openpyxl
 import pandas as pd
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
 
+from ...ui.threading import thread_local
+from .file_imports import literal_keys
 from .utils import SUPERSTRUCTURE
 
 log = getLogger(__name__)
 
+# Number of rows that are converted into a dataframe at once
+CHUNK_SIZE = 10000
+
 
 def convert_tuple_str(x):
     try:
@@ -22,7 +31,9 @@ def convert_tuple_str(x):
 def get_sheet_names(document_path: Union[str, Path]) -> List[str]:
     try:
         wb = openpyxl.load_workbook(filename=document_path, read_only=True)
-        return wb.sheetnames
+        sheetnames = wb.sheetnames
+        wb.close()
+        return sheetnames
     except UnicodeDecodeError as e:
         log.error("Given document uses an unknown encoding: {}".format(e))
 
@@ -55,6 +66,134 @@ def valid_cols(name: str) -> bool:
     return False if str(name).startswith("#") else True
 
 
+def convert_cell(cell):
+    """Return the value of the cell in the same way as `pd.read_excel`."""
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def remove_comment(values: list, comment: str = "*") -> list:
+    """Cut the row off at the first value that contains the comment
+    character, keeping the part of that value before the character.
+    """
+    for i, value in enumerate(values):
+        if isinstance(value, str) and comment in value:
+            value = value[: value.find(comment)]
+            return values[:i] + [value] if value else values[:i]
+    return values
+
+
+def column_names(header: list) -> list:
+    """Name the columns the way `pd.read_excel` does: unnamed columns are
+    named after their position and duplicate names are numbered.
+    """
+    names = [
+        "Unnamed: {}".format(i) if value == "" else value
+        for i, value in enumerate(header)
+    ]
+    counts = defaultdict(int)
+    for i, name in enumerate(names):
+        count = counts[name]
+        while count > 0:
+            counts[name] = count + 1
+            name = "{}.{}".format(name, count)
+            count = counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def sheet_rows(sheet) -> Iterator[list]:
+    """Yield the converted values of every row in the sheet, without the
+    empty cells at the end of the row.
+
+    Progress is reported to the thread the rows are read in.
+    """
+    # The stored dimensions are only used to report progress, they can be
+    # wrong so the rows are read until the actual end of the sheet
+    total = sheet.max_row
+    sheet.reset_dimensions()
+    for i, row in enumerate(sheet.rows):
+        values = [convert_cell(cell) for cell in row]
+        while values and values[-1] == "":
+            values.pop()
+        yield values
+        if i % CHUNK_SIZE == 0:
+            percentage = min(int(100 * i / total), 99) if total else 0
+            try:
+                thread_local.progress_slot(percentage, "Reading scenario file")
+            except AttributeError:
+                pass
+
+
+def read_sheet(sheet) -> pd.DataFrame:
+    """Read the sheet into a dataframe as `pd.read_excel` would with the
+    header found by `get_header_index`.
+
+    The rows are streamed from the sheet and converted into typed
+    dataframes per `CHUNK_SIZE` rows, columns whose header starts with a '#'
+    are skipped directly. Rows are cut off at a '*', unlike `pd.read_excel`
+    the rows that are left empty by this are skipped instead of read as
+    rows without any values.
+    """
+    rows = sheet_rows(sheet)
+    width = 0
+    for _, header in zip(range(10), rows):
+        width = max(width, len(header))
+        if header and header[0] != "" and isinstance(header[0], str):
+            break
+    else:
+        raise ValueError("Could not find required headers in given document sheet.")
+    header = remove_comment(header)
+    names = column_names(header + [""] * (width - len(header)))
+    columns = [i for i, name in enumerate(names) if valid_cols(name)]
+
+    def parse(chunk: list) -> pd.DataFrame:
+        return TextParser(
+            [[row[i] for i in columns] for row in chunk],
+            names=[names[i] for i in columns],
+            header=None,
+            na_values=[""],
+            keep_default_na=False,
+        ).read()
+
+    frames, chunk, empty = [], [], 0
+    for values in rows:
+        if not values:
+            # Empty rows are only kept if there is data below them
+            empty += 1
+            continue
+        chunk.extend([[""] * width] * empty)
+        empty = 0
+        if len(values) > width:
+            # Wider rows add unnamed columns to the sheet
+            width = len(values)
+            names = column_names(names + [""] * (width - len(names)))
+            chunk = [row + [""] * (width - len(row)) for row in chunk]
+            columns = [i for i, name in enumerate(names) if valid_cols(name)]
+        values = values + [""] * (width - len(values))
+        row = remove_comment(values)
+        if row is not values and (
+            not row or len(row) == 1 and isinstance(row[0], str) and not row[0].strip()
+        ):
+            # Commented out row
+            continue
+        chunk.append(row + [""] * (width - len(row)))
+        if len(chunk) >= CHUNK_SIZE:
+            frames.append(parse(chunk))
+            chunk = []
+    if chunk or not frames:
+        frames.append(parse(chunk))
+    data = pd.concat(frames, ignore_index=True)
+    return data.reindex(columns=[names[i] for i in columns])
+
+
 def import_from_excel(
     document_path: Union[str, Path], import_sheet: int = 1
 ) -> pd.DataFrame:
@@ -69,22 +208,18 @@ def import_from_excel(
     A '#' character at the start of a column will cause that column to be
     excluded from the import.
 
-    'usecols' is used to exclude specific columns from the excel document.
-    'comment' is used to exclude specific rows from the excel document.
+    The workbook is opened once in read-only mode and the sheet is read in
+    chunks, see `read_sheet`.
     """
     data = pd.DataFrame({})
     try:
-        header_idx = get_header_index(document_path, import_sheet)
-        data = pd.read_excel(
-            document_path,
-            sheet_name=import_sheet,
-            header=header_idx,
-            usecols=valid_cols,
-            comment="*",
-            na_values="",
-            keep_default_na=False,
-            engine="openpyxl",
+        wb = openpyxl.load_workbook(
+            filename=document_path, read_only=True, data_only=True, keep_links=False
         )
+        try:
+            data = read_sheet(wb.worksheets[import_sheet])
+        finally:
+            wb.close()
         diff = SUPERSTRUCTURE.difference(data.columns)
         if not diff.empty:
             raise ValueError(
@@ -95,7 +230,9 @@ def import_from_excel(
 
         # Convert specific columns that may have tuples as strings
         columns = ["from categories", "from key", "to categories", "to key"]
-        data.loc[:, columns] = data[columns].map(convert_tuple_str)
+        for column in columns:
+            if not pd.api.types.is_numeric_dtype(data[column]):
+                data[column] = literal_keys(data[column], convert_tuple_str)
     except:
         # skip the error checks here, these now occur in the calling layout.tabs.LCA_setup module
         pass
@@ -1,4 +1,6 @@
 import ast
+import hashlib
+import pickle
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Optional, Union
@@ -6,10 +8,30 @@ from logging import getLogger
 
 import pandas as pd
 
+from activity_browser.mod import bw2data as bd
+
 from ..errors import *
 
 log = getLogger(__name__)
 
+# Keys written as ('database', 'code'), the form in which keys are exported
+KEY_PATTERN = r"^\(\s*'([^'\\]*)'\s*,\s*'([^'\\]*)'\s*\)$"
+
+
+def literal_keys(column: pd.Series, evaluate=ast.literal_eval) -> pd.Series:
+    """Convert the keys in the column from strings into tuples, as
+    `evaluate` would.
+
+    Keys in the common ``('database', 'code')`` form are converted at once
+    through a regular expression, only other values are evaluated separately.
+    """
+    parts = column.str.extract(KEY_PATTERN)
+    matched = parts[0].notna().to_numpy()
+    result = pd.Series(list(zip(parts[0], parts[1])), index=column.index, dtype=object)
+    if not matched.all():
+        result[~matched] = column[~matched].map(evaluate)
+    return result
+
 
 class ABFileImporter(ABC):
     """
@@ -57,26 +79,17 @@ class ABFileImporter(ABC):
         The source and destination keys are provided for the first exchange where
         this error occurs.
         """
-        try:
-            for ds in zip(
-                data["from database"],
-                data["from key"],
-                data["to database"],
-                data["to key"],
-                data["from activity name"],
-                data["to activity name"],
-            ):
-                if (
-                    ds[0] != ds[1].split(",")[0][2:-1]
-                    or ds[2] != ds[3].split(",")[0][2:-1]
-                ):
-                    msg = "Error in importing file with activity {} and {}".format(
-                        ds[4], ds[5]
-                    )
-                    raise IncompatibleDatabaseNamingError()
-        except IncompatibleDatabaseNamingError as e:
-            log.error(msg)
-            raise e
+        incongruent = (
+            data["from key"].str.split(",").str[0].str[2:-1] != data["from database"]
+        ) | (data["to key"].str.split(",").str[0].str[2:-1] != data["to database"])
+        if incongruent.any():
+            first = data.loc[incongruent].iloc[0]
+            log.error(
+                "Error in importing file with activity {} and {}".format(
+                    first["from activity name"], first["to activity name"]
+                )
+            )
+            raise IncompatibleDatabaseNamingError()
 
     @staticmethod
     def production_process_check(data: pd.DataFrame, scenario_names: list) -> None:
@@ -85,26 +98,17 @@ class ABFileImporter(ABC):
         ActivityProductionValueError is thrown with the source and destination activity names of the
         exchanges being provided
         """
-        failed = pd.DataFrame({})
-        try:
-            for scenario in scenario_names:
-                failed = pd.concat(
-                    [
-                        data.loc[
-                            (data.loc[:, "flow type"] == "production")
-                            & (data.loc[:, scenario] == 0.0)
-                        ],
-                        failed,
-                    ]
-                )
-            if not failed.empty:
-                msg = "Error with the production value in the exchange between activity {} and {}".format(
+        failed = data.loc[
+            (data.loc[:, "flow type"] == "production")
+            & (data.loc[:, scenario_names] == 0.0).any(axis=1)
+        ]
+        if not failed.empty:
+            log.error(
+                "Error with the production value in the exchange between activity {} and {}".format(
                     failed["from activity name"], failed["to activity name"]
                 )
-                raise ActivityProductionValueError()
-        except ActivityProductionValueError as e:
-            log.error(msg)
-            raise e
+            )
+            raise ActivityProductionValueError()
 
     @staticmethod
     def na_value_check(data: pd.DataFrame, fields: list) -> None:
@@ -114,20 +118,14 @@ class ABFileImporter(ABC):
         The first contains the list of the source activity names, the second the destination activity names
         of the exchange
         """
-        hasNA = pd.DataFrame({})
-        try:
-            for field in fields:
-                hasNA = pd.concat([data.loc[data[field].isna()], hasNA])
-            if not hasNA.empty:
-                msg = (
-                    "Error with NA's in the exchange between activity {} and {}".format(
-                        hasNA["from activity name"], hasNA["to activity name"]
-                    )
+        hasNA = data.loc[data.loc[:, fields].isna().any(axis=1)]
+        if not hasNA.empty:
+            log.error(
+                "Error with NA's in the exchange between activity {} and {}".format(
+                    hasNA["from activity name"], hasNA["to activity name"]
                 )
-                raise InvalidSDFEntryValue()
-        except InvalidSDFEntryValue as e:
-            log.error(msg)
-            raise e
+            )
+            raise InvalidSDFEntryValue()
 
     @staticmethod
     def check_for_calculation_errors(data: pd.DataFrame) -> None:
@@ -140,13 +138,11 @@ class ABFileImporter(ABC):
                 ABFileImporter.ABStandardBiosphereColumns
             )
         )
-        for scen in scen_cols:
-            error = data.loc[(data[scen] == "#DIV/0!") | (data[scen] == "#VALUE!")]
-            if not error.empty:
-                msg = "Error with values for the exchanges between {} and {}".format(
-                    data.loc[0, "from activity name"], data.loc[0, "to activity name"]
-                )
-                raise ExchangeErrorValues(msg)
+        if data.loc[:, list(scen_cols)].isin(["#DIV/0!", "#VALUE!"]).any().any():
+            msg = "Error with values for the exchanges between {} and {}".format(
+                data.loc[0, "from activity name"], data.loc[0, "to activity name"]
+            )
+            raise ExchangeErrorValues(msg)
 
     @staticmethod
     def fill_nas(data: pd.DataFrame) -> pd.DataFrame:
@@ -225,7 +221,94 @@ class ABCSVImporter(ABFileImporter):
             compression="infer",
             sep=separator,
             index_col=False,
-            converters={"from key": ast.literal_eval, "to key": ast.literal_eval},
+            converters={"from key": str, "to key": str},
         )
-        # ... execute code
+        for column in ("from key", "to key"):
+            if column in df.columns:
+                df[column] = literal_keys(df[column])
         return df
+
+
+class ScenarioFileCache(object):
+    """Stores the validated dataframe of a scenario file in the project
+    directory, so the file does not have to be read and checked again when
+    it is loaded another time.
+
+    Entries are identified by a hash of the file content and the options used
+    to read it, an entry is outdated once any of the databases it refers to
+    has been modified.
+    """
+
+    CACHE_DIRECTORY = "ab_scenarios"
+    # Number of scenario files kept in the cache
+    MAX_ENTRIES = 10
+
+    def __init__(self, path: Union[str, Path], *options):
+        self.path = Path(path)
+        digest = hashlib.sha256(repr(options).encode())
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.digest = digest.hexdigest()
+
+    @classmethod
+    def directory(cls) -> Path:
+        return Path(bd.projects.dir) / cls.CACHE_DIRECTORY
+
+    @property
+    def cache_path(self) -> Path:
+        return self.directory() / "{}.pickle".format(self.digest)
+
+    @staticmethod
+    def database_state(df: pd.DataFrame) -> Optional[dict]:
+        """Return the modification time of each database in the dataframe,
+        or None if any of them does not exist.
+        """
+        dbs = set(df["from database"]).union(df["to database"])
+        if not dbs.issubset(bd.databases):
+            return None
+        return {db: bd.databases[db].get("modified") for db in dbs}
+
+    def read(self) -> Optional[pd.DataFrame]:
+        """Return the cached dataframe of the file, None if there is no
+        cache or if it is outdated.
+        """
+        if not self.cache_path.is_file():
+            return None
+        try:
+            with open(self.cache_path, "rb") as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            log.debug(f"Could not read scenario cache of {self.path.name}: {e}")
+            return None
+        if cache.get("databases") != self.database_state(cache["data"]):
+            log.debug(f"Scenario cache of {self.path.name} is outdated")
+            return None
+        log.info(f"Read scenario file {self.path.name} from cache")
+        return cache["data"]
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Store the validated dataframe of the file, together with the
+        modification times of its databases.
+        """
+        databases = self.database_state(df)
+        if databases is None:
+            return
+        try:
+            self.directory().mkdir(parents=True, exist_ok=True)
+            with open(self.cache_path, "wb") as f:
+                pickle.dump(
+                    {"databases": databases, "data": df},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            # Remove the least recently written entries
+            entries = sorted(
+                self.directory().glob("*.pickle"),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+            for entry in entries[self.MAX_ENTRIES :]:
+                entry.unlink()
+        except OSError as e:
+            log.warning(f"Could not write scenario cache of {self.path.name}: {e}")
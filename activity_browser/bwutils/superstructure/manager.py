@@ -19,7 +19,7 @@ from ..errors import (CriticalScenarioExtensionError, ImportCanceledError,
 from .activities import fill_df_keys_with_fields, get_activities_from_keys
 from .dataframe import scenario_columns
 from .file_dialogs import ABPopup
-from .utils import SUPERSTRUCTURE, _time_it_, guess_flow_type
+from .utils import SUPERSTRUCTURE, _time_it_, guess_flow_types
 
 log = getLogger(__name__)
 
@@ -277,15 +277,7 @@ class SuperstructureManager(object):
         A pandas dataframe with the changes made to the scenario dataframe for these self referential flows
         """
         self_referential_production_flows = df.loc[
-            df.apply(
-                lambda x: (
-                    True
-                    if x["from key"] == x["to key"] and x["flow type"] == "technosphere"
-                    else False
-                ),
-                axis=1,
-            ),
-            :,
+            (df["from key"] == df["to key"]) & (df["flow type"] == "technosphere"), :
         ].copy()
         self_referential_production_flows.index = pd.MultiIndex.from_arrays(
             [
@@ -307,22 +299,26 @@ class SuperstructureManager(object):
         self_referential_production_flows.loc[prod_indexes, "flow type"] = "production"
 
         # TODO use metadata for the default production values
-        for idx in self_referential_production_flows.loc[
+        missing = self_referential_production_flows.index[
             ~self_referential_production_flows.index.isin(df.index)
-        ].index:
-
-            # this flow to self does not have a similar 'production' flow to self.
+        ]
+        if len(missing) > 0:
+            # these flows to self do not have a similar 'production' flow to self.
             # find the default production value and add it as a 'production' flow
 
             # WARNING: this way of getting the production amount only works for processes with
             # 1 reference flow (because we just take index 0 from list of production exchanges)
             # Once AB has support for multiple reference flows, we need to adjust this code to match the
             # right flow -something with looping over the flows and getting the right product or something-.
-            prod_amt = list(bd.get_activity(idx[0]).production())[0].get("amount", 1)
-            # make a new df to edit the production, add the correct values/indices where needed
-            # and concat to the main df
-            self_referential_production_flows.loc[idx, ["flow type"]] = "production"
-            self_referential_production_flows.loc[idx, scenario_cols] = prod_amt
+            prod_amts = {
+                key: list(bd.get_activity(key).production())[0].get("amount", 1)
+                for key in set(missing.get_level_values(0))
+            }
+            amounts = np.array([prod_amts[idx[0]] for idx in missing], dtype=float)
+            self_referential_production_flows.loc[missing, "flow type"] = "production"
+            self_referential_production_flows.loc[missing, scenario_cols] = np.repeat(
+                amounts[:, None], len(scenario_cols), axis=1
+            )
         if len(self_referential_production_flows) > 0:
             tech_idxs = [
                 (x[0], x[1], "technosphere")
@@ -377,11 +373,11 @@ class SuperstructureManager(object):
                     unknown_flows.sum()
                 )
             )
-            df.loc[unknown_flows, "flow type"] = df.loc[
-                unknown_flows, EXCHANGE_KEYS
-            ].apply(guess_flow_type, axis=1)
+            df.loc[unknown_flows, "flow type"] = guess_flow_types(
+                df.loc[unknown_flows, EXCHANGE_KEYS]
+            )
         return pd.MultiIndex.from_tuples(
-            df.loc[:, INDEX_KEYS].apply(tuple, axis=1),
+            list(zip(df["from key"], df["to key"], df["flow type"])),
             names=["input", "output", "flow"],
         )
 
@@ -631,10 +627,11 @@ class SuperstructureManager(object):
     ) -> pd.DataFrame:
         # TODO create useful docstring, already clear this is a private method from '_' prefix
         """NOT TO BE USED OUTSIDE OF CALLING METHOD check_duplicates"""
-        df = data.copy()
-        df.index = pd.Index([str(i) for i in range(df.shape[0])])
-        duplicates = df.duplicated(index, keep=False)
+        duplicates = data.duplicated(index, keep=False)
         if duplicates.any():
+            df = data.copy()
+            df.index = pd.Index([str(i) for i in range(df.shape[0])])
+            duplicates.index = df.index
             msg = (
                 "<p>Duplicates have been found, meaning that there are several rows in the scenario file describing "
                 "scenarios for the same flow. The AB can deal with this by discarding all but the last row for this "
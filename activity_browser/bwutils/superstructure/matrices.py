@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Functions for writing superstructure scenario values into LCA matrices.
+
+The position of every scenario exchange in the `data` array of its (CSR)
+matrix is resolved once, after which switching scenarios is a single
+vectorized write per matrix.
+"""
+from typing import Dict, Iterable, NamedTuple
+
+import numpy as np
+from scipy import sparse
+
+from ..batch import data_offsets
+
+
+class ScenarioPositions(NamedTuple):
+    """Positions of the scenario exchanges that belong to one matrix."""
+
+    selection: np.ndarray  # Rows of the scenario values array
+    offsets: np.ndarray  # Positions in the data array of the matrix
+    signs: np.ndarray  # -1 for technosphere inputs, 1 otherwise
+    defaults: np.ndarray  # Matrix values used where a scenario has no value
+
+
+def scenario_positions(
+    matrix: sparse.csr_matrix,
+    matrix_indices: np.ndarray,
+    kinds: np.ndarray,
+    matrix_kinds: Iterable[str],
+) -> ScenarioPositions:
+    """Resolve the positions of the scenario exchanges of the given kinds
+    ('technosphere', 'production' or 'biosphere') in the matrix.
+    """
+    selection = np.flatnonzero(np.isin(kinds, list(matrix_kinds)))
+    idx = matrix_indices[selection]
+    offsets = data_offsets(matrix, idx["row"], idx["col"])
+    # Technosphere inputs are stored as negative values in the matrix
+    signs = np.where(
+        (kinds[selection] == "technosphere") & (idx["type"] == 1), -1.0, 1.0
+    )
+    return ScenarioPositions(selection, offsets, signs, matrix.data[offsets].copy())
+
+
+def apply_scenario(
+    matrices: Dict[str, sparse.csr_matrix],
+    positions: Dict[str, ScenarioPositions],
+    sample: np.ndarray,
+) -> None:
+    """Write the scenario `sample` into the given matrices.
+
+    Both `matrices` and `positions` are keyed by matrix name, NaN values in
+    the sample are replaced with the default values of the matrix.
+    """
+    for name, position in positions.items():
+        values = sample[position.selection]
+        matrices[name].data[position.offsets] = np.where(
+            np.isnan(values), position.defaults, values * position.signs
+        )
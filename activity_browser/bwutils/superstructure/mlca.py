@@ -1,25 +1,28 @@
 # -*- coding: utf-8 -*-
 from typing import Iterable, Optional
+from logging import getLogger
 
 import numpy as np
 import pandas as pd
 from PySide2.QtWidgets import QPushButton
 
 from activity_browser.mod import bw2data as bd
+from activity_browser.settings import ab_settings
 
+from ..batch import ScenarioSolver, batch_calculation, include_entries
 from ..commontasks import format_activity_label
 from ..errors import ScenarioExchangeNotFoundError
 from ..multilca import MLCA, Contributions
+from ..results import ContributionArray
 from ..utils import Index
 from .dataframe import (arrays_from_indexed_superstructure,
                         filter_databases_indexed_superstructure,
                         scenario_names_from_df)
 from .file_dialogs import ABPopup
+from .matrices import apply_scenario, scenario_positions
+from .parallel import ScenarioResult, calculate_scenarios
 
-try:
-    from bw2calc.matrices import TechnosphereBiosphereMatrixBuilder as MB
-except ModuleNotFoundError:
-    pass  # removed in bw25
+log = getLogger(__name__)
 
 
 class SuperstructureMLCA(MLCA):
@@ -45,22 +48,13 @@ class SuperstructureMLCA(MLCA):
 
         super().__init__(cs_name)
 
-        # Scenarios overwrite the lca.xxx_matrix. For supporting absent values
-        # in scenario files defaults are required, to prevent these from being
-        # overwritten duplicates are required...
-        self.default_technosphere_matrix = self.lca.technosphere_matrix.copy()
-        self.default_biosphere_matrix = self.lca.biosphere_matrix.copy()
-        self.defaults = {
-            "technosphere": "default_technosphere_matrix",
-            "production": "default_technosphere_matrix",
-            "biosphere": "default_biosphere_matrix",
-        }
-
         # Filter dataframe for keys that do not occur in the LCA matrix.
         df = filter_databases_indexed_superstructure(df, self.all_databases)
         assert not df.empty, "Filtering unused flows removed all of the scenario data."
 
         self.indices, self.values = arrays_from_indexed_superstructure(df)
+        # Store scenario columns contiguously for fast scenario switching
+        self.values = np.asfortranarray(self.values)
         # Note: Using the mapping scheme from brightway and presamples,
         # the 'input' keys are matched to the product_dict or
         # biosphere_dict ('rows') while the 'output' keys are matched
@@ -79,6 +73,22 @@ class SuperstructureMLCA(MLCA):
         )
         self.indices_to_matrix()
 
+        # Scenarios overwrite the lca.xxx_matrix. For supporting absent values
+        # in scenario files defaults are required, to prevent these from being
+        # overwritten duplicates are required...
+        self.default_technosphere_matrix = self.lca.technosphere_matrix.copy()
+        self.default_biosphere_matrix = self.lca.biosphere_matrix.copy()
+        # Scenarios are solved by reusing or updating the factorization of the
+        # default technosphere where they change few (or no) technosphere columns
+        self.scenario_solver = ScenarioSolver(
+            self.default_technosphere_matrix, ab_settings.scenario_update_threshold
+        )
+        self.defaults = {
+            "technosphere": "default_technosphere_matrix",
+            "production": "default_technosphere_matrix",
+            "biosphere": "default_biosphere_matrix",
+        }
+
         # Construct an index dictionary similar to fu_index and method_index
         self._current_index = 0
         self.scenario_index = {k: i for i, k in enumerate(self.scenario_names)}
@@ -87,21 +97,25 @@ class SuperstructureMLCA(MLCA):
         self.lca_scores = np.zeros(
             (len(self.func_units), len(self.methods), self.total)
         )
-        self.elementary_flow_contributions = np.zeros(
+        self.elementary_flow_contributions = ContributionArray(
+            self.result_store,
+            "elementary_flow",
             (
                 len(self.func_units),
                 len(self.methods),
                 self.total,
                 self.lca.biosphere_matrix.shape[0],
-            )
+            ),
         )
-        self.process_contributions = np.zeros(
+        self.process_contributions = ContributionArray(
+            self.result_store,
+            "process",
             (
                 len(self.func_units),
                 len(self.methods),
                 self.total,
                 self.lca.technosphere_matrix.shape[0],
-            )
+            ),
         )
 
     @property
@@ -160,123 +174,82 @@ class SuperstructureMLCA(MLCA):
             except Exception as e:
                 continue
 
+        # The kind of exchange ('technosphere', 'production' or 'biosphere') per index
+        self.index_kinds = np.array([idx[2] for idx in self.indices])
+
+        # Make sure every scenario exchange has an entry in its matrix and
+        # resolve the positions of these entries once.
+        self.positions = {}
+        for name in set(self.matrices.values()):
+            kinds = [k for k, n in self.matrices.items() if n == name]
+            selected = self.matrix_indices[np.isin(self.index_kinds, kinds)]
+            if not hasattr(self.lca, name) or len(selected) == 0:
+                # This LCA doesn't have this matrix or the scenarios don't alter it
+                continue
+            matrix = include_entries(
+                getattr(self.lca, name), selected["row"], selected["col"]
+            )
+            setattr(self.lca, name, matrix)
+            self.positions[name] = scenario_positions(
+                matrix, self.matrix_indices, self.index_kinds, kinds
+            )
+
     def update_matrices(self) -> None:
         """A Simplified version of the `PackagesDataLoader.update_matrices` method.
         In this case, we expect to only replace technosphere and biosphere
         values, leaving out characterization factor values.
+
+        The positions of the scenario exchanges are resolved in
+        `indices_to_matrix`, so this is a single write per matrix.
         """
-        kinds = set([idx[2] for idx in self.indices])
-        types = np.array([idx[2] for idx in self.indices])
-        for kind in kinds:
-            idx = self.matrix_indices[types == kind]
-            sample = self.values[types == kind, self.current]
-            # Previously filtered sample and idx for NaN values in samples.
-            # Currently replaces sample NaN values with defaults from the databases
-            if np.isnan(sample).any():
-                default = getattr(self, self.defaults[kind])
-                na_idx = idx[np.isnan(sample)]
-                if kind == "technosphere":
-                    sample[np.isnan(sample)] = np.multiply(
-                        default[na_idx["row"], na_idx["col"]].tolist()[0], -1
-                    )
-                else:
-                    sample[np.isnan(sample)] = default[
-                        na_idx["row"], na_idx["col"]
-                    ].tolist()[0]
-            try:
-                matrix = getattr(self.lca, self.matrices[kind])
-            except AttributeError:
-                # This LCA doesn't have this matrix
-                continue
+        if hasattr(self.lca, "solver") and "technosphere_matrix" in self.positions:
+            # Remove existing matrix factorization
+            # because changing technosphere
+            delattr(self.lca, "solver")
+        matrices = {name: getattr(self.lca, name) for name in self.positions}
+        apply_scenario(matrices, self.positions, self.values[:, self.current])
 
-            if self.matrices[kind] == "technosphere_matrix":
-                # Remove existing matrix factorization
-                # because changing technosphere
-                if hasattr(self.lca, "solver"):
-                    delattr(self.lca, "solver")
+    def _perform_calculations(self):
+        """Near copy of `MLCA` class, but includes a loop for all scenarios.
 
-            # TODO: Check if this doesnt break stuff
-            # TODO: Update: It does..
-            try:
-                if kind == "technosphere":
-                    MB.fix_supply_use(idx, sample)
-            except:
-                # removed in BW25
-                mask = np.where(idx["type"] == 1)
-                sample[mask] = -1 * sample[mask]
-            matrix[
-                idx["row"],
-                idx["col"],
-            ] = sample
+        If more than one scenario worker is configured in the settings the
+        scenarios are calculated in a process pool, see `calculate_scenarios`.
+        """
+        workers = min(ab_settings.scenario_workers, self.total)
+        if workers > 1:
+            for result in calculate_scenarios(self, workers):
+                self._store_scenario(result)
+            # Leave the LCA matrices in the same state as the serial calculation
+            self.current = self.total - 1
+            self.next_scenario()
+            return
 
-    def _perform_calculations(self):
-        """Near copy of `MLCA` class, but includes a loop for all scenarios."""
         for ps_col in range(self.total):
             self.next_scenario()
-            for row, func_unit in enumerate(self.func_units):
-                try:
-                    self.lca.redo_lci(func_unit)
-                except:
-                    # bw25 compatibility requires activity id instead of activity key
-                    key = list(func_unit.keys())[0]
-                    self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
-
-                self.scaling_factors.update(
-                    {(str(func_unit), ps_col): self.lca.supply_array}
-                )
-                self.technosphere_flows.update(
-                    {
-                        (str(func_unit), ps_col): np.multiply(
-                            self.lca.supply_array,
-                            self.lca.technosphere_matrix.diagonal(),
-                        )
-                    }
-                )
-                self.inventory.update(
-                    {
-                        (str(func_unit), ps_col): np.array(
-                            self.lca.inventory.sum(axis=1)
-                        ).ravel()
-                    }
-                )
-                self.inventories.update({(str(func_unit), ps_col): self.lca.inventory})
-
-                for col, cf_matrix in enumerate(self.method_matrices):
-                    self.lca.characterization_matrix = cf_matrix
-                    self.lca.lcia_calculation()
-                    self.lca_scores[row, col, ps_col] = self.lca.score
-                    self.characterized_inventories[(row, col, ps_col)] = (
-                        self.lca.characterized_inventory.copy()
-                    )
-                    self.elementary_flow_contributions[row, col, ps_col] = np.array(
-                        self.lca.characterized_inventory.sum(axis=1)
-                    ).ravel()
-                    self.process_contributions[row, col, ps_col] = (
-                        self.lca.characterized_inventory.sum(axis=0)
-                    )
-
-    def update_lca_calculation_for_sankey(
-        self, scenario_index: int, func_unit: str, method_index: int
-    ):
-        """
-        Reuses the LCA object to prepare the LCA object for necessary calculations to be made before performing the
-        Graph Traversal calculations
+            solver, path = self.scenario_solver.solver(self.lca.technosphere_matrix)
+            results = batch_calculation(
+                self.lca.technosphere_matrix,
+                self.lca.biosphere_matrix,
+                self.demand_matrix,
+                self.characterization,
+                solver,
+            )
+            diagonal = self.lca.technosphere_matrix.diagonal()
+            self._store_scenario(
+                ScenarioResult(ps_col, path, results, diagonal, self.lca.biosphere_matrix)
+            )
 
-        @param scenario_index: Index of the Scenario for which the calculation must be performed
-        @param func_unit: The functional unit for which the calculation must be performed
-        @param method_index: Index of the method for which the calculation must be performed
-        """
-        self.current = scenario_index
-        self.update_matrices()
-        try:
-            self.lca.redo_lci(func_unit)
-        except:
-            # brightway25 compatibility
-            key = list(func_unit.keys())[0]
-            self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
-        self.lca.characterization_matrix = self.method_matrices[method_index]
-        self.lca.lcia_calculation()
-        self.lca.decompose_technosphere()
+    def _store_scenario(self, result: ScenarioResult) -> None:
+        log.info(
+            f"Scenario '{self.scenario_names[result.scenario]}': solved using {result.path}"
+        )
+        self.lca_scores[:, :, result.scenario] = result.results.scores
+        biosphere_matrix = result.biosphere_matrix
+        if biosphere_matrix is None:
+            biosphere_matrix = self.default_biosphere_matrix
+        self._store_inventories(
+            result.results, result.scenario, result.diagonal, biosphere_matrix
+        )
 
     def get_results_for_method(self, index: int = 0) -> pd.DataFrame:
         """Overrides the parent and returns a dataframe with the scenarios
@@ -346,14 +319,15 @@ class SuperstructureContributions(Contributions):
         return self._build_lca_scores_df(scores)
 
     def _build_contributions(
-        self, data: np.ndarray, index: int, axis: int
+        self, data: ContributionArray, index: int, axis: int
     ) -> np.ndarray:
-        data = data[:, :, self.mlca.current]
-        return super()._build_contributions(data, index, axis)
+        key = [slice(None), slice(None), self.mlca.current]
+        key[axis] = index
+        return data[tuple(key)]
 
     @staticmethod
     def _build_scenario_contributions(
-        data: np.ndarray, fu_index: int, m_index: int
+        data: ContributionArray, fu_index: int, m_index: int
     ) -> np.ndarray:
         return data[fu_index, m_index, :]
 
@@ -384,9 +358,20 @@ class SuperstructureContributions(Contributions):
         self.mlca.current = scenario
         return super().get_contributions(contribution, functional_unit, method)
 
+    def sorted_contributions(
+        self, contribution, functional_unit=None, method=None, **kwargs
+    ):
+        # Results of cached contributions also depend on the current scenario
+        if not (functional_unit and method):
+            self.mlca.current = kwargs.get("scenario", 0)
+        return super().sorted_contributions(
+            contribution, functional_unit, method, **kwargs
+        )
+
     def _contribution_index_cols(self, **kwargs) -> (dict, Optional[Iterable]):
         # If both functional_unit and method are given, return scenario index.
         if all(kwargs.values()):
             return self.mlca.scenario_index, self.act_fields
         else:
             return super()._contribution_index_cols(**kwargs)
+
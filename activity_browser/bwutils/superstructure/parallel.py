@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Calculation of superstructure scenarios in a pool of worker processes.
+
+Every worker receives the default matrices once and attaches to the scenario
+`values` and the arrays of the scenario positions through shared memory. For
+each scenario it builds the scenario matrices from the defaults and solves
+them as `SuperstructureMLCA` does in the main process, so the results are
+identical to those of a serial calculation.
+"""
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+from scipy import sparse
+
+from ..batch import BatchResults, ScenarioSolver, batch_calculation
+from ..pool import attach_array, process_pool, share_array, worker
+from .matrices import ScenarioPositions, apply_scenario
+
+
+class ScenarioResult(NamedTuple):
+    scenario: int
+    path: str  # The ScenarioSolver path used to solve the scenario
+    results: BatchResults
+    diagonal: np.ndarray  # Diagonal of the scenario technosphere matrix
+    biosphere_matrix: Optional[sparse.spmatrix]  # None if equal to the default
+
+
+def _setup_worker(state: dict) -> None:
+    memories = state["memories"] = []
+
+    def attach(spec: tuple) -> np.ndarray:
+        memory, array = attach_array(spec)
+        memories.append(memory)
+        return array
+
+    state["values"] = attach(state["values_spec"])
+    state["positions"] = {
+        name: ScenarioPositions(*(attach(spec) for spec in specs))
+        for name, specs in state["positions_specs"].items()
+    }
+    state["solver"] = ScenarioSolver(
+        state["defaults"]["technosphere_matrix"], state["threshold"]
+    )
+
+
+def _calculate_scenario(scenario: int) -> ScenarioResult:
+    defaults = worker["defaults"]
+    matrices = {name: matrix.copy() for name, matrix in defaults.items()}
+    apply_scenario(matrices, worker["positions"], worker["values"][:, scenario])
+    technosphere = matrices["technosphere_matrix"]
+    biosphere = matrices["biosphere_matrix"]
+    solver, path = worker["solver"].solver(technosphere)
+    results = batch_calculation(
+        technosphere,
+        biosphere,
+        worker["demand"],
+        worker["characterization"],
+        solver,
+    )
+    changed = (biosphere != defaults["biosphere_matrix"]).nnz > 0
+    return ScenarioResult(
+        scenario, path, results, technosphere.diagonal(), biosphere if changed else None
+    )
+
+
+def calculate_scenarios(mlca, workers: int) -> Iterator[ScenarioResult]:
+    """Calculate all scenarios of the `SuperstructureMLCA` in a pool of
+    `workers` processes, results are yielded in scenario order.
+    """
+    memories = []
+
+    def share(array: np.ndarray) -> tuple:
+        memory, spec = share_array(array)
+        memories.append(memory)
+        return spec
+
+    defaults = {
+        "technosphere_matrix": mlca.default_technosphere_matrix,
+        "biosphere_matrix": mlca.default_biosphere_matrix,
+    }
+    try:
+        state = {
+            "defaults": defaults,
+            "positions_specs": {
+                name: [share(array) for array in position]
+                for name, position in mlca.positions.items()
+            },
+            "values_spec": share(mlca.values),
+            "demand": mlca.demand_matrix,
+            "characterization": mlca.characterization,
+            "threshold": mlca.scenario_solver.threshold,
+        }
+        with process_pool(workers, state, _setup_worker) as pool:
+            yield from pool.map(_calculate_scenario, range(mlca.total))
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
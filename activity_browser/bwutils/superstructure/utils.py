@@ -70,6 +70,17 @@ def guess_flow_type(row: pd.Series) -> str:
         return "technosphere"
 
 
+def guess_flow_types(df: pd.DataFrame) -> pd.Series:
+    """Given a dataframe of input- and output keys, make a guess on the flow
+    type of each row, as `guess_flow_type` does.
+    """
+    inputs, outputs = df.iloc[:, 0], df.iloc[:, 1]
+    flows = pd.Series("technosphere", index=df.index, dtype=object)
+    flows[inputs == outputs] = "production"
+    flows[inputs.str[0] == bd.config.biosphere] = "biosphere"
+    return flows
+
+
 def _time_it_(func):
     # TODO rename to non_protected name
     """
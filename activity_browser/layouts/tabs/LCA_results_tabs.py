@@ -25,11 +25,12 @@ from activity_browser.bwutils import AB_metadata
 from stats_arrays.errors import InvalidParamsError
 import bw2data as bd
 
-from activity_browser import signals, project_settings
+from activity_browser import signals, project_settings, ab_settings
 from activity_browser.mod.bw2data import calculation_setups
 from activity_browser.mod.bw2analyzer import ABContributionAnalysis
 
-from ...bwutils import (MLCA, Contributions, GlobalSensitivityAnalysis,
+from ...bwutils import (ESTIMATORS, MLCA, Contributions,
+                        FirstTierContributions, GlobalSensitivityAnalysis,
                         MonteCarloLCA, SuperstructureMLCA, calculations)
 from ...bwutils import commontasks as bc
 from ...ui.figures import (ContributionPlot, CorrelationPlot,
@@ -37,6 +38,7 @@ from ...ui.figures import (ContributionPlot, CorrelationPlot,
 from ...ui.icons import qicons
 from ...ui.style import header, horizontal_line, vertical_line
 from ...ui.tables import ContributionTable, InventoryTable, LCAResultsTable
+from ...ui.threading import ABThread
 from ...ui.web import SankeyNavigatorWidget
 from ...ui.widgets import CutoffMenu, SwitchComboBox
 from .base import BaseRightTab
@@ -1321,6 +1323,7 @@ class FirstTierContributionsTab(ContributionTab):
             for fu in func_units
         ]
         self.methods = bd.calculation_setups[self.cs]["ia"]
+        self.first_tier = FirstTierContributions(self.parent.mlca)
 
         self.contribution_fn = "First Tier contributions"
         self.switches.configure(self.has_func, self.has_method)
@@ -1349,10 +1352,7 @@ class FirstTierContributionsTab(ContributionTab):
 
         def calculate():
             """Shorthand for getting calculation results."""
-            return self.calculate_contributions(demand, demand_key, demand_index,
-                                                method=method, method_index=method_index,
-                                                scenario_lca=self.has_scenarios, scenario_index=scenario_index,
-                                                )
+            return self.calculate_contributions(demand_index, method_index, scenario_index)
 
         # get the right data
         if self.has_scenarios:
@@ -1413,102 +1413,18 @@ class FirstTierContributionsTab(ContributionTab):
 
         return all_data
 
-    def calculate_contributions(self, demand, demand_key, demand_index,
-                                method, method_index: int = None,
-                                scenario_lca: bool = False, scenario_index: int = None) -> dict:
-        """Retrieve relevant activity data and calculate first tier contributions."""
-
-        def get_default_demands() -> dict:
-            """Get the inputs to calculate contributions from the activity"""
-            # get exchange keys leading to this activity
-            technosphere = bd.get_activity(demand_key).technosphere()
-
-            keys = [exch.input.key for exch in technosphere if
-                    exch.input.key != exch.output.key]
-            # find scale from production amount and demand amount
-            scale = demand[demand_key] / [p for p in bd.get_activity(demand_key).production()][0].amount
-
-            amounts = [exch.amount * scale for exch in technosphere if
-                       exch.input.key != exch.output.key]
-            demands = {keys[i]: amounts[i] for i, _ in enumerate(keys)}
-            return demands
-
-        def get_scenario_demands() -> dict:
-            """Get the inputs to calculate contributions from the scenario matrix"""
-            # get exchange keys leading to this activity
-            technosphere = bd.get_activity(demand_key).technosphere()
-            demand_idx = _lca.product_dict[demand_key]
-
-            keys = [exch.input.key for exch in technosphere if
-                    exch.input.key != exch.output.key]
-            # find scale from production amount and demand amount
-            scale = demand[demand_key] / _lca.technosphere_matrix[_lca.activity_dict[demand_key], demand_idx] * -1
-
-            amounts = []
-
-            for exch in technosphere:
-                exch_idx = _lca.activity_dict[exch.input.key]
-                if exch.input.key != exch.output.key:
-                    amounts.append(_lca.technosphere_matrix[exch_idx, demand_idx] * scale)
-
-            # write al non-zero exchanges to demand dict
-            demands = {keys[i]: amounts[i] for i, _ in enumerate(keys) if amounts[i] != 0}
-            return demands
-
-        # reuse LCA object from original calculation to skip 1 LCA
-        if scenario_lca:
-            # get score from the already calculated result
-            score = self.parent.mlca.lca_scores[demand_index, method_index, scenario_index]
-
-            # get lca object from mlca class
-            self.parent.mlca.current = scenario_index
-            self.parent.mlca.update_matrices()
-            _lca = self.parent.mlca.lca
-            _lca.redo_lci(demand)
+    def calculate_contributions(self, demand_index: int, method_index: int,
+                                scenario_index: int = None) -> dict:
+        """Calculate the first tier contributions of the reference flow.
 
-        else:
-            # get score from the already calculated result
-            score = self.parent.mlca.lca_scores[demand_index, method_index]
-
-            # get lca object to calculate new results
-            _lca = self.parent.mlca.lca
-
-        # set the correct method
-        _lca.switch_method(method)
-        _lca.lcia_calculation()
-
-        if score == 0:
-            # no need to calculate contributions to '0' score
-            # technically it could be that positive and negative score of same amount negate to 0, but highly unlikely.
-            return {"Score": 0, "Range": 0, demand_key: 0}
-
-        data = {"Score": score}
-        _range = []
-        remainder = score  # contribution of demand_key
-
-        if not scenario_lca:
-            new_demands = get_default_demands()
-        else:
-            new_demands = get_scenario_demands()
-
-        # iterate over all activities demand_key is connected to
-        for key, amt in new_demands.items():
-
-            # recalculate for this demand
-            _lca.redo_lci({key: amt})
-            _lca.redo_lcia()
-
-            score = _lca.score
-            if score != 0:
-                # only store non-zero results
-                data[key] = score
-                _range.append(abs(score))
-                remainder -= score  # subtract this from remainder
-
-        data[demand_key] = remainder
-        _range.append(abs(remainder))
-        data["Range"] = sum(_range)
-        return data
+        The contributions are calculated for all methods at once, the results
+        of the other methods are cached as well.
+        """
+        results = self.first_tier.calculate(demand_index, scenario_index)
+        if self.caching:
+            for index, data in enumerate(results):
+                self.cache[(demand_index, index, scenario_index)] = data
+        return results[method_index]
 
     def key_to_metadata(self, key: tuple) -> list:
         """Convert the key information to list with metadata.
@@ -1791,6 +1707,12 @@ class MonteCarloTab(NewAnalysisTab):
         )
         self.seed = QLineEdit("")
         self.seed.setFixedWidth(30)
+        self.label_progress = QLabel("")
+        self.label_progress.setToolTip(
+            "Progress of the simulation and the running mean and standard deviation\n"
+            "of the first reference flow for the selected impact category"
+        )
+        self.label_progress.hide()
 
         self.hlayout_run = QHBoxLayout()
         self.hlayout_run.addWidget(self.scenario_label)
@@ -1801,6 +1723,7 @@ class MonteCarloTab(NewAnalysisTab):
         self.hlayout_run.addWidget(self.label_seed)
         self.hlayout_run.addWidget(self.seed)
         self.hlayout_run.addWidget(self.include_box)
+        self.hlayout_run.addWidget(self.label_progress)
         self.hlayout_run.addStretch(1)
         layout_mc.addLayout(self.hlayout_run)
 
@@ -1886,74 +1809,62 @@ class MonteCarloTab(NewAnalysisTab):
             "parameters": self.include_parameters.isChecked(),
         }
 
-        QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
-        try:
-            self.parent.mc.calculate(iterations=iterations, seed=seed, **includes)
-            signals.monte_carlo_finished.emit()
-            self.update_mc()
-        except (
-            InvalidParamsError
-        ) as e:  # This can occur if uncertainty data is missing or otherwise broken
-            # print(e)
-            log.error(e)
+        self.set_running(True)
+        self.mc_thread = MonteCarloWorkerThread(self)
+        self.mc_thread.set_mc(
+            self.parent.mc,
+            iterations=iterations,
+            seed=seed,
+            workers=ab_settings.monte_carlo_workers,
+            **includes,
+        )
+        self.mc_thread.status.connect(self.update_progress)
+        self.mc_thread.finished.connect(self.monte_carlo_finished)
+        self.mc_thread.start()
+
+    @QtCore.Slot(name="monteCarloFinished")
+    def monte_carlo_finished(self):
+        """Show the results, or the reason the simulation failed, once the
+        worker thread is done."""
+        self.set_running(False)
+        error = self.mc_thread.error
+        if isinstance(error, InvalidParamsError):
+            # This can occur if uncertainty data is missing or otherwise broken
+            log.error(error)
             QMessageBox.warning(
-                self, "Could not perform Monte Carlo simulation", str(e)
+                self, "Could not perform Monte Carlo simulation", str(error)
             )
-        QApplication.restoreOverrideCursor()
-
-        # a threaded way for this - unfortunatley this crashes as:
-        # pypardsio_solver is used for the 'spsolve' and 'factorized' functions. Python crashes on windows if multiple
-        # instances of PyPardisoSolver make calls to the Pardiso library
-        # worker_thread = WorkerThread()
-        # print('Created local worker_thread')
-        # worker_thread.set_mc(self.parent.mc, iterations=iterations)
-        # print('Passed object to thread.')
-        # worker_thread.start()
-        # self.label_running.show()
-
-        #
+        elif error is None:
+            signals.monte_carlo_finished.emit()
+            self.update_mc()
 
-        # thread = NewCSMCThread() #self.parent.mc
-        # thread.calculation_finished.connect(
-        #     lambda x: print('Calculation finished.'))
-        # thread.start()
+    def set_running(self, running: bool) -> None:
+        """Lock the simulation settings while a simulation is running."""
+        if running:
+            QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+            self.label_progress.setText("")
+        else:
+            QApplication.restoreOverrideCursor()
+        for widget in (self.button_run, self.iterations, self.seed, self.include_box):
+            widget.setEnabled(not running)
+        if self.has_scenarios:
+            self.scenario_box.setEnabled(not running)
+        self.label_progress.setVisible(running)
 
-        # # give us a thread and start it
-        # thread = QtCore.QThread()
-        # thread.start()
-        #
-        # # create a worker and move it to our extra thread
-        # worker = Worker()
-        # worker.moveToThread(thread)
-
-        # self.parent.mct.start()
-        # self.parent.mct.run(iterations=iterations)
-        # self.parent.mct.finished()
-
-        # objThread = QtCore.QThread()
-        # obj = QObjectMC()  # self.parent.cs_name
-        # obj.moveToThread(objThread)
-        # obj.finished.connect(objThread.quit)
-        # objThread.started.connect(obj.long_running)
-        # # objThread.finished.connect(app.exit)
-        # objThread.finished.connect(
-        #     lambda x: print('Finished Thread!')
-        # )
-        # objThread.start()
-
-        # objThread = QtCore.QThread()
-        # obj = SomeObject()
-        # obj.moveToThread(objThread)
-        # obj.finished.connect(objThread.quit)
-        # objThread.started.connect(obj.long_running)
-        # objThread.finished.connect(
-        #     lambda x: print('Finished Thread!')
-        # )
-        # objThread.start()
-
-        # self.method_selection_widget.show()
-        # self.plot.show()
-        # self.export_widget.show()
+    @QtCore.Slot(int, str, name="updateProgress")
+    def update_progress(self, completed: int, message: str) -> None:
+        """Show the progress of a running simulation and how the results of
+        the first reference flow converge.
+        """
+        if not completed:
+            return
+        mc = self.parent.mc
+        method_index = max(self.combobox_methods.currentIndex(), 0)
+        results = mc.results[:completed, 0, method_index]
+        self.label_progress.setText(
+            f"{completed}/{mc.iterations} iterations, "
+            f"mean: {results.mean():.4g}, std: {results.std():.4g}"
+        )
 
     def configure_scenario(self):
         super().configure_scenario()
@@ -2074,6 +1985,23 @@ class GSATab(NewAnalysisTab):
         self.label_methods = QLabel("Impact Category:")
         self.combobox_methods = QComboBox()
 
+        # sensitivity measure selection
+        self.label_estimator = QLabel("Measure:")
+        self.combobox_estimator = QComboBox()
+        self.combobox_estimator.addItems([e.name for e in ESTIMATORS.values()])
+        self.combobox_estimator.setToolTip(
+            "The rank correlation and regression measures are fast to calculate\n"
+            "and can be used to screen the inputs before the delta measure."
+        )
+
+        # calculate all reference flows and impact categories at once
+        self.checkbox_all = QCheckBox("All reference flows and impact categories")
+        self.checkbox_all.setToolTip(
+            "Calculate the measure for all reference flows and impact categories\n"
+            "in parallel, running the other combinations afterwards shows their\n"
+            "results without recalculation."
+        )
+
         # arrange layout
         self.hlayout_row1 = QHBoxLayout()
         self.hlayout_row1.addWidget(self.button_run)
@@ -2081,6 +2009,9 @@ class GSATab(NewAnalysisTab):
         self.hlayout_row1.addWidget(self.combobox_fu)
         self.hlayout_row1.addWidget(self.label_methods)
         self.hlayout_row1.addWidget(self.combobox_methods)
+        self.hlayout_row1.addWidget(self.label_estimator)
+        self.hlayout_row1.addWidget(self.combobox_estimator)
+        self.hlayout_row1.addWidget(self.checkbox_all)
 
         # self.hlayout_row1.addWidget(self.fu_selection_widget)
         # self.hlayout_row1.addWidget(self.method_selection_widget)
@@ -2134,6 +2065,11 @@ class GSATab(NewAnalysisTab):
         self.layout.addWidget(self.label_monte_carlo_first)
         self.layout.addWidget(self.widget_settings)
 
+        # progress of a running GSA
+        self.label_progress = QLabel()
+        self.label_progress.hide()
+        self.layout.addWidget(self.label_progress)
+
         # at start
         # todo: this is just for development, should be reversed later:
         self.widget_settings.hide()
@@ -2157,20 +2093,34 @@ class GSATab(NewAnalysisTab):
         method_number = self.combobox_methods.currentIndex()
         cutoff_technosphere = float(self.cutoff_technosphere.text())
         cutoff_biosphere = float(self.cutoff_biosphere.text())
+        estimator = list(ESTIMATORS)[self.combobox_estimator.currentIndex()]
         # print('Calculating GSA for: ', act_number, method_number, cutoff_technosphere, cutoff_biosphere)
 
-        try:
-            QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
-            self.GSA.perform_GSA(
-                act_number=act_number,
-                method_number=method_number,
-                cutoff_technosphere=cutoff_technosphere,
-                cutoff_biosphere=cutoff_biosphere,
-            )
-            # self.update_mc()
-        except Exception as e:  # Catch any error...
-            log.error(e)
-            message = str(e)
+        self.set_running(True)
+        self.gsa_thread = GSAWorkerThread(self)
+        self.gsa_thread.set_gsa(
+            self.GSA,
+            act_number=act_number,
+            method_number=method_number,
+            cutoff_technosphere=cutoff_technosphere,
+            cutoff_biosphere=cutoff_biosphere,
+            estimator=estimator,
+            calculate_all=self.checkbox_all.isChecked(),
+            workers=ab_settings.monte_carlo_workers,
+        )
+        self.gsa_thread.status.connect(self.update_progress)
+        self.gsa_thread.finished.connect(self.gsa_finished)
+        self.gsa_thread.start()
+
+    @QtCore.Slot(name="gsaFinished")
+    def gsa_finished(self):
+        """Show the results, or the reason the GSA failed, once the worker
+        thread is done."""
+        self.set_running(False)
+        error = self.gsa_thread.error
+        if error is not None:
+            log.error(error)
+            message = str(error)
             message_addition = ""
             if message == "singular matrix":
                 message_addition = "\nIn order to avoid this happening, please increase the Monte Carlo iterations (e.g. to above 50)."
@@ -2184,10 +2134,26 @@ class GSATab(NewAnalysisTab):
             QMessageBox.warning(
                 self, "Could not perform GSA", str(message) + message_addition
             )
-        QApplication.restoreOverrideCursor()
 
         self.update_gsa()
 
+    def set_running(self, running: bool) -> None:
+        """Lock the GSA settings while the GSA is calculated."""
+        if running:
+            QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+            self.label_progress.setText("")
+        else:
+            QApplication.restoreOverrideCursor()
+        self.widget_settings.setEnabled(not running)
+        self.label_progress.setVisible(running)
+
+    @QtCore.Slot(int, str, name="updateProgress")
+    def update_progress(self, completed: int, message: str) -> None:
+        """Show the progress of the running GSA."""
+        if not completed:
+            return
+        self.label_progress.setText(message)
+
     def update_gsa(self, cs_name=None):
         self.df = getattr(self.GSA, "df_final", None)
         if self.df is None:
@@ -2234,28 +2200,67 @@ class GSATab(NewAnalysisTab):
     #     filename = '_'.join((str(x) for x in fields if x is not None))
 
 
-class MonteCarloWorkerThread(QtCore.QThread):
-    """A worker for Monte Carlo simulations.
+class MonteCarloWorkerThread(ABThread):
+    """A worker for Monte Carlo simulations, reports the number of completed
+    iterations through the `status` signal.
 
-    Unfortunately, pyparadiso does not allow parallel calculations on Windows (crashes).
-    So this is for future reference in case this issue is solved..."""
+    Only this thread solves the LCA, further workers run in their own
+    processes, so pypardiso is never called from two threads at once."""
 
-    def __init__(self):
-        pass
+    error = None
 
-    def set_mc(self, mc, iterations=20):
+    def set_mc(self, mc, iterations=20, **kwargs):
         self.mc = mc
         self.iterations = iterations
+        self.kwargs = kwargs
 
-    def run(self):
+    def run_safely(self):
         log.info(f"Starting new Worker Thread. Iterations: {self.iterations}")
-        self.mc.calculate(iterations=self.iterations)
-        # res = bw.GraphTraversal().calculate(self.demand, self.method, self.cutoff, self.max_calc)
-        log.info("in thread {}".format(QtCore.QThread.currentThread()))
-        signals.monte_carlo_ready.emit(self.mc.cs_name)
+        self.error = None
+        try:
+            self.mc.calculate(
+                iterations=self.iterations,
+                callback=lambda completed: self.status.emit(completed, ""),
+                **self.kwargs,
+            )
+        except Exception as e:
+            # Keep the exception for the GUI thread, which shows or raises it
+            self.error = e
+            if not isinstance(e, InvalidParamsError):
+                raise
+
+
+class GSAWorkerThread(ABThread):
+    """A worker for the global sensitivity analysis, reports the number of
+    completed combinations through the `status` signal when all reference
+    flows and impact categories are calculated."""
 
+    error = None
 
-worker_thread = MonteCarloWorkerThread()
+    def set_gsa(self, gsa, calculate_all=False, workers=1, **kwargs):
+        self.gsa = gsa
+        self.calculate_all = calculate_all
+        self.workers = workers
+        self.kwargs = kwargs
+
+    def run_safely(self):
+        self.error = None
+        try:
+            if self.calculate_all:
+                self.gsa.perform_GSA_all(
+                    estimators=(self.kwargs["estimator"],),
+                    cutoff_technosphere=self.kwargs["cutoff_technosphere"],
+                    cutoff_biosphere=self.kwargs["cutoff_biosphere"],
+                    workers=self.workers,
+                    callback=lambda completed, total: self.status.emit(
+                        completed, f"{completed}/{total} combinations calculated"
+                    ),
+                )
+            # the selected combination is shown, from the cache if calculated
+            self.gsa.perform_GSA(**self.kwargs)
+        except Exception as e:
+            # Keep the exception for the GUI thread, which shows it
+            self.error = e
 
 # TODO review if can be removed
 
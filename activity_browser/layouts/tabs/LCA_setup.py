@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from logging import getLogger
+from typing import Optional
 
 import pandas as pd
 from PySide2 import QtWidgets
@@ -11,6 +12,7 @@ from activity_browser.mod import bw2data as bd
 from ...bwutils.errors import *
 from ...bwutils.superstructure import (SUPERSTRUCTURE, ABCSVImporter,
                                        ABFeatherImporter, ABPopup,
+                                       ScenarioFileCache,
                                        SuperstructureManager, _time_it_,
                                        edit_superstructure_for_string,
                                        import_from_excel,
@@ -20,6 +22,7 @@ from ...ui.icons import qicons
 from ...ui.style import header, horizontal_line, style_group_box
 from ...ui.tables import (CSActivityTable, CSList, CSMethodsTable,
                           ScenarioImportTable)
+from ...ui.threading import ABThread
 from ...ui.widgets import ExcelReadDialog, ScenarioDatabaseDialog
 from .base import BaseRightTab
 
@@ -594,21 +597,31 @@ class ScenarioImportWidget(QtWidgets.QWidget):
                 separator = dialog.field_separator.currentData()
                 log.debug("separator == '{}'".format(separator))
                 QtWidgets.QApplication.setOverrideCursor(Qt.WaitCursor)
+                # Flow scenario files that were loaded before are read from the cache
+                cache = ScenarioFileCache(path, idx, separator)
+                cached = cache.read()
                 log.info("Loading Scenario file. This may take a while for large files")
                 # Try and read as a superstructure file
                 # Choose a different routine for reading the file dependent on file type
-                if file_type_suffix == ".feather":
+                if cached is not None:
+                    df = cached
+                elif file_type_suffix == ".feather":
                     df = ABFeatherImporter.read_file(path)
                 elif file_type_suffix.startswith(".xls"):
-                    df = import_from_excel(path, idx)
+                    df = self.read_excel(path, idx)
                 else:
                     df = ABCSVImporter.read_file(path, separator=separator)
                 # Read in the file as a scenario flow table if the file is arranged as one
-                if len(df.columns.intersection(SUPERSTRUCTURE)) >= 12:
+                if cached is not None:
+                    # The cached table has already been checked
+                    self.set_superstructure(cached)
+                elif len(df.columns.intersection(SUPERSTRUCTURE)) >= 12:
                     if df is None:
                         QtWidgets.QApplication.restoreOverrideCursor()
                         return
-                    self.sync_superstructure(df)
+                    df = self.sync_superstructure(df)
+                    if df is not None:
+                        cache.write(df)
                 # Read the file as a parameter scenario file if it is correspondingly arranged
                 elif len(df.columns.intersection({"Name", "Group"})) == 2:
                     # Try and read as parameter scenario file.
@@ -678,10 +691,36 @@ class ScenarioImportWidget(QtWidgets.QWidget):
             self._parent.save_button(True)
             QtWidgets.QApplication.restoreOverrideCursor()
 
+    def read_excel(self, path, import_sheet: int) -> pd.DataFrame:
+        """Read the Excel scenario file in a separate thread while showing
+        the progress in a dialog."""
+        def update_dialog_slot(progress: int, label: str):
+            dialog.setValue(progress)
+            dialog.setLabelText(label)
+
+        dialog = QtWidgets.QProgressDialog(self)
+        dialog.setWindowTitle("Loading scenario file")
+        dialog.setLabelText("Reading scenario file")
+        dialog.setMaximum(100)
+        dialog.setCancelButton(None)
+
+        thread = ExcelReadThread(self)
+        thread.path = path
+        thread.import_sheet = import_sheet
+        thread.status.connect(update_dialog_slot)
+        thread.finished.connect(dialog.accept)
+
+        thread.start()
+        dialog.exec_()
+        thread.wait()
+        return thread.data
+
     @_time_it_
-    def sync_superstructure(self, df: pd.DataFrame) -> None:
+    def sync_superstructure(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
         """synchronizes the contents of either a single, or multiple scenario files to create a single scenario
-        dataframe"""
+        dataframe
+
+        Returns the checked dataframe, or None if the import was cancelled"""
         # TODO: Move the 'scenario_df' into the model itself.
         QtWidgets.QApplication.restoreOverrideCursor()
         df = self.scenario_db_check(df)
@@ -693,6 +732,11 @@ class ScenarioImportWidget(QtWidgets.QWidget):
         # If we've cancelled the import then we don't want to load the dataframe
         if df.empty:
             return
+        self.set_superstructure(df)
+        return df
+
+    def set_superstructure(self, df: pd.DataFrame) -> None:
+        """Use the checked scenario dataframe for this table."""
         self.scenario_df = df
         cols = scenario_names_from_df(self.scenario_df)
         self.table.model.sync(cols)
@@ -720,3 +764,10 @@ class ScenarioImportWidget(QtWidgets.QWidget):
         if self.scenario_df.empty:
             log.debug("No data in scenario table {}, skipping".format(self.index + 1))
         return self.scenario_df
+
+
+class ExcelReadThread(ABThread):
+    data = pd.DataFrame({})
+
+    def run_safely(self):
+        self.data = import_from_excel(self.path, self.import_sheet)
@@ -56,6 +56,17 @@ class Exchanges(Exchanges):
         # use the activities set to create a database set as well
         dbs = set([act["database"] for act in acts])
 
+        # keys of all input and output activities of the deleted exchanges
+        keys = set()
+        io_fields = ExchangeDataset.select(
+            ExchangeDataset.input_database,
+            ExchangeDataset.input_code,
+            ExchangeDataset.output_database,
+            ExchangeDataset.output_code,
+        )
+        for in_db, in_code, out_db, out_code in io_fields.where(*self._args).tuples():
+            keys.update([(in_db, in_code), (out_db, out_code)])
+
         # execute the patched function for standard functionality
         patched[Exchanges]["delete"](self)
 
@@ -73,6 +84,7 @@ class Exchanges(Exchanges):
             ]
 
         # emitting change through any existing activity QUpdaters
+        qactivity_list.emit_keys_later(keys)
         for act in acts:
             [
                 qact.emitLater("changed", act)
@@ -123,6 +135,7 @@ class Activity(Activity):
         # exchanges cannot be changed through the activity proxy save function
 
         # emitting change through any existing qactivities (should be 1 or None)
+        qactivity_list.emit_keys_later([self.key])
         [
             qact.emitLater("changed", self)
             for qact in qactivity_list
@@ -151,6 +164,7 @@ class Activity(Activity):
         # exchange deletions will emit for themselves
 
         # emitting change through any existing qactivities (should be 1 or None)
+        qactivity_list.emit_keys_later([self.key])
         [
             qact.emitLater("changed", self)
             for qact in qactivity_list
@@ -218,6 +232,7 @@ class Exchange(Exchange):
         acts.update(self.moved_IO)
 
         # emitting change through any existing qactivities
+        qactivity_list.emit_keys_later([activity.key for activity in acts])
         for activity in acts:
             dbs.add(activity["database"])
             [
@@ -254,6 +269,7 @@ class Exchange(Exchange):
         ]
 
         # emitting change for any existing qactivities (should be 1 or None)
+        qactivity_list.emit_keys_later([self["input"], self["output"]])
         [
             qact.emitLater("changed", self.input)
             for qact in qactivity_list
@@ -197,6 +197,40 @@ class ABSettings(BaseSettings):
     def theme(self, new_theme: str) -> None:
         self.settings.update({"theme": new_theme})
 
+    @property
+    def scenario_update_threshold(self) -> int:
+        """Returns the maximum number of changed technosphere columns for which
+        a scenario calculation updates the base factorization instead of
+        factorizing the scenario matrix again
+        """
+        return self.settings.get("scenario_update_threshold", 500)
+
+    @scenario_update_threshold.setter
+    def scenario_update_threshold(self, threshold: int) -> None:
+        self.settings.update({"scenario_update_threshold": threshold})
+
+    @property
+    def scenario_workers(self) -> int:
+        """Returns the number of processes used to calculate scenarios, scenarios
+        are calculated in the main process if this is 1
+        """
+        return self.settings.get("scenario_workers", 1)
+
+    @scenario_workers.setter
+    def scenario_workers(self, workers: int) -> None:
+        self.settings.update({"scenario_workers": workers})
+
+    @property
+    def monte_carlo_workers(self) -> int:
+        """Returns the number of processes used for Monte Carlo simulations,
+        iterations are calculated in the main process if this is 1
+        """
+        return self.settings.get("monte_carlo_workers", 1)
+
+    @monte_carlo_workers.setter
+    def monte_carlo_workers(self, workers: int) -> None:
+        self.settings.update({"monte_carlo_workers": workers})
+
 
 class ProjectSettings(BaseSettings):
     """
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from typing import Iterable
+
 from bw2data import Method, get_activity
 from bw2data.parameters import ParameterBase
 from PySide2.QtCore import QObject, Qt, QThread, Signal, SignalInstance
@@ -324,11 +326,25 @@ class QDatabaseList(QObject):
             return QDatastore(self, name=db_name)
 
 
-class QActivityList(QObject):
+class QActivityList(QUpdater):
     """
     A QObject that has Activity QUpdaters as its children. Iterate and match using Activity model fields.
+
+    Next to the signals of the individual activities, keys_changed is emitted with the keys of all activities that
+    changed since the last emit. Widgets that show many activities can connect to it once, instead of connecting to
+    every activity.
     """
 
+    keys_changed: SignalInstance = Signal(object)
+
+    def emit_keys_later(self, keys: Iterable[tuple]):
+        """
+        Emit keys_changed with these keys, together with the keys of any other activities that change before the
+        signal is emitted.
+        """
+        pending = self.cache.get("keys_changed", (frozenset(),))[0]
+        self.emitLater("keys_changed", pending.union(keys))
+
     def __iter__(self):
         for child in self.findChildren(QDatastore):
             yield child
@@ -432,6 +448,10 @@ class QParameters(QUpdater):
     parameters_changed: SignalInstance = Signal()
 
 
+class QMetaData(QUpdater):
+    updates_pending: SignalInstance = Signal()
+
+
 signals = ABSignals()
 
 qprojects = QProjects()
@@ -439,6 +459,7 @@ qdatabases = QDatabases()
 qcalculation_setups = QCalculationSetups()
 qmethods = QMethods()
 qparameters = QParameters()
+qmetadata = QMetaData()
 
 qdatabase_list = QDatabaseList()
 qactivity_list = QActivityList()
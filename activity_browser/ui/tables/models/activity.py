@@ -9,18 +9,43 @@ from asteval import Interpreter
 from bw2data.parameters import (ActivityParameter, DatabaseParameter, Group,
                                 ProjectParameter)
 from bw2data.proxies import ExchangeProxyBase
-from peewee import DoesNotExist
 from PySide2.QtCore import QModelIndex, Qt, Slot
 
 from activity_browser import actions, signals
-from activity_browser.bwutils import PedigreeMatrix
+from activity_browser.bwutils import AB_metadata, PedigreeMatrix
 from activity_browser.bwutils import commontasks as bc
+from activity_browser.signals import qactivity_list
 
 from .base import EditablePandasModel
 
 log = getLogger(__name__)
 
 
+def get_field(data: pd.DataFrame, field: str, default=None) -> pd.Series:
+    """Return the field for each of the rows, or the default for the rows
+    where it is not set.
+    """
+    if field in data:
+        values = data[field].astype(object)
+    else:
+        values = pd.Series(None, index=data.index, dtype=object)
+    return values.where(values.notna(), default)
+
+
+def get_pedigree(exchanges: pd.DataFrame) -> list:
+    """Return the pedigree factors of the exchanges, or None if they are not
+    set.
+    """
+    factors = []
+    for pedigree in get_field(exchanges, "pedigree"):
+        try:
+            matrix = PedigreeMatrix.from_dict(pedigree or {})
+            factors.append(matrix.factors_as_tuple())
+        except AssertionError:
+            factors.append(None)
+    return factors
+
+
 class BaseExchangeModel(EditablePandasModel):
     COLUMNS = []
     # Fields accepted by brightway to be stored in exchange objects.
@@ -41,52 +66,95 @@ class BaseExchangeModel(EditablePandasModel):
         self.key = key
         self.exchanges = []
         self.exchange_column = 0
+        # keys of the activities in the table, see `activities_changed`
+        self.keys = set()
+        qactivity_list.keys_changed.connect(self.activities_changed)
 
     def load(self, exchanges: Iterable):
         self.exchanges = exchanges
         self.sync()
 
     def sync(self):
-        """Build the table using either new or stored exchanges iterable."""
-        data = (self.create_row(exc) for exc in self.exchanges)
-        self._dataframe = pd.DataFrame(
-            [row for row in data if row], columns=self.columns
+        """Build the table using either new or stored exchanges iterable.
+
+        The activities of all exchanges are read in bulk, after which the rows
+        are built per column.
+        """
+        exchanges = list(self.exchanges)
+        for exchange in exchanges:
+            self.fix_amount(exchange)
+
+        data = pd.DataFrame([exchange.as_dict() for exchange in exchanges])
+        data = data.reindex(columns=data.columns.union(["amount", "input", "output"]))
+        data["exchange"] = exchanges
+
+        keys = set(data["input"]).union(data["output"])
+        activities = AB_metadata.load_activities(list(keys))
+        inputs = self.activity_rows(activities, data["input"])
+        outputs = self.activity_rows(activities, data["output"])
+
+        # The input or output activity does not exist, remove the broken
+        # exchanges.
+        broken = inputs["key"].isna() | outputs["key"].isna()
+        if broken.any():
+            pairs = list(zip(data["input"][broken], data["output"][broken]))
+            log.warning(f"Broken exchanges (input, output): {pairs}, removing.")
+            actions.ExchangeDelete.run(list(data["exchange"][broken]))
+        data, inputs, outputs = (
+            df[~broken].reset_index(drop=True) for df in (data, inputs, outputs)
         )
+
+        rows = self.create_rows(data, inputs, outputs)
+        self._dataframe = pd.DataFrame(rows, columns=self.columns)
         self.exchange_column = self._dataframe.columns.get_loc("exchange")
+        self.keys = set(inputs["key"]).union(outputs["key"])
         self.updated.emit()
 
     @property
     def columns(self) -> list:
         return self.COLUMNS + ["exchange"]
 
-    def create_row(self, exchange) -> dict:
-        """Take the given Exchange object and extract a number of attributes."""
+    @staticmethod
+    def activity_rows(activities: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+        """Return the metadata of the activity of each key, in the same order
+        and with the same index as the keys.
+        """
+        index = pd.MultiIndex.from_tuples(keys, names=activities.index.names)
+        rows = activities.reindex(index)
+        rows.index = keys.index
+        return rows
+
+    def fix_amount(self, exchange) -> None:
+        """Fix the amount of the exchange if it is not a valid number."""
+        if isinstance(exchange.get("amount"), float) and not pd.isna(exchange.get("amount")):
+            return
+        log.warning(f"Fixing broken exchange amount for {exchange.get('type', '')} exchange from: {exchange.get('input')}")
         try:
-            # fixing a broken exchange
-            if not isinstance(exchange.get("amount"), float) or pd.isna(exchange.get("amount")):
-                log.warning(f"Fixing broken exchange amount for {exchange.get('type', '')} exchange from: {exchange.input}")
-                try:
-                    amount = float(exchange.get("amount")) if exchange.get("amount") is not np.nan else 1.0
-                except TypeError:
-                    amount = 1.0
-                exchange["amount"] = amount
-                exchange.save()
-
-            row = {
-                "Amount": exchange.get("amount"),
-                "Unit": exchange.input.get("unit", "Unknown"),
-                "exchange": exchange,
-            }
-
-            # sync when the exchange input or output changes
-            exchange.input.changed.connect(self.sync, Qt.UniqueConnection)
-            exchange.output.changed.connect(self.sync, Qt.UniqueConnection)
-
-            return row
-        except DoesNotExist as e:
-            # The input activity does not exist. remove the exchange.
-            log.warning(f"Broken exchange: {exchange}, removing.")
-            actions.ExchangeDelete.run([exchange])
+            amount = float(exchange.get("amount")) if exchange.get("amount") is not np.nan else 1.0
+        except TypeError:
+            amount = 1.0
+        exchange["amount"] = amount
+        exchange.save()
+
+    def create_rows(
+        self, exchanges: pd.DataFrame, inputs: pd.DataFrame, outputs: pd.DataFrame
+    ) -> dict:
+        """Take the given exchanges and the metadata of their input and output
+        activities and extract the columns of the table.
+        """
+        return {
+            "Amount": exchanges["amount"],
+            "Unit": get_field(inputs, "unit", "Unknown"),
+            "exchange": exchanges["exchange"],
+        }
+
+    @Slot(object, name="activitiesChanged")
+    def activities_changed(self, keys) -> None:
+        """Sync the table when any of the activities in it changed, other
+        changes are ignored.
+        """
+        if self.keys.intersection(keys):
+            self.sync()
 
     def get_exchange(self, proxy: QModelIndex) -> ExchangeProxyBase:
         idx = self.proxy_to_source(proxy)
@@ -95,7 +163,7 @@ class BaseExchangeModel(EditablePandasModel):
     def get_key(self, proxy: QModelIndex) -> tuple:
         """Get the activity key from an exchange."""
         exchange = self.get_exchange(proxy)
-        return exchange.input.key
+        return exchange["input"]
 
     def edit_cell(self, proxy: QModelIndex) -> None:
         col = proxy.column()
@@ -204,12 +272,13 @@ class BaseExchangeModel(EditablePandasModel):
 class ProductExchangeModel(BaseExchangeModel):
     COLUMNS = ["Amount", "Unit", "Product", "Formula"]
 
-    def create_row(self, exchange) -> dict:
-        row = super().create_row(exchange)
-        act = exchange.input
-        product = act.get("reference product", act.get("name"))
-        row.update({"Product": product, "Formula": exchange.get("formula")})
-        return row
+    def create_rows(self, exchanges, inputs, outputs) -> dict:
+        rows = super().create_rows(exchanges, inputs, outputs)
+        rows["Product"] = get_field(
+            inputs, "reference product", get_field(inputs, "name")
+        )
+        rows["Formula"] = get_field(exchanges, "formula")
+        return rows
 
 
 class TechnosphereExchangeModel(BaseExchangeModel):
@@ -233,33 +302,20 @@ class TechnosphereExchangeModel(BaseExchangeModel):
         end = columns[columns.index("Formula") :]
         return start + ["pedigree"] + self.UNCERTAINTY + end
 
-    def create_row(self, exchange: ExchangeProxyBase) -> dict:
-        row = super().create_row(exchange)
-        try:
-            act = exchange.input
-            row.update(
-                {
-                    "Product": act.get("reference product", act.get("name")),
-                    "Activity": act.get("name"),
-                    "Location": act.get("location", "Unknown"),
-                    "Database": act.get("database"),
-                    "Uncertainty": exchange.get("uncertainty type", 0),
-                    "Formula": exchange.get("formula"),
-                    "Comment": exchange.get("comment"),
-                }
-            )
-            try:
-                matrix = PedigreeMatrix.from_dict(exchange.get("pedigree", {}))
-                row.update({"pedigree": matrix.factors_as_tuple()})
-            except AssertionError:
-                row.update({"pedigree": None})
-            row.update(
-                {k: v for k, v in exchange.uncertainty.items() if k in self.UNCERTAINTY}
-            )
-            return row
-        except DoesNotExist as e:
-            log.info("Exchange was deleted, continue.")
-            return {}
+    def create_rows(self, exchanges, inputs, outputs) -> dict:
+        rows = super().create_rows(exchanges, inputs, outputs)
+        rows["Product"] = get_field(
+            inputs, "reference product", get_field(inputs, "name")
+        )
+        rows["Activity"] = get_field(inputs, "name")
+        rows["Location"] = get_field(inputs, "location", "Unknown")
+        rows["Database"] = get_field(inputs, "database")
+        rows["Uncertainty"] = get_field(exchanges, "uncertainty type", 0)
+        rows["Formula"] = get_field(exchanges, "formula")
+        rows["Comment"] = get_field(exchanges, "comment")
+        rows["pedigree"] = get_pedigree(exchanges)
+        rows.update(exchanges.reindex(columns=self.UNCERTAINTY).items())
+        return rows
 
 
 class BiosphereExchangeModel(BaseExchangeModel):
@@ -282,32 +338,20 @@ class BiosphereExchangeModel(BaseExchangeModel):
         end = columns[columns.index("Formula") :]
         return start + ["pedigree"] + self.UNCERTAINTY + end
 
-    def create_row(self, exchange) -> dict:
-        row = super().create_row(exchange)
-        try:
-            act = exchange.input
-            row.update(
-                {
-                    "Flow Name": act.get("name"),
-                    "Compartments": " - ".join(act.get("categories", [])),
-                    "Database": act.get("database"),
-                    "Uncertainty": exchange.get("uncertainty type", 0),
-                    "Formula": exchange.get("formula"),
-                    "Comment": exchange.get("comment"),
-                }
-            )
-            try:
-                matrix = PedigreeMatrix.from_dict(exchange.get("pedigree", {}))
-                row.update({"pedigree": matrix.factors_as_tuple()})
-            except AssertionError:
-                row.update({"pedigree": None})
-            row.update(
-                {k: v for k, v in exchange.uncertainty.items() if k in self.UNCERTAINTY}
-            )
-            return row
-        except DoesNotExist as e:
-            log.info("Exchange was deleted, continue.")
-            return {}
+    def create_rows(self, exchanges, inputs, outputs) -> dict:
+        rows = super().create_rows(exchanges, inputs, outputs)
+        rows["Flow Name"] = get_field(inputs, "name")
+        rows["Compartments"] = [
+            " - ".join(categories or [])
+            for categories in get_field(inputs, "categories")
+        ]
+        rows["Database"] = get_field(inputs, "database")
+        rows["Uncertainty"] = get_field(exchanges, "uncertainty type", 0)
+        rows["Formula"] = get_field(exchanges, "formula")
+        rows["Comment"] = get_field(exchanges, "comment")
+        rows["pedigree"] = get_pedigree(exchanges)
+        rows.update(exchanges.reindex(columns=self.UNCERTAINTY).items())
+        return rows
 
 
 class DownstreamExchangeModel(BaseExchangeModel):
@@ -317,20 +361,17 @@ class DownstreamExchangeModel(BaseExchangeModel):
 
     COLUMNS = ["Amount", "Unit", "Product", "Activity", "Location", "Database"]
 
-    def create_row(self, exchange) -> dict:
-        row = super().create_row(exchange)
-        act = exchange.output
-        row.update(
-            {
-                "Product": act.get("reference product", act.get("name")),
-                "Activity": act.get("name"),
-                "Location": act.get("location", "Unknown"),
-                "Database": act.get("database"),
-            }
+    def create_rows(self, exchanges, inputs, outputs) -> dict:
+        rows = super().create_rows(exchanges, inputs, outputs)
+        rows["Product"] = get_field(
+            outputs, "reference product", get_field(outputs, "name")
         )
-        return row
+        rows["Activity"] = get_field(outputs, "name")
+        rows["Location"] = get_field(outputs, "location", "Unknown")
+        rows["Database"] = get_field(outputs, "database")
+        return rows
 
     def get_key(self, proxy: QModelIndex) -> tuple:
         """Get the activity key from an exchange."""
         exchange = self.get_exchange(proxy)
-        return exchange.output.key
+        return exchange["output"]
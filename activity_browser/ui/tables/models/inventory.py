@@ -153,20 +153,13 @@ class ActivitiesBiosphereListModel(DragPandasModel):
 
         It is a "contains" type of search (e.g. "oal" would find "coal").
         It also works for columns that contain tuples (e.g. ('water', 'ocean'),
-        and will match on partials i.e. both 'ocean' and 'ean' work.
+        and will match on partials i.e. both 'ocean' and 'ean' work. Each of
+        the words of the search string has to be found in one of the columns.
 
-        An alternative solution would be to use .str.contains, but this does
-        not work for columns containing tuples (https://stackoverflow.com/a/29463757)
+        The search itself is done by the search index of the MetaDataStore.
         """
-        search_columns = (bc.bw_keys_to_AB_names.get(c, c) for c in self.fields)
-        mask = functools.reduce(
-            np.logical_or,
-            [
-                df[col].apply(lambda x: pattern.lower() in str(x).lower())
-                for col in search_columns
-            ],
-        )
-        return mask
+        keys = AB_metadata.search(self.database_name, pattern, self.fields)
+        return df["key"].isin(set(keys))
 
     def copy_exchanges_for_SDF(self, proxies: list) -> None:
         if len(proxies) > 1:
@@ -6,6 +6,7 @@ from typing import List
 from logging import getLogger
 
 import bw2calc as bc
+import numpy as np
 from PySide2 import QtWidgets
 from PySide2.QtCore import Slot
 from PySide2.QtWidgets import QComboBox
@@ -14,9 +15,8 @@ from activity_browser import signals
 from activity_browser.mod import bw2data as bd
 from activity_browser.mod.bw2data.backends import ActivityDataset
 
-from ...bwutils.commontasks import identify_activity_type
-from ...bwutils.superstructure.graph_traversal_with_scenario import \
-    GraphTraversalWithScenario
+from ...bwutils.graph_traversal import MatrixGraphTraversal
+from ...bwutils.metadata import AB_metadata
 from .base import BaseGraph, BaseNavigatorWidget
 
 try:
@@ -59,6 +59,7 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         super().__init__(parent, css_file="sankey_navigator.css")
 
         self.cache = {}  # we cache the calculated data to improve responsiveness
+        self.traversal = None  # scenario index and graph traversal of the last sankey
         self.parent = parent
         self.has_scenarios = self.parent.has_scenarios
         self.cs = cs_name
@@ -127,7 +128,7 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
 
         # max-iterations of graph traversal
         grid_lay.addWidget(QtWidgets.QLabel("Calculation depth: "), 2, 4)
-        self.max_calc_sb.setRange(1, 2000)
+        self.max_calc_sb.setRange(1, 100000)
         self.max_calc_sb.setSingleStep(50)
         self.max_calc_sb.setDecimals(0)
         self.max_calc_sb.setValue(250)
@@ -255,13 +256,16 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         start = time.time()
         log.debug(f"CALCULATE sankey for: {demand}, {method}, key: {cache_key}")
         try:
-            if scenario_lca:
-                self.parent.mlca.update_lca_calculation_for_sankey(
-                    scenario_index, demand, method_index
-                )
-                data = GraphTraversalWithScenario(self.parent.mlca).calculate(
-                    demand, method, cutoff=cut_off, max_calc=max_calc
+            if demand_index is not None and method_index is not None:
+                # traverse the matrices of the calculation, these are factorized once
+                traversal = self.get_traversal(scenario_index)
+                data = traversal.calculate(
+                    self.parent.mlca.func_units[demand_index],
+                    self.parent.mlca.characterization[method_index],
+                    cutoff=cut_off,
+                    max_calc=max_calc,
                 )
+                act_dict = traversal.activity_dict.items()
             else:
                 try:
                     data = GraphTraversal().calculate(
@@ -273,15 +277,17 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
                         lca, cutoff=cut_off, max_calc=max_calc
                     )
                     data["lca"] = lca
+                data["score"] = data["lca"].score
+                act_dict = data["lca"].activity_dict.items()
+                # drop LCA object as it's useless from now on
+                del data["lca"]
             # store the metadata from this calculation
             data["metadata"] = {
-                "demand": list(data["lca"].demand.items())[0],
-                "score": data["lca"].score,
+                "demand": list(demand.items())[0],
+                "score": data["score"],
                 "unit": bd.methods[method]["unit"],
-                "act_dict": data["lca"].activity_dict.items(),
+                "act_dict": act_dict,
             }
-            # drop LCA object as it's useless from now on
-            del data["lca"]
 
         except (ValueError, ZeroDivisionError) as e:
             QtWidgets.QMessageBox.information(None, "Not possible.", str(e))
@@ -297,6 +303,18 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         self.has_sankey = bool(self.graph.json_data)
         self.send_json()
 
+    def get_traversal(self, scenario_index: int = None) -> MatrixGraphTraversal:
+        """Return the graph traversal of the (scenario) matrices of the
+        calculation, the traversal of the last used scenario is kept.
+        """
+        if self.traversal is None or self.traversal[0] != scenario_index:
+            mlca = self.parent.mlca
+            if scenario_index is not None:
+                mlca.current = scenario_index
+                mlca.update_matrices()
+            self.traversal = (scenario_index, MatrixGraphTraversal.from_lca(mlca.lca))
+        return self.traversal[1]
+
     def set_database(self, name):
         """Saves the currently selected database for graphing a random activity"""
         self.selected_db = name
@@ -334,30 +352,69 @@ class Graph(BaseGraph):
         demand = meta["demand"]
         reverse_activity_dict = {v: k for k, v in meta["act_dict"]}
 
-        build_json_node = Graph.compose_node_builder(lca_score, lcia_unit, demand[0])
-        build_json_edge = Graph.compose_edge_builder(
-            reverse_activity_dict, lca_score, lcia_unit
-        )
-
-        valid_nodes = (
-            (bd.get_activity(reverse_activity_dict[idx]), v)
-            for idx, v in data["nodes"].items()
-            if idx != -1
-        )
-        valid_edges = (
+        valid_nodes = [(idx, v) for idx, v in data["nodes"].items() if idx != -1]
+        valid_edges = [
             edge
             for edge in data["edges"]
             if all(i != -1 for i in (edge["from"], edge["to"]))
+        ]
+
+        # resolve the activities of all nodes and edges at once
+        indices = {idx for idx, _ in valid_nodes}
+        indices.update(i for edge in valid_edges for i in (edge["from"], edge["to"]))
+        indices = list(indices)
+        keys = AB_metadata.ids_to_keys([reverse_activity_dict[idx] for idx in indices])
+        index_keys = dict(zip(indices, keys))
+        metadata = Graph.get_metadata(set(index_keys.values()))
+
+        build_json_node = Graph.compose_node_builder(
+            lca_score, lcia_unit, id_to_key(demand[0]), metadata
+        )
+        build_json_edge = Graph.compose_edge_builder(
+            index_keys, lca_score, lcia_unit, metadata
         )
 
         json_data = {
-            "nodes": [build_json_node(act, v) for act, v in valid_nodes],
+            "nodes": [build_json_node(index_keys[idx], v) for idx, v in valid_nodes],
             "edges": [build_json_edge(edge) for edge in valid_edges],
             "title": Graph.build_title(demand, lca_score, lcia_unit),
             "max_impact": max(abs(n["cum"]) for n in data["nodes"].values()),
         }
         return json.dumps(json_data)
 
+    @staticmethod
+    def get_metadata(keys: set) -> dict:
+        """Read the fields shown in the graph for all activities at once.
+
+        Returns a dictionary of field names to dictionaries of activity keys
+        to values, fields that an activity does not have are None.
+        """
+        df = AB_metadata.load_activities(list(keys))
+        keys = df.index.to_list()
+        df = df.reindex(columns=["reference product", "name", "location", "unit"])
+        df = df.astype(object).where(df.notna(), None)
+        names = df["name"].fillna("")
+        # the reference product, or the name if the activity has no product
+        product = df["reference product"].where(
+            df["reference product"].astype(bool), df["name"]
+        )
+        kind = np.select(
+            [
+                names.str.contains("treatment of", regex=False),
+                names.str.contains("market for", regex=False),
+                names.str.contains("market group", regex=False),
+            ],
+            ["treatment", "market", "marketgroup"],
+            "production",
+        )
+        return {
+            "product": dict(zip(keys, product)),
+            "name": dict(zip(keys, df["name"])),
+            "location": dict(zip(keys, df["location"])),
+            "unit": dict(zip(keys, df["unit"])),
+            "class": dict(zip(keys, kind.tolist())),
+        }
+
     @staticmethod
     def build_title(demand: tuple, lca_score: float, lcia_unit: str) -> str:
         act, amount = demand[0], demand[1]
@@ -377,44 +434,47 @@ class Graph(BaseGraph):
         )
 
     @staticmethod
-    def compose_node_builder(lca_score: float, lcia_unit: str, demand: tuple):
+    def compose_node_builder(
+        lca_score: float, lcia_unit: str, demand: tuple, metadata: dict
+    ):
         """Build and return a function which processes activities and values
         into valid JSON documents.
 
         Inspired by https://stackoverflow.com/a/7045809
         """
 
-        def build_json_node(act, values: dict) -> dict:
+        def build_json_node(key: tuple, values: dict) -> dict:
             return {
-                "db": act.key[0],
-                "id": act.key[1],
-                "product": act.get("reference product") or act.get("name"),
-                "name": act.get("name"),
-                "location": act.get("location"),
+                "db": key[0],
+                "id": key[1],
+                "product": metadata["product"][key],
+                "name": metadata["name"][key],
+                "location": metadata["location"][key],
                 "amount": values.get("amount"),
                 "LCIA_unit": lcia_unit,
                 "ind": values.get("ind"),
                 "ind_norm": values.get("ind") / lca_score,
                 "cum": values.get("cum"),
                 "cum_norm": values.get("cum") / lca_score,
-                "class": "demand" if act == demand else identify_activity_type(act),
+                "class": "demand" if key == demand else metadata["class"][key],
             }
 
         return build_json_node
 
     @staticmethod
-    def compose_edge_builder(reverse_dict: dict, lca_score: float, lcia_unit: str):
+    def compose_edge_builder(
+        index_keys: dict, lca_score: float, lcia_unit: str, metadata: dict
+    ):
         """Build a function which turns graph edges into valid JSON documents."""
 
         def build_json_edge(edge: dict) -> dict:
-            p = bd.get_activity(reverse_dict[edge["from"]])
-            from_key = id_to_key(reverse_dict[edge["from"]])
-            to_key = id_to_key(reverse_dict[edge["to"]])
+            from_key = index_keys[edge["from"]]
+            to_key = index_keys[edge["to"]]
             return {
                 "source_id": from_key[1],
                 "target_id": to_key[1],
                 "amount": edge["amount"],
-                "product": p.get("reference product") or p.get("name"),
+                "product": metadata["product"][from_key],
                 "impact": edge["impact"],
                 "ind_norm": edge["impact"] / lca_score,
                 "unit": lcia_unit,
@@ -422,7 +482,7 @@ class Graph(BaseGraph):
                 "<br>{:.3g} {} ({:.2g}%) ".format(
                     lcia_unit,
                     edge["amount"],
-                    p.get("unit"),
+                    metadata["unit"][from_key],
                     edge["impact"],
                     lcia_unit,
                     edge["impact"] / lca_score * 100,
@@ -435,4 +495,7 @@ class Graph(BaseGraph):
 def id_to_key(id):
     if isinstance(id, tuple):
         return id
+    if hasattr(id, "key"):
+        return id.key
     return ActivityDataset.get_by_id(id).database, ActivityDataset.get_by_id(id).code
+
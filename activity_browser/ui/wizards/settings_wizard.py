@@ -105,8 +105,45 @@ class SettingsPage(QtWidgets.QWizardPage):
 
         self.startup_groupbox.setLayout(self.startup_layout)
 
+        # scenario calculations
+        self.scenario_threshold_spinbox = QtWidgets.QSpinBox()
+        self.scenario_threshold_spinbox.setRange(0, 100000)
+        self.scenario_threshold_spinbox.setValue(ab_settings.scenario_update_threshold)
+        self.scenario_threshold_spinbox.setToolTip(
+            "Scenarios that change at most this many technosphere activities are\n"
+            "calculated by updating the default technosphere factorization"
+        )
+        self.scenario_workers_spinbox = QtWidgets.QSpinBox()
+        self.scenario_workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.scenario_workers_spinbox.setValue(ab_settings.scenario_workers)
+        self.scenario_workers_spinbox.setToolTip(
+            "Number of processes used to calculate scenarios in parallel"
+        )
+        self.monte_carlo_workers_spinbox = QtWidgets.QSpinBox()
+        self.monte_carlo_workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.monte_carlo_workers_spinbox.setValue(ab_settings.monte_carlo_workers)
+        self.monte_carlo_workers_spinbox.setToolTip(
+            "Number of processes used to calculate Monte Carlo iterations in parallel"
+        )
+
+        # Calculation options
+        self.calculation_groupbox = QtWidgets.QGroupBox("Calculation Options")
+        self.calculation_layout = QtWidgets.QGridLayout()
+        self.calculation_layout.addWidget(
+            QtWidgets.QLabel("Scenario update threshold: "), 0, 0
+        )
+        self.calculation_layout.addWidget(self.scenario_threshold_spinbox, 0, 1)
+        self.calculation_layout.addWidget(QtWidgets.QLabel("Scenario workers: "), 1, 0)
+        self.calculation_layout.addWidget(self.scenario_workers_spinbox, 1, 1)
+        self.calculation_layout.addWidget(
+            QtWidgets.QLabel("Monte Carlo workers: "), 2, 0
+        )
+        self.calculation_layout.addWidget(self.monte_carlo_workers_spinbox, 2, 1)
+        self.calculation_groupbox.setLayout(self.calculation_layout)
+
         self.layout = QtWidgets.QVBoxLayout()
         self.layout.addWidget(self.startup_groupbox)
+        self.layout.addWidget(self.calculation_groupbox)
         self.layout.addStretch()
         self.layout.addWidget(self.restore_defaults_button)
         self.setLayout(self.layout)
@@ -119,6 +156,13 @@ class SettingsPage(QtWidgets.QWizardPage):
         self.bwdir_remove_button.clicked.connect(self.bwdir_remove)
         self.bwdir.currentTextChanged.connect(self.bwdir_change)
         self.theme_combo.currentTextChanged.connect(self.theme_change)
+        self.scenario_threshold_spinbox.valueChanged.connect(
+            self.scenario_threshold_change
+        )
+        self.scenario_workers_spinbox.valueChanged.connect(self.scenario_workers_change)
+        self.monte_carlo_workers_spinbox.valueChanged.connect(
+            self.monte_carlo_workers_change
+        )
         self.restore_defaults_button.clicked.connect(self.restore_defaults)
 
     def bw_projects(self, path: str):
@@ -179,6 +223,24 @@ class SettingsPage(QtWidgets.QWizardPage):
             ab_settings.theme = theme
             self.changed()
 
+    def scenario_threshold_change(self, threshold: int):
+        """Change the scenario update threshold."""
+        if ab_settings.scenario_update_threshold != threshold:
+            ab_settings.scenario_update_threshold = threshold
+            self.changed()
+
+    def scenario_workers_change(self, workers: int):
+        """Change the number of scenario workers."""
+        if ab_settings.scenario_workers != workers:
+            ab_settings.scenario_workers = workers
+            self.changed()
+
+    def monte_carlo_workers_change(self, workers: int):
+        """Change the number of Monte Carlo workers."""
+        if ab_settings.monte_carlo_workers != workers:
+            ab_settings.monte_carlo_workers = workers
+            self.changed()
+
     def bwdir_browse(self):
         """
         Executes on emission of a signal from the browse button
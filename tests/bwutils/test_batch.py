@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+from activity_browser.bwutils.batch import (BatchSolver, ScenarioSolver,
+                                            batch_calculation,
+                                            characterization_vectors)
+from activity_browser.bwutils.results import (ContributionArray, ResultStore,
+                                              SortedContributions)
+from activity_browser.mod.bw2analyzer import ABContributionAnalysis
+
+
+def test_batch_calculation_matches_single_solves():
+    """Batched results should be equal to one LCA per reference flow."""
+    rng = np.random.default_rng(42)
+    technosphere = (
+        sparse.eye(40) - sparse.random(40, 40, density=0.05, random_state=1) * 0.1
+    ).tocsr()
+    biosphere = sparse.random(25, 40, density=0.2, random_state=2).tocsr()
+    methods = [sparse.diags(rng.random(25)) for _ in range(3)]
+    demand = np.zeros((40, 4))
+    for i in range(4):
+        demand[i * 5, i] = i + 1
+
+    results = batch_calculation(
+        technosphere, biosphere, demand, characterization_vectors(methods)
+    )
+    store = ResultStore(characterization_vectors(methods), cache_size=2)
+    store.add(results, biosphere)
+    processes = ContributionArray(store, "process", (4, 3, 40))
+    flows = ContributionArray(store, "elementary_flow", (4, 3, 25))
+
+    for row in range(demand.shape[1]):
+        supply = spsolve(technosphere.tocsc(), demand[:, row])
+        inventory = biosphere @ sparse.diags(supply)
+        assert np.allclose(results.supply[:, row], supply)
+        assert np.allclose(results.inventory[:, row], inventory.sum(axis=1).A1)
+        for col, method in enumerate(methods):
+            characterized = method @ inventory
+            assert np.isclose(results.scores[row, col], characterized.sum())
+            assert np.allclose(
+                store.characterized_inventory(row, col).toarray(),
+                characterized.toarray(),
+            )
+            assert np.allclose(flows[row, col], characterized.sum(axis=1).A1)
+            assert np.allclose(processes[row, col], characterized.sum(axis=0).A1)
+    assert processes.take(1, axis=1).shape == (4, 40)
+    assert flows.take(2, axis=0).shape == (3, 25)
+
+
+def test_scenario_solver_paths():
+    """Scenario solvers should reuse, update or refactorize the base system
+    depending on the number of changed columns, with equal results.
+    """
+    base = (
+        sparse.eye(40) - sparse.random(40, 40, density=0.05, random_state=3) * 0.1
+    ).tocsr()
+    demand = np.eye(40)[:, :3]
+    scenario_solver = ScenarioSolver(base, threshold=2)
+
+    solver, path = scenario_solver.solver(base.copy())
+    assert path == ScenarioSolver.REUSE
+
+    cases = (([4], ScenarioSolver.UPDATE), ([1, 7, 9], ScenarioSolver.FACTORIZE))
+    for columns, expected in cases:
+        scenario = base.tolil()
+        for col in columns:
+            scenario[(col + 1) % 40, col] = -0.3
+        scenario = scenario.tocsr()
+        solver, path = scenario_solver.solver(scenario)
+        assert path == expected
+        assert np.allclose(solver.solve(demand), spsolve(scenario.tocsc(), demand))
+
+
+def test_transposed_solve_gives_product_scores():
+    """The transposed solve gives the score of one unit of every product."""
+    rng = np.random.default_rng(7)
+    technosphere = (
+        sparse.eye(30) - sparse.random(30, 30, density=0.1, random_state=4) * 0.1
+    ).tocsr()
+    biosphere = sparse.random(20, 30, density=0.2, random_state=5).tocsr()
+    characterization = rng.random((2, 20))
+
+    unit_scores = BatchSolver(technosphere).solve_transposed(
+        biosphere.T @ characterization.T
+    )
+    results = batch_calculation(technosphere, biosphere, np.eye(30), characterization)
+    assert np.allclose(unit_scores, results.scores)
+
+
+def test_sorted_contributions_match_sort_array():
+    """Slicing the sorted rows gives the same top contributions as sorting
+    the row for every limit.
+    """
+    rng = np.random.default_rng(3)
+    contributions = rng.standard_t(2, size=(3, 200))
+    contributions[:, :20] = 0
+    sorted_contributions = SortedContributions(contributions)
+    ca = ABContributionAnalysis()
+
+    limits = [("number", 10), ("number", 500), ("percent", 0.05), ("cum_percent", 0.8)]
+    for row in range(3):
+        for limit_type, limit in limits:
+            expected = ca.sort_array(contributions[row], limit, limit_type)
+            values, indices = sorted_contributions.top(row, limit, limit_type)
+            assert np.array_equal(values, expected[:, 0])
+            assert np.array_equal(indices, expected[:, 1].astype(int))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import openpyxl
+
+from activity_browser.bwutils.superstructure import excel
+
+
+def test_read_sheet_skips_comments(tmp_path, monkeypatch):
+    """Commented rows and columns are skipped, also across chunks."""
+    monkeypatch.setattr(excel, "CHUNK_SIZE", 2)
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.append([None, "note"])
+    sheet.append(["from key", "#comment", "amount", "amount"])
+    sheet.append(["('db', 'a')", "x", 1, 2.5])
+    sheet.append(["* skipped", "x", 3, 4])
+    sheet.append([])
+    sheet.append(["('db', 'b')", "x", 5, "part*cut"])
+    path = tmp_path / "scenarios.xlsx"
+    wb.save(path)
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    data = excel.read_sheet(wb.worksheets[0])
+    wb.close()
+    assert list(data.columns) == ["from key", "amount", "amount.1"]
+    assert data["from key"].tolist()[::2] == ["('db', 'a')", "('db', 'b')"]
+    assert data["from key"].isna().tolist() == [False, True, False]
+    assert data["amount"].tolist()[::2] == [1, 5]
+    assert data["amount.1"].tolist()[::2] == [2.5, "part"]
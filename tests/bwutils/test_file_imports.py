@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+
+from activity_browser.bwutils.superstructure import file_imports
+from activity_browser.bwutils.superstructure.file_imports import \
+    ScenarioFileCache
+
+
+def test_scenario_file_cache_evicts_oldest(monkeypatch, tmp_path):
+    """Only the most recently written entries are kept in the cache."""
+    monkeypatch.setattr(
+        file_imports,
+        "bd",
+        SimpleNamespace(
+            projects=SimpleNamespace(dir=str(tmp_path)),
+            databases={"db": {"modified": "2024-01-01T00:00:00"}},
+        ),
+    )
+    monkeypatch.setattr(ScenarioFileCache, "MAX_ENTRIES", 3)
+    df = pd.DataFrame({"from database": ["db"], "to database": ["db"]})
+
+    caches = []
+    for i in range(5):
+        path = tmp_path / "scenario_{}.xlsx".format(i)
+        path.write_text(str(i))
+        cache = ScenarioFileCache(path, ";")
+        cache.write(df)
+        # entries are ordered by the time they were written
+        os.utime(cache.cache_path, (i, i))
+        caches.append(cache)
+
+    entries = set(ScenarioFileCache.directory().glob("*.pickle"))
+    assert entries == {cache.cache_path for cache in caches[-3:]}
+    assert caches[1].read() is None
+    pd.testing.assert_frame_equal(caches[-1].read(), df)
+
+    # an entry is outdated once one of its databases is modified
+    file_imports.bd.databases["db"]["modified"] = "2024-01-02T00:00:00"
+    assert caches[-1].read() is None
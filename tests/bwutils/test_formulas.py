@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from asteval import Interpreter
+
+from activity_browser.bwutils.formulas import CompiledParameters
+
+
+class Initial(object):
+    """Parameter data in the form provided by `StaticParameters`."""
+
+    databases = {"db"}
+    act_by_group_db = [SimpleNamespace(group="act", database="db")]
+
+    def project(self) -> dict:
+        return {"a": {"amount": 2.0}, "b": {"amount": 0, "formula": "a * 3"}}
+
+    def by_database(self, database: str) -> dict:
+        return {"c": {"amount": 0, "formula": "sqrt(b) + a"}}
+
+    def act_by_group(self, group: str) -> dict:
+        return {"d": {"amount": 1.5}}
+
+    def exc_by_group(self, group: str) -> dict:
+        return {
+            1: "c / d - a ** 2",
+            2: "d if c > 4 else -d",
+            3: "max(a, d) * 2",
+        }
+
+
+def test_compiled_parameters_match_interpreter():
+    """Evaluating all samples at once gives the same amounts as evaluating
+    the formulas for each sample with the interpreter.
+    """
+    compiled = CompiledParameters(Initial(), {("project", "a"): 0, ("act", "d"): 1})
+    assert [f.vectorized for f in compiled.groups[0][2]] == [True, False, False]
+
+    values = np.array([[2.0, 1.5], [0.5, 3.0], [1.0, 0.25]])
+    result = compiled.evaluate(values)
+    assert result.shape == (3, 3)
+
+    for (a, d), amounts in zip(values, result):
+        interpreter = Interpreter()
+        interpreter.symtable.update(a=a, d=d)
+        interpreter.symtable["b"] = interpreter("a * 3")
+        interpreter.symtable["c"] = interpreter("sqrt(b) + a")
+        expected = [interpreter(f) for f in Initial().exc_by_group("act").values()]
+        assert np.array_equal(amounts, expected)
+
+
+def test_compiled_parameters_keep_interpreter_symbols():
+    """Symbols that shadow a builtin of the interpreter do not remove it,
+    formulas that cannot be evaluated raise an error.
+    """
+    compiled = CompiledParameters(Initial(), {("project", "a"): 0})
+    values = np.array([2.0, 4.0])
+    result = compiled.evaluate_formula(
+        compiled.compile("max(pi, 3)"), {"pi": values}, 2
+    )
+    assert np.array_equal(result, [3.0, 4.0])
+    assert compiled.interpreter.symtable["pi"] == np.pi
+
+    with pytest.raises(NameError):
+        compiled.evaluate_formula(compiled.compile("max(a, missing)"), {"a": values}, 2)
+    assert "a" not in compiled.interpreter.symtable
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+from scipy import sparse
+
+from activity_browser.bwutils.graph_traversal import MatrixGraphTraversal
+
+
+def test_matrix_graph_traversal():
+    """Nodes hold the cumulative and direct scores of each activity in the
+    supply chain, inputs below the cutoff are not followed.
+    """
+    # a uses 2 b and 0.001 c, b uses 0.5 c
+    technosphere = sparse.csr_matrix(
+        [[1.0, 0.0, 0.0], [-2.0, 1.0, 0.0], [-0.001, -0.5, 1.0]]
+    )
+    biosphere = sparse.csr_matrix([[1.0, 2.0, 4.0]])
+    activities = {("db", "a"): 0, ("db", "b"): 1, ("db", "c"): 2}
+    traversal = MatrixGraphTraversal(technosphere, biosphere, activities)
+
+    data = traversal.calculate({("db", "a"): 1}, np.array([1.0]), cutoff=0.01)
+    assert np.isclose(data["score"], 1 + 2 * 2 + 4 * 1.001)
+    assert list(data["nodes"]) == [-1, 0, 1, 2]
+    assert np.isclose(data["nodes"][1]["cum"], 2 * (2 + 4 * 0.5))
+    assert np.isclose(data["nodes"][2]["ind"], 4 * 1.001)
+    edges = [(e["from"], e["to"]) for e in data["edges"]]
+    assert edges == [(0, -1), (1, 0), (2, 0), (2, 1)]
+    assert data["counter"] == 3
+
+    # c is below the cutoff
+    data = traversal.calculate({("db", "a"): 1}, np.array([1.0]), cutoff=0.5)
+    assert list(data["nodes"]) == [-1, 0, 1]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+import pandas as pd
+
+from activity_browser.bwutils import AB_metadata
+
+
+def test_metadata_cache(ab_app):
+    """The cache of a database is used until the database is modified, and
+    ignored if it can not be read.
+    """
+    db_name = "exchange_tests"
+    AB_metadata.remove_cache(db_name)
+    AB_metadata.reset_metadata()
+    AB_metadata.add_metadata([db_name])
+    df = AB_metadata.read_cache(db_name)
+    assert df is not None
+    expected = AB_metadata.prepare_metadata(AB_metadata.load_database(db_name))
+    pd.testing.assert_frame_equal(df, expected)
+
+    # a modification of the database outdates the cache
+    bd.databases.set_modified(db_name)
+    assert AB_metadata.read_cache(db_name) is None
+
+    # a corrupt cache is read from the database again and rewritten
+    with open(AB_metadata.cache_path(db_name), "wb") as f:
+        f.write(b"not a pickle")
+    assert AB_metadata.read_cache(db_name) is None
+    AB_metadata.reset_metadata()
+    AB_metadata.add_metadata([db_name])
+    assert len(AB_metadata.get_database_metadata(db_name)) == len(df)
+    assert AB_metadata.read_cache(db_name) is not None
+
+
+def test_metadata_apply_updates(ab_app):
+    """Deleted, modified and added activities are updated in one flush."""
+    db_name = "metadata_updates"
+    bd.Database(db_name).write(
+        {
+            (db_name, "deleted"): {"name": "deleted", "unit": "kilogram"},
+            (db_name, "modified"): {"name": "modified", "unit": "kilogram"},
+        }
+    )
+    AB_metadata.add_metadata([db_name])
+    AB_metadata.apply_updates()
+
+    bd.get_activity((db_name, "deleted")).delete()
+    modified = bd.get_activity((db_name, "modified"))
+    modified["name"] = "renamed"
+    modified.save()
+    bd.Database(db_name).new_activity(
+        code="added", name="added", unit="kilogram"
+    ).save()
+    assert set(AB_metadata.pending) == {
+        (db_name, "deleted"),
+        (db_name, "modified"),
+        (db_name, "added"),
+    }
+
+    AB_metadata.apply_updates()
+    assert not AB_metadata.pending
+    df = AB_metadata.get_database_metadata(db_name)
+    assert set(df["key"]) == {(db_name, "modified"), (db_name, "added")}
+    assert df.loc[(db_name, "modified"), "name"] == "renamed"
+    assert df.loc[(db_name, "added"), "name"] == "added"
+    del bd.databases[db_name]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import numpy as np
+from scipy import sparse
+
+from activity_browser.bwutils.montecarlo import (MonteCarloSampler,
+                                                 calculate_blocks)
+
+
+def uncertain_params(rows, cols, types, amounts) -> np.ndarray:
+    """Params array with a normal distribution around each amount."""
+    dtype = [
+        ("row", np.uint32),
+        ("col", np.uint32),
+        ("type", np.uint8),
+        ("amount", np.float64),
+        ("uncertainty_type", np.uint8),
+        ("loc", np.float64),
+        ("scale", np.float64),
+        ("shape", np.float64),
+        ("minimum", np.float64),
+        ("maximum", np.float64),
+        ("negative", bool),
+    ]
+    params = np.zeros(len(rows), dtype=dtype)
+    params["row"], params["col"], params["type"] = rows, cols, types
+    params["amount"] = params["loc"] = amounts
+    params["uncertainty_type"] = 3
+    params["scale"] = np.abs(amounts) * 0.1 + 1e-3
+    params["shape"] = params["minimum"] = params["maximum"] = np.nan
+    return params
+
+
+def test_sampler_results_do_not_depend_on_workers():
+    """Each block is drawn with its own seed, so the same seed gives the same
+    samples and results however the blocks are divided over processes.
+    """
+    rng = np.random.default_rng(0)
+    size, flows = 12, 5
+    rows = np.r_[np.arange(size), rng.integers(0, size, 20)]
+    cols = np.r_[np.arange(size), rng.integers(0, size, 20)]
+    amounts = np.r_[np.ones(size), rng.random(20) * 0.05]
+    tech = uncertain_params(rows, cols, np.r_[np.zeros(size), np.ones(20)], amounts)
+    bio_rows, bio_cols = rng.integers(0, flows, 15), rng.integers(0, size, 15)
+    bio = uncertain_params(bio_rows, bio_cols, np.full(15, 2), rng.random(15))
+    cf = uncertain_params(np.arange(flows), np.arange(flows), 0, rng.random(flows))
+    lca = SimpleNamespace(
+        tech_params=tech,
+        bio_params=bio,
+        biosphere_dict={i: i for i in range(flows)},
+        technosphere_matrix=sparse.csr_matrix(
+            (amounts, (rows, cols)), shape=(size, size)
+        ),
+        biosphere_matrix=sparse.csr_matrix(
+            (bio["amount"], (bio_rows, bio_cols)), shape=(flows, size)
+        ),
+    )
+
+    def sampler(seed: int) -> MonteCarloSampler:
+        return MonteCarloSampler(
+            seed, lca, tech, bio, [cf], [cf["row"]], np.eye(size)[:, :2]
+        )
+
+    blocks = [(0, 0, 4, None), (1, 4, 4, None), (2, 8, 3, None)]
+    serial = [sampler(7).calculate(*block) for block in blocks]
+    pooled = list(calculate_blocks(sampler(7), blocks, workers=2))
+    # a block calculated on its own is equal to the same block in a sequence
+    single = sampler(7).calculate(*blocks[1])
+    for expected, result in zip(serial, pooled):
+        for field in ["results", "tech_samples", "bio_samples", "tech_vector"]:
+            assert np.array_equal(getattr(result, field), getattr(expected, field))
+        assert np.array_equal(result.cf_samples[0], expected.cf_samples[0])
+    assert np.array_equal(single.results, serial[1].results)
+    assert np.array_equal(single.tech_samples, serial[1].tech_samples)
+
+    assert not np.array_equal(serial[0].results, serial[1].results)
+    other = sampler(8).calculate(*blocks[0])
+    assert not np.array_equal(other.results, serial[0].results)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from types import SimpleNamespace
+
+import numpy as np
+from scipy import sparse
+
+from activity_browser.bwutils.batch import (ScenarioSolver, batch_calculation,
+                                            include_entries)
+from activity_browser.bwutils.superstructure.matrices import (apply_scenario,
+                                                              scenario_positions)
+from activity_browser.bwutils.superstructure.parallel import \
+    calculate_scenarios
+
+
+def test_apply_scenario_writes_values_and_defaults():
+    """Scenario values are written in place, NaN values fall back to defaults
+    and technosphere inputs are stored as negative values.
+    """
+    technosphere = sparse.csr_matrix(np.array([[1.0, -0.5], [0.0, 1.0]]))
+    dtype = [("row", np.uint32), ("col", np.uint32), ("type", np.uint8)]
+    indices = np.zeros(3, dtype=dtype)
+    indices["row"], indices["col"], indices["type"] = [0, 1, 1], [1, 0, 1], [1, 1, 0]
+    kinds = np.array(["technosphere", "technosphere", "production"])
+
+    matrix = include_entries(technosphere, indices["row"], indices["col"])
+    positions = {
+        "technosphere_matrix": scenario_positions(
+            matrix, indices, kinds, ["technosphere", "production"]
+        )
+    }
+    assert matrix.nnz == 4
+
+    matrices = {"technosphere_matrix": matrix}
+    apply_scenario(matrices, positions, np.array([0.2, 0.3, 2.0]))
+    assert np.allclose(matrix.toarray(), [[1.0, -0.2], [-0.3, 2.0]])
+    apply_scenario(matrices, positions, np.full(3, np.nan))
+    assert np.allclose(matrix.toarray(), technosphere.toarray())
+
+
+def test_calculate_scenarios_in_pool_matches_serial():
+    """Scenarios calculated by worker processes are bit-identical to those
+    calculated one after the other in the main process.
+    """
+    rng = np.random.default_rng(7)
+    size = 30
+    technosphere = (
+        sparse.eye(size) - sparse.random(size, size, density=0.1, random_state=4) * 0.1
+    ).tocsr()
+    biosphere = sparse.random(8, size, density=0.3, random_state=5).tocsr()
+    dtype = [("row", np.uint32), ("col", np.uint32), ("type", np.uint8)]
+    indices = np.zeros(12, dtype=dtype)
+    indices["row"] = np.r_[np.arange(8), rng.integers(0, 8, 4)]
+    indices["col"] = np.r_[np.arange(8) + 1, rng.integers(0, size, 4)]
+    indices["type"] = [1] * 8 + [2] * 4
+    kinds = np.array(["technosphere"] * 8 + ["biosphere"] * 4)
+    # scenario 0 keeps the defaults, 1 changes the biosphere only
+    values = rng.random((12, 4)) * 0.2
+    values[:, 0] = np.nan
+    values[:8, 1] = np.nan
+
+    matrices = {
+        "technosphere_matrix": include_entries(
+            technosphere, indices["row"][:8], indices["col"][:8]
+        ),
+        "biosphere_matrix": include_entries(
+            biosphere, indices["row"][8:], indices["col"][8:]
+        ),
+    }
+    positions = {
+        "technosphere_matrix": scenario_positions(
+            matrices["technosphere_matrix"], indices, kinds, ["technosphere"]
+        ),
+        "biosphere_matrix": scenario_positions(
+            matrices["biosphere_matrix"], indices, kinds, ["biosphere"]
+        ),
+    }
+    mlca = SimpleNamespace(
+        default_technosphere_matrix=matrices["technosphere_matrix"].copy(),
+        default_biosphere_matrix=matrices["biosphere_matrix"].copy(),
+        positions=positions,
+        values=values,
+        demand_matrix=np.eye(size)[:, :3],
+        characterization=rng.random((2, 8)),
+        scenario_solver=ScenarioSolver(matrices["technosphere_matrix"], threshold=4),
+        total=values.shape[1],
+    )
+
+    results = list(calculate_scenarios(mlca, workers=2))
+    assert [result.scenario for result in results] == list(range(mlca.total))
+    assert results[0].biosphere_matrix is None
+    for scenario, result in enumerate(results):
+        # the serial calculation of `SuperstructureMLCA._perform_calculations`
+        apply_scenario(matrices, positions, values[:, scenario])
+        solver, path = mlca.scenario_solver.solver(matrices["technosphere_matrix"])
+        serial = batch_calculation(
+            matrices["technosphere_matrix"],
+            matrices["biosphere_matrix"],
+            mlca.demand_matrix,
+            mlca.characterization,
+            solver,
+        )
+        assert result.path == path
+        assert np.array_equal(result.results.scores, serial.scores)
+        assert np.array_equal(result.results.supply, serial.supply)
+        assert np.array_equal(result.results.inventory, serial.inventory)
+        assert np.array_equal(
+            result.diagonal, matrices["technosphere_matrix"].diagonal()
+        )
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from activity_browser.bwutils.search import SearchIndex
+
+
+def metadata(rows: list) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=["name", "categories", "code"])
+    df["key"] = [("db", code) for code in df["code"]]
+    return df
+
+
+def test_search_index_matches_contains():
+    """The index finds the same rows as a case-insensitive "contains" search
+    of every term on every field, also after rows are changed or removed.
+    """
+    df = metadata(
+        [
+            ("Hard coal", ("air",), "a"),
+            ("charcoal", ("water", "ocean"), "b"),
+            ("Lignite", "", "c"),
+        ]
+    )
+    index = SearchIndex(df, ["name", "categories"])
+    assert sorted(index.search("COAL")) == [("db", "a"), ("db", "b")]
+    assert index.search("ean") == [("db", "b")]
+    assert index.search("coal  OCEAN") == [("db", "b")]  # terms match any field
+    assert index.search("hard ocean") == []
+    assert len(index.search("")) == 3
+
+    index.remove([("db", "a")])
+    index.update(metadata([("Coal tar", "", "b"), ("Brown coal", "", "d")]))
+    assert sorted(index.search("coal")) == [("db", "b"), ("db", "d")]
+    assert index.search("ocean") == []
+
+    index.build()
+    assert sorted(index.search("coal")) == [("db", "b"), ("db", "d")]
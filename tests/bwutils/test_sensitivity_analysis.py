@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from activity_browser.bwutils import sensitivity_analysis
+from activity_browser.bwutils.montecarlo import MonteCarloLCA
+from activity_browser.bwutils.sensitivity_analysis import (
+    ESTIMATORS,
+    GlobalSensitivityAnalysis,
+    GSAInput,
+    get_problem,
+    get_results_dataframe,
+)
+
+
+def test_sample_based_estimators():
+    """The inputs are ranked the same by each of the cheap estimators, inputs
+    that do not vary have no influence.
+    """
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 4))
+    X[:, 3] = 1.0
+    Y = 3 * X[:, 0] + X[:, 1] - 2 * X[:, 2]
+    names = pd.Index(["a", "b", "c", "d"], name="GSA name")
+    problem = get_problem(X, names)
+    metadata = pd.DataFrame({"pedigree": [None] * 4}, index=names)
+
+    for estimator in ["sobol", "spearman", "src"]:
+        Si = ESTIMATORS[estimator].function(problem, X, Y)
+        df = get_results_dataframe(metadata, Si, estimator)
+        assert df["GSA name"].to_list() == ["a", "c", "b", "d"]
+        assert np.isclose(df[ESTIMATORS[estimator].rank_by].iloc[-1], 0)
+
+    Si = ESTIMATORS["sobol"].function(problem, X, Y)
+    assert np.allclose(Si["S1"], np.array([9, 1, 4, 0]) / 14, atol=0.05)
+    Si = ESTIMATORS["src"].function(problem, X, Y)
+    assert np.allclose(Si["SRC"], np.array([3, 1, -2, 0]) / np.sqrt(14), atol=0.05)
+
+
+def test_perform_GSA_all(monkeypatch):
+    """All estimators of a reference flow and impact category are calculated
+    in one task and the results are cached for the Monte Carlo run.
+    """
+    mc = MonteCarloLCA.__new__(MonteCarloLCA)
+    mc.func_units = [{"a": 1}, {"b": 1}]
+    mc.methods = [("m", "1"), ("m", "2"), ("m", "3")]
+    mc.run_id = "run"
+    gsa = GlobalSensitivityAnalysis(mc)
+
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, 3))
+    names = pd.Index(["a", "b", "c"], name="GSA name")
+    metadata = pd.DataFrame({"pedigree": [None] * 3}, index=names)
+
+    def prepare_input(act_number, method_number, *cutoffs):
+        # the most influential input differs per combination
+        Y = X[:, (act_number + method_number) % 3] + 0.1 * X.sum(axis=1)
+        return GSAInput(None, mc.methods[method_number], metadata, X, Y)
+
+    tasks = []
+
+    def estimate(functions, problem, X, Y):
+        tasks.append(list(functions))
+        return estimate_all(functions, problem, X, Y)
+
+    estimate_all = sensitivity_analysis._estimate
+    monkeypatch.setattr(gsa, "prepare_input", prepare_input)
+    monkeypatch.setattr(sensitivity_analysis, "_estimate", estimate)
+
+    progress = []
+    results = gsa.perform_GSA_all(
+        estimators=("spearman", "src"),
+        callback=lambda completed, total: progress.append((completed, total)),
+    )
+    assert len(results) == 2 * 3 * 2
+    assert tasks == [["spearman", "src"]] * 6
+    assert progress == [(completed, 6) for completed in range(1, 7)]
+    for (act_number, method_number, estimator), df in results.items():
+        assert df["GSA name"].iloc[0] == names[(act_number + method_number) % 3]
+
+    # only the estimator that was not calculated yet is added to the tasks
+    results = gsa.perform_GSA_all(estimators=("spearman", "sobol"))
+    assert len(results) == 2 * 3 * 2
+    assert tasks[6:] == [["sobol"]] * 6
+
+    # a new Monte Carlo run clears the cache
+    mc.run_id = "new run"
+    gsa.perform_GSA_all(estimators=("spearman",))
+    assert tasks[12:] == [["spearman"]] * 6
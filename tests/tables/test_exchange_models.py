@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+
+from activity_browser.mod.bw2data.backends import (ActivityDataset,
+                                                   ExchangeDataset)
+from activity_browser.ui.tables.models.activity import (
+    BiosphereExchangeModel, DownstreamExchangeModel, ProductExchangeModel,
+    TechnosphereExchangeModel)
+
+KEY = ("exchange_tests", "186cdea4c3214479b931428591ab2021")
+
+
+def test_exchange_models_rows(ab_app):
+    activity = bd.get_activity(KEY)
+    tables = [
+        (ProductExchangeModel, activity.production(), "Product", "input"),
+        (TechnosphereExchangeModel, activity.technosphere(), "Activity", "input"),
+        (BiosphereExchangeModel, activity.biosphere(), "Flow Name", "input"),
+        (DownstreamExchangeModel, activity.upstream(), "Activity", "output"),
+    ]
+    for model_class, exchanges, name_column, side in tables:
+        model = model_class(KEY)
+        model.load(exchanges)
+        expected = sorted(
+            (exchange[side], exchange.amount) for exchange in exchanges
+        )
+        data = model._dataframe
+        assert list(data.columns) == model.columns
+        assert sorted(
+            (exchange[side], amount)
+            for exchange, amount in zip(data["exchange"], data["Amount"])
+        ) == expected
+        names = [getattr(exchange, side)["name"] for exchange in data["exchange"]]
+        assert list(data[name_column]) == names
+        assert model.keys == {KEY}.union(key for key, _ in expected)
+
+
+def test_exchange_model_removes_broken_exchanges(ab_app):
+    activity = bd.get_activity(KEY)
+    consumer = bd.Database("exchange_tests").new_activity(
+        code="broken_output", name="broken output", unit="kilogram"
+    )
+    consumer.save()
+    consumer.new_exchange(input=KEY, amount=1.0, type="technosphere").save()
+    # remove the consumer behind the back of brightway, leaving its exchange
+    ActivityDataset.delete().where(
+        ActivityDataset.code == "broken_output"
+    ).execute()
+
+    model = DownstreamExchangeModel(KEY)
+    model.load(activity.upstream())
+
+    assert consumer.key not in set(model._dataframe["exchange"].map(
+        lambda exchange: exchange["output"]
+    ))
+    assert not ExchangeDataset.select().where(
+        ExchangeDataset.output_code == "broken_output"
+    ).exists()